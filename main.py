@@ -1,7 +1,22 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from utils.webhook import router as webhook_router  # <-- file must be utils/webhook.py
+from utils.digest import start_digest_scheduler
+from utils.dedupe import start_sheet_seed
+from utils.workqueue import start_workers
+from utils.config import DEDUPE_MODE, SPREADSHEET_ID, WORK_MODE, WORKER_THREADS
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background jobs that live as long as the server
+    start_digest_scheduler()
+    if DEDUPE_MODE != "off" and SPREADSHEET_ID:
+        start_sheet_seed()
+    if WORK_MODE == "queue" and WORKER_THREADS > 0:
+        start_workers(WORKER_THREADS)
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 @app.get("/")
 def health():
@@ -0,0 +1,67 @@
+# tests/conftest.py
+import os, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FileServer:
+    """Local HTTP stand-in: path -> (status, content type, body, delay, trickle); counts hits and keeps the last request headers per path."""
+
+    def __init__(self):
+        self.routes = {}
+        self.hits = {}
+        self.headers = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits[self.path] = server.hits.get(self.path, 0) + 1
+                server.headers[self.path] = dict(self.headers)
+                status, ctype, body, delay, trickle = server.routes.get(self.path, (404, "text/plain", b"not found", 0, 0))
+                if delay:
+                    threading.Event().wait(delay)
+                if status in (301, 302):
+                    self.send_response(status)
+                    self.send_header("Location", body.decode())
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    if not trickle:
+                        self.wfile.write(body)
+                    for i in range(len(body) if trickle else 0):   # one byte every `trickle` seconds
+                        self.wfile.write(body[i:i + 1])
+                        self.wfile.flush()
+                        threading.Event().wait(trickle)
+                except OSError:
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def add(self, path: str, body: bytes, ctype: str = "text/html", status: int = 200, delay: float = 0,
+            trickle: float = 0):
+        self.routes[path] = (status, ctype, body, delay, trickle)
+        return self.url(path)
+
+
+@pytest.fixture
+def file_server():
+    server = FileServer()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
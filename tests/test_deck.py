@@ -0,0 +1,84 @@
+# tests/test_deck.py
+import os, time
+
+import pytest
+
+from utils import deck, enrich
+
+pytest.importorskip("pypdf")
+fpdf = pytest.importorskip("fpdf")
+
+
+def make_pdf(pages):
+    pdf = fpdf.FPDF()
+    pdf.set_font("Helvetica", size=12)
+    for lines in pages:
+        pdf.add_page()
+        for line in lines:
+            pdf.cell(0, 10, line, new_x="LMARGIN", new_y="NEXT")
+    return bytes(pdf.output())
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(deck, "DECK_CACHE_DIR", str(tmp_path / "decks"))
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", True)   # the stand-in server is on loopback
+    return tmp_path / "decks"
+
+
+def test_ingest_summarizes_metric_lines(file_server):
+    url = file_server.add("/deck.pdf", make_pdf([["Acme", "We help lawyers", "ARR $1.2M, 40 customers"],
+                                                 ["Market", "TAM $30B"]]), "application/pdf")
+    summary = deck.ingest_deck(url)
+    assert summary.splitlines()[0].startswith("p1: Acme")
+    assert "ARR $1.2M, 40 customers" in summary
+    assert "TAM $30B" in summary
+
+
+def test_second_load_is_served_from_cache(file_server):
+    url = file_server.add("/deck.pdf", make_pdf([["Acme", "MRR $20k"]]), "application/pdf")
+    first = deck.load_deck_pages(url)
+    assert deck.load_deck_pages(url) == first
+    assert file_server.hits["/deck.pdf"] == 1
+
+
+def test_expired_url_entry_is_fetched_again(file_server):
+    url = file_server.add("/deck.pdf", make_pdf([["Old deck"]]), "application/pdf")
+    deck.load_deck_pages(url)
+    file_server.add("/deck.pdf", make_pdf([["New deck"]]), "application/pdf")
+    assert "Old deck" in deck.load_deck_pages(url)[0]
+    assert "New deck" in deck.load_deck_pages(url, url_ttl_s=0)[0]
+    assert file_server.hits["/deck.pdf"] == 2
+
+
+def test_oversized_deck_is_refused(file_server):
+    url = file_server.add("/big.pdf", b"%PDF-" + b"0" * 5000, "application/pdf")
+    with pytest.raises(deck.DeckTooLarge):
+        deck.download_deck(url, max_bytes=1000)
+    assert deck.ingest_deck("ftp://example.com/deck.pdf") == ""
+
+
+def test_missing_deck_gives_empty_summary(file_server):
+    assert deck.ingest_deck(file_server.url("/nope.pdf")) == ""
+
+
+def test_many_pages_use_the_shared_pool(file_server):
+    pages = [[f"Page {i}", f"{i * 10} customers"] for i in range(1, 13)]
+    url = file_server.add("/long.pdf", make_pdf(pages), "application/pdf")
+    first = deck.load_deck_pages(url)
+    pool = deck._POOL
+    assert pool is not None and len(first) == 12 and "Page 12" in first[-1]
+    deck.extract_pages(make_pdf(pages[:8]), workers=2)
+    assert deck._POOL is pool
+
+
+def test_prune_drops_expired_urls_and_oldest_texts(cache_dir):
+    for kind, key, size in (("urls", "u1", 10), ("text", "t_old", 600), ("text", "t_new", 600)):
+        os.makedirs(cache_dir / kind, exist_ok=True)
+        (cache_dir / kind / f"{key}.json").write_text("x" * size)
+    old = time.time() - 7200
+    os.utime(cache_dir / "urls" / "u1.json", (old, old))
+    os.utime(cache_dir / "text" / "t_old.json", (old, old))
+    assert deck.prune_cache(url_ttl_s=3600, max_bytes=1000) == 2
+    assert sorted(os.listdir(cache_dir / "text")) == ["t_new.json"]
+    assert os.listdir(cache_dir / "urls") == []
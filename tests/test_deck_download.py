@@ -0,0 +1,56 @@
+# tests/test_deck_download.py
+import time
+
+import pytest
+
+from utils import deck, enrich
+
+
+@pytest.fixture(autouse=True)
+def local(monkeypatch):
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(deck, "TYPEFORM_TOKEN", "tf-secret")
+
+
+def test_token_only_for_typeform_https_hosts():
+    assert deck._typeform_host("https://api.typeform.com/forms/x/files/deck.pdf")
+    assert deck._typeform_host("https://typeform.com/deck.pdf")
+    assert not deck._typeform_host("http://api.typeform.com/deck.pdf")
+    assert not deck._typeform_host("https://typeform.com.evil.test/deck.pdf")
+    assert not deck._typeform_host("https://evil.test/typeform.com/deck.pdf")
+    assert not deck._typeform_host("https://nottypeform.com/deck.pdf")
+
+
+def test_foreign_host_gets_no_token(file_server):
+    url = file_server.add("/typeform.com/deck.pdf", b"%PDF-1.4", "application/pdf")
+    assert deck.download_deck(url) == b"%PDF-1.4"
+    assert "Authorization" not in file_server.headers["/typeform.com/deck.pdf"]
+
+
+def test_token_is_not_carried_across_a_redirect(file_server, monkeypatch):
+    monkeypatch.setattr(deck, "_typeform_host", lambda url: True)
+    target = file_server.add("/cdn/deck.pdf", b"%PDF-1.4", "application/pdf")
+    url = file_server.add("/upload", target.encode(), status=302)
+    assert deck.download_deck(url) == b"%PDF-1.4"
+    assert file_server.headers["/upload"]["Authorization"] == "Bearer tf-secret"
+    assert "Authorization" not in file_server.headers["/cdn/deck.pdf"]
+
+
+def test_loopback_url_is_refused(file_server, monkeypatch):
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", False)
+    with pytest.raises(enrich.FetchRefused):
+        deck.download_deck(file_server.add("/deck.pdf", b"%PDF-1.4", "application/pdf"))
+    assert file_server.hits == {}
+
+
+def test_oversized_deck_is_aborted(file_server):
+    with pytest.raises(deck.DeckTooLarge):
+        deck.download_deck(file_server.add("/big.pdf", b"x" * 2048, "application/pdf"), max_bytes=1024)
+
+
+def test_slow_download_is_cut_at_the_deadline(file_server):
+    url = file_server.add("/slow.pdf", b"%PDF" + b"x" * 200, "application/pdf", trickle=0.05)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        deck.download_deck(url, timeout=0.5)
+    assert time.monotonic() - t0 < 1.0
@@ -0,0 +1,112 @@
+# tests/test_enrich.py
+import asyncio, socket, time
+from types import SimpleNamespace
+
+import pytest
+
+from utils import enrich
+
+HOME = b"""<html><head><title>Acme</title><meta name="description" content="Contract review for lawyers">
+</head><body><nav>Pricing Login</nav><h1>Review contracts in minutes</h1>
+<p>Acme is trusted by 40 law firms across Europe and the US.</p>
+<p>We raised $3M from Example Ventures to grow the team.</p><script>var x = 1;</script></body></html>"""
+
+
+@pytest.fixture(autouse=True)
+def local(tmp_path, monkeypatch):
+    # the stand-in server is on loopback, which production refuses
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(enrich, "ENRICH_ENABLED", True)
+    monkeypatch.setattr(enrich, "ENRICH_CACHE_DIR", str(tmp_path / "enrich"))
+
+
+def company(website, **extra):
+    return SimpleNamespace(name="Acme", website=website, team=""), extra
+
+
+def test_summary_keeps_title_headings_and_figures(file_server):
+    info, extra = company(file_server.add("/", HOME))
+    summary = asyncio.run(enrich.enrich_company(info, extra))
+    assert summary.startswith("127.0.0.1: Acme — Contract review for lawyers")
+    assert "Headings: Review contracts in minutes" in summary
+    assert "- Acme is trusted by 40 law firms across Europe and the US." in summary
+    assert "Pricing" not in summary and "var x" not in summary
+
+
+def test_press_links_are_fetched_and_pages_cached(file_server):
+    press = file_server.add("/press", b"<p>Acme announced 120 customers in its Series A news.</p>")
+    info, extra = company(file_server.add("/", HOME), press_links=f"See {press}.")
+    first = asyncio.run(enrich.enrich_company(info, extra))
+    assert "120 customers" in first
+    assert asyncio.run(enrich.enrich_company(info, extra)) == first
+    assert file_server.hits == {"/": 1, "/press": 1}
+
+
+def test_failed_page_is_skipped(file_server):
+    info, extra = company(file_server.add("/", HOME), press_links=file_server.add("/gone", b"", status=500))
+    summary = asyncio.run(enrich.enrich_company(info, extra))
+    assert "Acme" in summary and "/gone" not in summary
+
+
+def test_non_html_is_refused(file_server):
+    with pytest.raises(enrich.FetchRefused):
+        enrich.fetch_page(file_server.add("/deck.pdf", b"%PDF-1.4", "application/pdf"))
+
+
+def test_private_address_is_refused(file_server, monkeypatch):
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", False)
+    with pytest.raises(enrich.FetchRefused):
+        enrich.fetch_page(file_server.add("/", HOME))
+
+
+def test_redirect_to_private_address_is_refused(file_server, monkeypatch):
+    monkeypatch.setattr(enrich, "ENRICH_ALLOW_PRIVATE", False)
+    url = file_server.add("/", HOME)
+    # public.test passes the check; the redirect target is checked as it is dialled
+    monkeypatch.setattr(enrich, "_resolve", lambda host, port, _r=enrich._resolve: (
+        "127.0.0.1" if host == "public.test" else _r(host, port)))
+    file_server.add("/hop", url.encode(), status=302)
+    with pytest.raises(enrich.FetchRefused):
+        enrich.fetch_page(f"http://public.test:{file_server.httpd.server_address[1]}/hop")
+
+
+def test_connection_goes_to_the_checked_address(file_server, monkeypatch):
+    # the name resolves once; the socket is opened to that answer, not to a second lookup
+    port = file_server.httpd.server_address[1]
+    file_server.add("/", HOME)
+    real = socket.getaddrinfo
+    answers = iter([[(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]])
+
+    def lookup(host, *a, **k):
+        if host != "rebind.test":
+            return real(host, *a, **k)
+        return next(answers, [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", port))])
+    monkeypatch.setattr(socket, "getaddrinfo", lookup)
+    assert "Acme" in enrich.fetch_page(f"http://rebind.test:{port}/")
+
+
+def test_slow_page_is_cut_at_the_deadline(file_server):
+    url = file_server.add("/slow", b"<p>" + b"x" * 200 + b"</p>", trickle=0.05)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutError):
+        enrich.fetch_page(url, timeout=0.5)
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_concurrency_is_held_until_fetches_finish(file_server, monkeypatch):
+    monkeypatch.setattr(enrich, "ENRICH_TIMEOUT_S", 0.3)
+    slow = [file_server.add(f"/s{i}", b"<p>" + b"x" * 100 + b"</p>", trickle=0.05) for i in range(3)]
+    info, extra = company(slow[0], press_links=" ".join(slow[1:]))
+    running, peak = [0], [0]
+    fetch = enrich.fetch_page
+
+    def counted(url, *a, **k):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        try:
+            return fetch(url, timeout=0.3)
+        finally:
+            running[0] -= 1
+    monkeypatch.setattr(enrich, "fetch_page", counted)
+    assert asyncio.run(enrich.enrich_company(info, extra, concurrency=1)) == ""
+    assert peak[0] == 1
@@ -0,0 +1,67 @@
+# tests/test_priority.py
+import asyncio, time
+from collections import Counter
+
+import pytest
+
+from utils.priority import LaneGate, LanePolicy, deal_priority
+
+
+@pytest.mark.parametrize("investors", ["Sequoia", "Kima Ventures", "We have a term sheet from Index",
+                                       "Angels from Stripe and Google", "a16z scout", "led by Point Nine"])
+def test_named_lead_counts(investors):
+    assert "lead investor" in deal_priority({"investors": investors})[1]
+
+
+@pytest.mark.parametrize("investors", ["maybe later", "Maybe later", "Maybe", "Just us", "Talking to some folks",
+                                       "we have interest from a few people", "No lead yet",
+                                       "Looking for a lead from Sequoia", "Bootstrapped so far", "Nope", ""])
+def test_no_lead(investors):
+    assert "lead investor" not in deal_priority({"investors": investors})[1]
+
+
+def test_lanes_from_round_lead_and_intro():
+    assert deal_priority({"round": "Series A", "investors": "Sequoia"})[0] == "high"
+    assert deal_priority({"round": "Seed"})[0] == "normal"
+    assert deal_priority({"round": "Pre-seed", "investors": "Just us"})[0] == "low"
+    assert deal_priority({"round": "Seed", "team": "Warm intro from our angel"})[0] == "high"
+
+
+def test_backlog_is_shared_by_weight_without_starving_low():
+    policy = LanePolicy({"high": 4, "normal": 2, "low": 1}, aging_s=0)
+    now = time.time()
+    served = Counter(policy.pick({"high": now, "normal": now, "low": now}, now) for _ in range(70))
+    assert served == {"high": 40, "normal": 20, "low": 10}
+
+
+def test_waiting_deal_ages_into_a_higher_lane():
+    policy = LanePolicy({"high": 100, "normal": 1, "low": 1}, aging_s=10)
+    now = time.time()
+    assert policy.pick({"high": now, "low": now - 5}, now) == "high"
+    # 25 s is two aging steps: the low deal now competes as high, and it is older
+    assert policy.pick({"high": now, "low": now - 25}, now) == "low"
+
+
+def test_gate_releases_waiting_deals_by_lane():
+    order = []
+
+    async def deal(name, hold=None):
+        if hold:
+            await hold.wait()
+        order.append(name)
+
+    async def main():
+        gate = LaneGate(slots=1, policy=LanePolicy({"high": 4, "normal": 2, "low": 1}, aging_s=0))
+        hold = asyncio.Event()
+        first = asyncio.create_task(gate.run("normal", deal, "running", hold))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(gate.run(lane, deal, name)) for lane, name in
+                   [("low", "low-1"), ("normal", "normal-1"), ("high", "high-1"), ("high", "high-2")]]
+        await asyncio.sleep(0)
+        assert gate.stats()["running"] == 1 and gate.stats()["high"]["waiting"] == 2
+        hold.set()
+        await asyncio.gather(first, *waiting)
+        assert gate.active == 0
+    asyncio.run(main())
+    # stride order: each lane once, then by weight; high deals stay in arrival order
+    assert order == ["running", "high-1", "normal-1", "low-1", "high-2"]
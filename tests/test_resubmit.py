@@ -0,0 +1,47 @@
+# tests/test_resubmit.py
+import pytest
+
+from utils import resubmit
+from utils.resubmit import diff_answers, plan_update, same_company
+
+ACME = {"name": "Acme", "website": "https://acme.io", "founder_email": "ana@acme.io",
+        "traction": "40 customers", "team": "Ana, Ben"}
+
+
+def test_diff_ignores_whitespace_and_sees_added_and_removed_keys():
+    new = {**ACME, "traction": "  40   customers ", "market": "TAM $30B"}
+    del new["team"]
+    assert diff_answers(ACME, new) == ["market", "team"]
+
+
+def test_plan_merges_sections_and_skips_contact_fields():
+    plan = plan_update(["traction", "market", "founder_email"])
+    assert plan["fields"] == ["traction", "market"]
+    assert plan["full"] == ["Why we're excited", "Traction", "Market Size"]
+    assert plan["mini"] == ["Traction", "Market"]
+    assert plan["scores"] == ["traction", "market"]
+
+
+def test_unmapped_field_or_too_many_sections_needs_a_full_run(monkeypatch):
+    assert plan_update(["name"]) is None
+    monkeypatch.setattr(resubmit, "RESUBMIT_MAX_SECTIONS", 3)
+    assert plan_update(["traction", "team"]) is None
+
+
+def test_new_deck_redoes_the_deck_sections_only():
+    plan = plan_update(["pitch_deck_url"])
+    assert plan["full"] == ["Why we're excited", "Traction", "Market Size"]
+    assert plan["scores"] == ["traction", "market"]
+
+
+@pytest.mark.parametrize("match", ["domain", "name"])
+def test_domain_or_exact_name_match_reuses_the_row(match):
+    assert same_company(match, ACME, {**ACME, "name": "Acme Labs", "website": "https://acme.ai"})
+
+
+@pytest.mark.parametrize("match", ["email", "fuzzy_name"])
+def test_loose_match_reuses_the_row_only_when_name_and_website_hold(match):
+    assert same_company(match, ACME, {**ACME, "traction": "55 customers"})
+    # a founder's second company, or a look-alike name: a new row
+    assert not same_company(match, ACME, {**ACME, "name": "Bolt", "website": "https://bolt.dev"})
+    assert not same_company(match, ACME, {**ACME, "website": "https://acme-labs.com"})
@@ -0,0 +1,81 @@
+# tests/test_usage.py
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from utils import usage
+from utils.usage import UsageLedger
+
+PROMPT = "x" * 8000
+NOON = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOON]
+    monkeypatch.setattr(usage, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def ledger(tmp_path, daily=0.0, deal=0.0):
+    # fixed prices: the full model costs 100x the lite one
+    return UsageLedger(str(tmp_path / "usage.db"), prices="gpt-4o-mini:1/1,gpt:100/100",
+                       daily_budget=daily, deal_budget=deal)
+
+
+def spend(led, rid, usd):
+    led.record("memo", "gpt-4o", {"prompt_tokens": int(usd * 10_000), "completion_tokens": 0}, rid=rid)
+
+
+def test_reservations_net_against_spend(tmp_path, clock):
+    led = ledger(tmp_path, daily=1000)
+    est = led.estimate(PROMPT, "single")
+    assert led.admit(PROMPT, "single", "r1") == "single"
+    assert led.reserved() == pytest.approx(est)
+    spend(led, "r1", est / 4)
+    assert led.spent_today() == pytest.approx(est / 4)
+    assert led.reserved() == pytest.approx(est * 3 / 4)   # spend counted once, not twice
+    assert led.reserved(exclude="r1") == 0
+    led.release("r1")
+    assert led.reserved() == 0
+
+
+def test_lite_when_only_lite_fits(tmp_path, clock):
+    probe = ledger(tmp_path)
+    full, lite = probe.estimate(PROMPT, "single"), probe.estimate(PROMPT, "lite")
+    assert lite < full
+    assert ledger(tmp_path, daily=(full + lite) / 2).admit(PROMPT, "single", "r1") == "lite"
+
+
+@pytest.mark.parametrize("work_mode, expected", [("queue", "defer"), ("inline", "fallback")])
+def test_defer_or_fallback_when_nothing_fits(tmp_path, clock, monkeypatch, work_mode, expected):
+    monkeypatch.setattr(usage, "WORK_MODE", work_mode)
+    probe = ledger(tmp_path)
+    lite = probe.estimate(PROMPT, "lite")
+    led = ledger(tmp_path, daily=lite * 1.5)
+    assert led.admit(PROMPT, "lite", "r1") == "lite"
+    # r1's reservation leaves no room for a second lite memo
+    assert led.admit(PROMPT, "single", "r2") == expected
+    assert led.reserved(exclude="r1") == 0   # a refused deal reserves nothing
+
+
+def test_per_deal_cap(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(usage, "WORK_MODE", "queue")
+    probe = ledger(tmp_path)
+    full, lite = probe.estimate(PROMPT, "single"), probe.estimate(PROMPT, "lite")
+    assert ledger(tmp_path, deal=(full + lite) / 2).admit(PROMPT, "single", "r1") == "lite"
+    # lite alone is over the cap: no later day makes it fit, so no deferral
+    assert ledger(tmp_path, deal=lite / 2).admit(PROMPT, "single", "r2") == "fallback"
+
+
+def test_defer_until_rolls_over_at_utc_midnight(tmp_path, clock):
+    led = ledger(tmp_path, daily=1.0)
+    led.admit(PROMPT, "lite", "r1")
+    assert led.defer_until() == NOON + usage._RESERVED_RETRY_S   # only reservations in the way
+    spend(led, "", 1.5)   # calls outside any deal, so the lite estimate stays put
+    midnight = datetime(2026, 3, 3, tzinfo=timezone.utc).timestamp()
+    assert led.defer_until() == midnight
+    clock[0] = midnight + 1
+    assert led.spent_today() == 0
+    assert led.admit(PROMPT, "lite", "r2") == "lite"
@@ -0,0 +1,34 @@
+# tests/test_webhook_admin.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils import webhook
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(webhook, "USAGE", SimpleNamespace(summary=lambda: {"today_usd": 0}, daily=lambda days: [],
+                                                          deal=lambda rid: {"rid": rid}))
+    app = FastAPI()
+    app.include_router(webhook.router, prefix="/webhook")
+    return TestClient(app)
+
+
+def test_remote_callers_are_refused_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(webhook, "ADMIN_TOKEN", "")
+    assert client.get("/webhook/usage").status_code == 403
+    assert client.post("/webhook/digest/flush?force=1").status_code == 403
+
+
+def test_admin_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(webhook, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/webhook/usage").status_code == 401
+    assert client.get("/webhook/metrics", headers={"Authorization": "Bearer nope"}).status_code == 401
+    ok = client.get("/webhook/usage?rid=r1", headers={"Authorization": "Bearer s3cret"})
+    assert ok.status_code == 200 and ok.json() == {"rid": "r1"}
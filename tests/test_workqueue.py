@@ -0,0 +1,69 @@
+# tests/test_workqueue.py
+import time
+
+import pytest
+
+from utils import workqueue
+from utils.priority import LanePolicy
+from utils.status import StatusBoard
+from utils.workqueue import WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(workqueue, "STATUS", StatusBoard(str(tmp_path / "status.db")))
+    return WorkQueue(str(tmp_path / "work.db"), lease_s=0.2, max_attempts=2, policy=LanePolicy())
+
+
+def expire(queue):
+    time.sleep(queue.lease_s + 0.05)
+
+
+def test_expired_lease_is_reclaimed(queue):
+    queue.enqueue("submit", {"rid": "r1"}, job_id="r1")
+    first = queue.claim("w1")
+    assert first["id"] == "r1" and queue.claim("w2") is None   # still leased
+    expire(queue)
+    again = queue.claim("w2")
+    assert again["id"] == "r1" and again["attempts"] == 1
+    assert queue.stats()["leased"] == 1
+
+
+def test_heartbeat_fails_once_another_worker_reclaimed(queue):
+    queue.enqueue("submit", {"rid": "r1"}, job_id="r1")
+    queue.claim("w1")
+    assert queue.heartbeat("r1", "w1")
+    expire(queue)
+    queue.claim("w2")
+    assert not queue.heartbeat("r1", "w1")
+    assert queue.heartbeat("r1", "w2")
+    queue.finish("r1", "w1")   # the stale worker's result is ignored
+    assert queue.stats().get("done") is None
+
+
+def test_gives_up_after_max_attempts(queue):
+    queue.enqueue("submit", {"rid": "r1"}, job_id="r1")
+    for owner in ("w1", "w2"):
+        assert queue.claim(owner)["id"] == "r1"
+        expire(queue)
+    assert queue.claim("w3") is None
+    assert queue.stats()["failed"] == 1
+    assert workqueue.STATUS.summary("r1")["stage"] == "failed"
+
+
+def test_defer_does_not_use_an_attempt(queue):
+    queue.enqueue("submit", {"rid": "r1"}, job_id="r1")
+    for _ in range(3):   # more deferrals than max_attempts
+        queue.claim("w1")
+        queue.defer("r1", "w1", until=time.time())
+    row = queue.claim("w1")
+    assert row["attempts"] == 0   # the row as claimed; this claim makes it 1
+    queue.finish("r1", "w1", error="boom", attempts=1)
+    assert queue.stats()["queued"] == 1   # first real failure is retried, not failed
+
+
+def test_deferred_job_waits_until_its_time(queue):
+    queue.enqueue("submit", {"rid": "r1"}, job_id="r1")
+    queue.claim("w1")
+    queue.defer("r1", "w1", until=time.time() + 60)
+    assert queue.claim("w1") is None
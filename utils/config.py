@@ -13,17 +13,171 @@ SHEET_RANGE         = os.getenv('SHEET_RANGE', 'Sheet1!A1')
 
 GP_RECIPIENTS = os.getenv('GP_RECIPIENTS', '') 
 
-import json, tempfile
+# OpenAI rate governor (starting limits; refined from x-ratelimit-* headers)
+OPENAI_RPM_LIMIT    = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+OPENAI_TPM_LIMIT    = int(os.getenv('OPENAI_TPM_LIMIT', '30000'))
+OPENAI_MAX_RETRIES  = int(os.getenv('OPENAI_MAX_RETRIES', '6'))
+OPENAI_COMPLETION_TOKENS_EST = int(os.getenv('OPENAI_COMPLETION_TOKENS_EST', '3000'))
+
+# Pre-screen tier: off | rules | model. Deals scoring below the threshold get a
+# short email + Sheets row instead of the full memo and PDF.
+PRESCREEN_MODE      = os.getenv('PRESCREEN_MODE', 'off').lower()
+PRESCREEN_MODEL     = os.getenv('PRESCREEN_MODEL', 'gpt-4o-mini')
+PRESCREEN_THRESHOLD = int(os.getenv('PRESCREEN_THRESHOLD', '45'))
+
+# Long-form memo: single (one assistant run) | sections (parallel per-section calls)
+MEMO_MODE                 = os.getenv('MEMO_MODE', 'single').lower()
+MEMO_SECTION_MODEL        = os.getenv('MEMO_SECTION_MODEL', 'gpt-4o')
+MEMO_SECTION_CONCURRENCY  = int(os.getenv('MEMO_SECTION_CONCURRENCY', '6'))
+MEMO_SECTION_MAX_TOKENS   = int(os.getenv('MEMO_SECTION_MAX_TOKENS', '700'))
+MEMO_SECTION_MAX_FAILED   = float(os.getenv('MEMO_SECTION_MAX_FAILED', '0.5'))  # share of failed sections that fails the memo
+
+# Per-deal deadline for the LLM stage (0 = wait as long as it takes). On a miss
+# the GP gets a provisional memo built from the form and the full memo follows.
+MEMO_SLA_S                = float(os.getenv('MEMO_SLA_S', '0'))
+MEMO_RUN_TIMEOUT_S        = float(os.getenv('MEMO_RUN_TIMEOUT_S', '1800'))  # hard cap per assistant run
+MEMO_LLM_THREADS          = int(os.getenv('MEMO_LLM_THREADS', '0'))  # SLA-path LLM stages at once (0 = from DEAL_CONCURRENCY / WORKER_THREADS)
+# Save every finished memo's raw output + form here as a benchmark case (off when empty)
+MEMO_RECORD_DIR           = os.getenv('MEMO_RECORD_DIR', '')
+
+# Hedged assistant runs: start a second run when the first is slower than the
+# given percentile of recent runs; extra runs are capped as a share of all runs.
+HEDGE_ENABLED      = os.getenv('HEDGE_ENABLED', '0') in ('1', 'true', 'True')
+HEDGE_PERCENTILE   = float(os.getenv('HEDGE_PERCENTILE', '90'))
+HEDGE_MIN_SAMPLES  = int(os.getenv('HEDGE_MIN_SAMPLES', '20'))
+HEDGE_MIN_DELAY_S  = float(os.getenv('HEDGE_MIN_DELAY_S', '20'))
+HEDGE_MAX_EXTRA    = float(os.getenv('HEDGE_MAX_EXTRA', '0.1'))
+# Assistant threads are deleted once their memo is read; 1 keeps them for debugging
+ASSISTANT_KEEP_THREADS = os.getenv('ASSISTANT_KEEP_THREADS', '0') in ('1', 'true', 'True')
+
+# Token and cost accounting per deal and stage (prices in USD per 1M tokens,
+# input/output, matched by model-name prefix). Budgets are in USD, 0 = off.
+# Near the daily budget (or for a deal estimated over its own budget) memos
+# are written in lite mode on USAGE_LITE_MODEL; once the daily budget is spent
+# queued deals wait for the next UTC day and inline deals get a form-only memo.
+USAGE_DB_PATH       = os.getenv('USAGE_DB_PATH', '.cache/usage.db')
+USAGE_PRICES        = os.getenv('USAGE_PRICES', 'gpt-4o-mini:0.15/0.60,gpt-4o:2.50/10.00,'
+                                'gpt-4.1-mini:0.40/1.60,gpt-4.1:2.00/8.00')
+USAGE_ASSISTANT_MODEL = os.getenv('USAGE_ASSISTANT_MODEL', 'gpt-4o')   # for cost estimates before a run
+USAGE_LITE_MODEL    = os.getenv('USAGE_LITE_MODEL', 'gpt-4o-mini')
+USAGE_DAILY_BUDGET_USD = float(os.getenv('USAGE_DAILY_BUDGET_USD', '0'))
+USAGE_DEAL_BUDGET_USD  = float(os.getenv('USAGE_DEAL_BUDGET_USD', '0'))
+
+# Rendered PDFs are emailed from memory; set a directory to also keep a copy
+PDF_ARCHIVE_DIR     = os.getenv('PDF_ARCHIVE_DIR', '')
+PDF_ARCHIVE_MAX_FILES = int(os.getenv('PDF_ARCHIVE_MAX_FILES', '0'))   # oldest pruned beyond this; 0 = keep all
+
+# PDF size optimization: core fonts when possible, recompressed streams,
+# optional image downsampling (0 = keep images as rendered)
+PDF_OPTIMIZE        = os.getenv('PDF_OPTIMIZE', '1') in ('1', 'true', 'True')
+PDF_IMAGE_MAX_PX    = int(os.getenv('PDF_IMAGE_MAX_PX', '0'))
+PDF_IMAGE_QUALITY   = int(os.getenv('PDF_IMAGE_QUALITY', '75'))
+
+# Render cache keyed on memo text + renderer version (bounded LRU on disk)
+PDF_CACHE_DIR         = os.getenv('PDF_CACHE_DIR', '.cache/pdf')
+PDF_CACHE_MAX_ENTRIES = int(os.getenv('PDF_CACHE_MAX_ENTRIES', '500'))
+PDF_CACHE_MAX_BYTES   = int(os.getenv('PDF_CACHE_MAX_BYTES', str(200 * 1024 * 1024)))
+
+# Delivery: instant | hourly | daily. Digest modes batch memos into one email
+# per window; "Take a Call" verdicts are always sent right away.
+DELIVERY_MODE       = os.getenv('DELIVERY_MODE', 'instant').lower()
+DIGEST_DIR          = os.getenv('DIGEST_DIR', '.cache/digest')
+DIGEST_ATTACH       = os.getenv('DIGEST_ATTACH', 'pdf').lower()   # pdf | zip
+DIGEST_HOUR_UTC     = int(os.getenv('DIGEST_HOUR_UTC', '13'))     # daily send time
+DIGEST_MAX_ATTACH_BYTES = int(os.getenv('DIGEST_MAX_ATTACH_BYTES', str(18 * 1024 * 1024)))
+
+# Duplicate-company detection before queueing: off | flag | skip
+DEDUPE_MODE         = os.getenv('DEDUPE_MODE', 'flag').lower()
+DEDUPE_INDEX_PATH   = os.getenv('DEDUPE_INDEX_PATH', '.cache/company_index.jsonl')
+DEDUPE_WINDOW_DAYS  = float(os.getenv('DEDUPE_WINDOW_DAYS', '30'))
+DEDUPE_FUZZY_RATIO  = float(os.getenv('DEDUPE_FUZZY_RATIO', '0.9'))
+
+# Every calibrated scorecard (raw subscores + calibration signals) is appended
+# here so rubric changes can be replayed against past deals (utils/rubric.py)
+SCORE_ARCHIVE_PATH  = os.getenv('SCORE_ARCHIVE_PATH', '.cache/score_archive.jsonl')
+
+# Resubmissions of a known company: incremental regenerates only the memo
+# sections and subscores touched by the changed answers; off = full run
+RESUBMIT_MODE       = os.getenv('RESUBMIT_MODE', 'incremental').lower()
+RESUBMIT_DIR        = os.getenv('RESUBMIT_DIR', '.cache/submissions')
+RESUBMIT_MAX_SECTIONS = int(os.getenv('RESUBMIT_MAX_SECTIONS', '5'))   # more changed -> full run
+
+# Work distribution: inline (run in the web process via BackgroundTasks) |
+# queue (webhooks only enqueue; workers claim deals with renewable leases).
+# Workers run in every web process (WORKER_THREADS) and/or standalone via
+# `python -m utils.workqueue`, on the host that holds WORK_DB_PATH (SQLite:
+# local disk only, not a network share).
+WORK_MODE           = os.getenv('WORK_MODE', 'inline').lower()
+WORK_DB_PATH        = os.getenv('WORK_DB_PATH', '.cache/work.db')
+WORK_LEASE_S        = float(os.getenv('WORK_LEASE_S', '90'))
+WORK_MAX_ATTEMPTS   = int(os.getenv('WORK_MAX_ATTEMPTS', '3'))
+WORKER_THREADS      = int(os.getenv('WORKER_THREADS', '2'))
+WORK_RETAIN_DAYS    = float(os.getenv('WORK_RETAIN_DAYS', '7'))   # finished jobs kept this long
+
+# Priority lanes: deals are sorted into high/normal/low from their answers
+# (lead investor, round, warm intro) and dequeued by weight; a deal moves up
+# one lane per PRIORITY_AGING_S waited so low lanes never starve.
+# DEAL_CONCURRENCY caps deals running at once in inline mode (0 = no cap,
+# lanes then have nothing to order); queue mode is capped by its workers.
+PRIORITY_WEIGHTS    = os.getenv('PRIORITY_WEIGHTS', 'high:6,normal:3,low:1')
+PRIORITY_AGING_S    = float(os.getenv('PRIORITY_AGING_S', '900'))
+DEAL_CONCURRENCY    = int(os.getenv('DEAL_CONCURRENCY', '0'))
+
+# Per-deal stage events for GET /webhook/status/{rid} and its SSE stream
+STATUS_DB_PATH      = os.getenv('STATUS_DB_PATH', '.cache/status.db')
+STATUS_TTL_DAYS     = float(os.getenv('STATUS_TTL_DAYS', '7'))
+
+# Operator endpoints (/webhook/metrics, /webhook/usage, /webhook/digest/flush):
+# `Authorization: Bearer <ADMIN_TOKEN>` when set, else loopback callers only
+ADMIN_TOKEN         = os.getenv('ADMIN_TOKEN', '')
+
+# Typeform field map: built-in (utils/field_map.py) unless a JSON schema file is
+# given; the file is re-read when it changes, at most every FORM_SCHEMA_CHECK_S
+FORM_SCHEMA_PATH    = os.getenv('FORM_SCHEMA_PATH', '')
+FORM_SCHEMA_CHECK_S = float(os.getenv('FORM_SCHEMA_CHECK_S', '2'))
+
+# Pitch deck ingestion
+TYPEFORM_TOKEN      = os.getenv('TYPEFORM_TOKEN', '')  # Typeform file URLs need auth
+DECK_MAX_BYTES      = int(os.getenv('DECK_MAX_BYTES', str(25 * 1024 * 1024)))
+DECK_TIMEOUT_S      = float(os.getenv('DECK_TIMEOUT_S', '20'))
+DECK_CACHE_DIR      = os.getenv('DECK_CACHE_DIR', '.cache/decks')
+DECK_SUMMARY_CHARS  = int(os.getenv('DECK_SUMMARY_CHARS', '2500'))
+DECK_WORKERS        = int(os.getenv('DECK_WORKERS', '4'))
+DECK_URL_TTL_H      = float(os.getenv('DECK_URL_TTL_H', '24'))   # URL -> deck mapping; texts are keyed by content
+DECK_CACHE_MAX_BYTES = int(os.getenv('DECK_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Website enrichment: homepage (plus press / LinkedIn links when given) fetched
+# alongside the deck, reduced to a short summary for the prompt, cached per URL.
+# Private / loopback addresses are refused (for deck downloads too) unless
+# ENRICH_ALLOW_PRIVATE is set.
+ENRICH_ENABLED      = os.getenv('ENRICH_ENABLED', '1') in ('1', 'true', 'True')
+ENRICH_TIMEOUT_S    = float(os.getenv('ENRICH_TIMEOUT_S', '8'))
+ENRICH_MAX_BYTES    = int(os.getenv('ENRICH_MAX_BYTES', str(1536 * 1024)))
+ENRICH_MAX_URLS     = int(os.getenv('ENRICH_MAX_URLS', '4'))
+ENRICH_CONCURRENCY  = int(os.getenv('ENRICH_CONCURRENCY', '4'))
+ENRICH_SUMMARY_CHARS = int(os.getenv('ENRICH_SUMMARY_CHARS', '1500'))
+ENRICH_CACHE_DIR    = os.getenv('ENRICH_CACHE_DIR', '.cache/enrich')
+ENRICH_TTL_H        = float(os.getenv('ENRICH_TTL_H', '72'))
+ENRICH_ALLOW_PRIVATE = os.getenv('ENRICH_ALLOW_PRIVATE', '0') in ('1', 'true', 'True')
+
+import hashlib, json, tempfile
 
 GOOGLE_TOKEN_JSON = os.getenv("GOOGLE_TOKEN_JSON", "")
 if GOOGLE_TOKEN_JSON:
     try:
         info = json.loads(GOOGLE_TOKEN_JSON)
-        tmp = tempfile.NamedTemporaryFile(prefix="google_token_", suffix=".json", delete=False)
-        tmp.write(json.dumps(info).encode("utf-8"))
-        tmp.flush()
+        # one file per token content, reused by every process and restart
+        # (a fresh NamedTemporaryFile per import piled up in /tmp)
+        data = json.dumps(info).encode("utf-8")
+        path = os.path.join(tempfile.gettempdir(),
+                            f"google_token_{hashlib.sha256(data).hexdigest()[:16]}.json")
+        if not os.path.exists(path):
+            fd, tmp = tempfile.mkstemp(prefix="google_token_", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
         # this is what email.py & sheet.py use
-        GOOGLE_TOKEN_PATH = tmp.name
+        GOOGLE_TOKEN_PATH = path
     except Exception:
         pass
 
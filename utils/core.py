@@ -1,21 +1,46 @@
 from pydantic import BaseModel
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union
+import asyncio
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from openai import OpenAI
-from memo_schema import MemoPayload
+from utils.memo_schema import MemoPayload
 import re
 from utils.config import (
     OPENAI_API_KEY, OPENAI_ASSISTANT_ID, GOOGLE_TOKEN_PATH,
     GMAIL_SENDER, SPREADSHEET_ID, SHEET_RANGE,
     # optional: read recipients from .env (comma-separated)
     # e.g., GP_RECIPIENTS=gp1@vc.com, gp2@vc.com
-    GP_RECIPIENTS,
+    GP_RECIPIENTS, PRESCREEN_MODE, PRESCREEN_THRESHOLD, MEMO_MODE, PDF_ARCHIVE_DIR,
+    MEMO_SECTION_CONCURRENCY, MEMO_SLA_S, MEMO_RUN_TIMEOUT_S, MEMO_SECTION_MODEL, USAGE_LITE_MODEL,
+    USAGE_ASSISTANT_MODEL, ASSISTANT_KEEP_THREADS, MEMO_RECORD_DIR, DEDUPE_MODE,
+    MEMO_LLM_THREADS, DEAL_CONCURRENCY, WORKER_THREADS,
 )
 
 
-from utils.pdf import generate_pdf_from_text
-from utils.email import send_email_oauth
-from utils.sheet import append_row_oauth
+from utils.ratelimit import GOVERNOR, estimate_tokens
+from utils.hedge import HEDGE
+from utils.prescreen import prescreen, score_rules
+from utils.fallback import build_fallback_memo
+from utils.form_schema import other_answers
+from utils.sections import (
+    generate_memo_sections, stitch_sections, build_section_context, generate_section, SectionsFailed,
+)
+from utils.deck import ingest_deck
+from utils.enrich import enrich_company
+from utils.pdf import archive_pdf_async, safe_filename
+from utils.pdf_cache import render_pdf_cached
+from utils.memo_doc import MemoDoc, parse_memo, render_html, render_text, splice_sections
+from utils.digest import deliver_memo
+from utils.traction import extract_metrics
+from utils.rubric import DEFAULT_RUBRIC, Rubric, archive_scorecard, has_moat_keyword
+from utils.sheet import append_row_oauth, update_row_oauth, appended_row_number, row_range
+from utils.resubmit import STORE, full_instruction, MINI_INSTRUCTIONS, plan_update, rescore
+from utils.status import STATUS
+from utils.dedupe import INDEX
+from utils.usage import USAGE, BudgetDeferred, bind, carry
+from utils.memo_record import record_memo
 
 client = OpenAI(api_key=OPENAI_API_KEY)
 
@@ -29,16 +54,112 @@ class StartupInfo(BaseModel):
     product: str
     email_to: str  # keep for backward-compat; we can still add a 2nd GP below
 
-def build_memo_with_assistant(prompt: str) -> str:
-    thread = client.beta.threads.create()
-    client.beta.threads.messages.create(thread_id=thread.id, role="user", content=prompt)
-    run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id=OPENAI_ASSISTANT_ID)
+_ACTIVE = ("queued", "in_progress", "cancelling")
+
+def _start_thread(prompt: str) -> str:
+    thread = GOVERNOR.call(client.beta.threads.with_raw_response.create)
+    GOVERNOR.call(client.beta.threads.messages.with_raw_response.create,
+                  thread_id=thread.id, role="user", content=prompt)
+    return thread.id
+
+def _start_run(thread_id: str, est_tokens: int) -> Dict[str, Any]:
+    run = GOVERNOR.call(client.beta.threads.runs.with_raw_response.create,
+                        thread_id=thread_id, assistant_id=OPENAI_ASSISTANT_ID,
+                        tokens=est_tokens)
+    HEDGE.record_run()
+    return {"thread_id": thread_id, "run_id": run.id, "t0": time.time()}
+
+def _cancel_run(h: Dict[str, Any]):
+    try:
+        GOVERNOR.call(client.beta.threads.runs.with_raw_response.cancel,
+                      thread_id=h["thread_id"], run_id=h["run_id"])
+    except Exception as e:
+        print(f"CANCEL {h['run_id']} failed: {e}", flush=True)
+
+def _delete_threads(thread_ids):
+    # threads are otherwise kept server-side forever, one (or two, hedged) per deal
+    if ASSISTANT_KEEP_THREADS:
+        return
+    for tid in thread_ids:
+        try:
+            GOVERNOR.call(client.beta.threads.with_raw_response.delete, thread_id=tid)
+        except Exception as e:
+            print(f"THREAD {tid} not deleted: {e}", flush=True)
+
+def _run_assistant(thread_id: str, est_tokens: int, prompt: str, stage: str = "memo") -> str:
+    """
+    Drive a run on `thread_id` to completion and return the thread that won.
+    With hedging on, a slow run gets a backup run on a fresh thread; the first
+    to complete wins and the other is cancelled. Runs that die on rate limits
+    are restarted with backoff. Gives up after MEMO_RUN_TIMEOUT_S. Every thread
+    but the winner is deleted on the way out; the caller deletes the winner.
+    """
+    threads = {thread_id}
+    winner = None
+    try:
+        winner = _await_runs(thread_id, est_tokens, prompt, stage, threads)
+        return winner
+    finally:
+        _delete_threads(threads - {winner})
+
+def _await_runs(thread_id: str, est_tokens: int, prompt: str, stage: str, threads: set) -> str:
+    t0 = time.time()
+    runs = [_start_run(thread_id, est_tokens)]
+    asked, hedged, attempt = False, False, 0
     while True:
-        r = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        if r.status == "completed":
-            break
         time.sleep(1)
-    msgs = client.beta.threads.messages.list(thread_id=thread.id)
+        if time.time() - t0 > MEMO_RUN_TIMEOUT_S:
+            for h in runs:
+                _cancel_run(h)
+            HEDGE.record_duration(time.time() - t0, censored=True)
+            raise TimeoutError(f"Assistant run still active after {MEMO_RUN_TIMEOUT_S:.0f}s")
+        for h in list(runs):
+            r = GOVERNOR.call(client.beta.threads.runs.with_raw_response.retrieve,
+                              thread_id=h["thread_id"], run_id=h["run_id"])
+            if r.status in _ACTIVE:
+                continue
+            usage = getattr(r, "usage", None)
+            GOVERNOR.settle(est_tokens, getattr(usage, "total_tokens", None))
+            USAGE.record(stage, getattr(r, "model", None) or USAGE_ASSISTANT_MODEL, usage)
+            runs.remove(h)
+            if r.status == "completed":
+                # the primary's time to the deal's first completion: exact when it won,
+                # a lower bound (censored) when a hedge beat it and it is cancelled
+                HEDGE.record_duration(time.time() - t0, censored=h["thread_id"] != thread_id)
+                for other in runs:
+                    _cancel_run(other)
+                HEDGE.record_outcome(hedged, h["thread_id"] != thread_id, time.time() - t0)
+                return h["thread_id"]
+            err = getattr(r, "last_error", None)
+            if runs:
+                continue  # the other run may still finish
+            if r.status == "failed" and getattr(err, "code", "") == "rate_limit_exceeded" \
+                    and attempt < GOVERNOR.max_retries:
+                GOVERNOR.stats["rate_limited"] += 1
+                time.sleep(GOVERNOR.backoff(attempt))
+                attempt += 1
+                runs.append(_start_run(h["thread_id"], est_tokens))
+                continue
+            raise RuntimeError(f"Assistant run {h['run_id']} ended with status {r.status}: {err}")
+        if not asked and runs:
+            decision = HEDGE.decide(time.time() - t0)
+            asked = decision is not None  # decided either way; don't ask again for this deal
+            if decision and USAGE.over_deal_budget():
+                print("HEDGE skipped: deal budget spent", flush=True)
+            elif decision:
+                hedged = True
+                print(f"HEDGE firing after {time.time() - t0:.0f}s", flush=True)
+                hedge_thread = _start_thread(prompt)
+                threads.add(hedge_thread)
+                runs.append(_start_run(hedge_thread, est_tokens))
+
+def build_memo_with_assistant(prompt: str, stage: str = "memo") -> str:
+    est_tokens = estimate_tokens(prompt)
+    thread_id = _run_assistant(_start_thread(prompt), est_tokens, prompt, stage)
+    try:
+        msgs = GOVERNOR.call(client.beta.threads.messages.with_raw_response.list, thread_id=thread_id)
+    finally:
+        _delete_threads([thread_id])
     for m in msgs.data:
         if m.role == "assistant":
             return m.content[0].text.value
@@ -68,12 +189,23 @@ def _build_prompt(info: StartupInfo, extra: Optional[Dict[str, Any]]) -> str:
     press_links = extra.get("press_links", "")
     round_size = extra.get("round_size", "")
     industry = extra.get("industry", "")
+    deck_summary = extra.get("deck_summary", "")
+    deck_block = (f"\nPitch deck notes (extracted from their deck; use as source material):\n{deck_summary}\n"
+                  if deck_summary else "")
+    web_summary = extra.get("web_summary", "")
+    if web_summary:
+        deck_block += (f"\nFrom their website and linked pages (fetched today; use to verify the answers "
+                       f"and for founder experience):\n{web_summary}\n")
+    others = other_answers(extra)
+    if others:
+        deck_block += ("\nMore answers from the form (use each in the section it belongs to):\n"
+                       + "\n".join(f"- {label}: {text}" for label, text in others) + "\n")
 
     return f"""
 You are a venture capital associate writing two outputs:
 
 First, a **mini deal memo email** using the real company info below. Then, a full investor memo for PDF.
-
+{deck_block}
 ---
 
 ### MINI DEAL MEMO EMAIL
@@ -265,16 +397,8 @@ def extract_action(text: str) -> str:
 
 
 def extract_revenue(traction_text: str) -> str:
-    patterns = [
-        r"\$[0-9][0-9,\.]*\s*[kKmM]?\s*(?:ARR|MRR|annual|monthly)?",  # $450K ARR, $20k MRR, $1.2M
-        r"[0-9][0-9,\.]*\s*(?:users|customers|clients)\b",            # 6 customers (proxy)
-        r"\b[0-9]+\s*(?:paying customers|subs|subscriptions)\b"
-    ]
-    for p in patterns:
-        m = re.search(p, traction_text, re.IGNORECASE)
-        if m:
-            return m.group(0)
-    return "Unknown"
+    # $450K ARR, $20k MRR, ARR of $1.2M; customer/user counts as a proxy
+    return extract_metrics(traction_text).revenue_text or "Unknown"
 
 
 def extract_reason(full_memo: str, summary: str) -> str:
@@ -336,7 +460,7 @@ def parse_scorecard_bullets(text: str):
         scores["risk_adj"], scores["bonus"]
     ])
     # fallback verdict from total
-    verdict = "TAKE_CALL" if total >= 82 else "LEARN_MORE" if total >= 70 else "PASS"
+    verdict = DEFAULT_RUBRIC.verdict(total)
     return {"scores": scores, "total": total, "verdict": verdict}
 
 def parse_score_any(mini: str, full: str):
@@ -347,32 +471,13 @@ def parse_score_any(mini: str, full: str):
     if m and isinstance(m.get("total"), int): return m
     return parse_scorecard_bullets(full)
 
-def _parse_mrr(text: str) -> int | None:
-    m = re.search(r"\$?\s*([\d.,]+)\s*([kKmM])?\s*MRR", text or "", re.I)
-    if not m: return None
-    n = float(m.group(1).replace(",", ""))
-    unit = (m.group(2) or "").lower()
-    if unit == "k": n *= 1_000
-    if unit == "m": n *= 1_000_000
-    return int(n)
-
-def calibrate_scorecard(mini_memo: str, sc: dict) -> dict:
-    s = (sc.get("scores") or {}).copy()
-    # traction floor for Seed $100k+ MRR
-    mrr = _parse_mrr(extract_field("Traction", mini_memo))
-    if isinstance(mrr, int) and mrr >= 100_000:
-        s["traction"] = max(s.get("traction", 0), 9)
-    # clamp typical risk
-    s["risk_adj"] = max(s.get("risk_adj", 0), -3)
-    # moat nudge if defensibility keywords present
-    moat_src = (extract_field("Moat / Defensibility", mini_memo) or "").lower()
-    if any(k in moat_src for k in ["government api", "gov api", "compliance", "biometric", "white-label", "white label", "proprietary data", "dpa", "soc2", "iso 27001"]):
-        s["moat"] = max(s.get("moat", 0), 20)
-    total = (s.get("team",0)+s.get("market",0)+s.get("product",0)+s.get("vision",0)+
-             s.get("traction",0)+s.get("business_model",0)+s.get("moat",0)+
-             s.get("risk_adj",0)+s.get("bonus",0))
-    verdict = "TAKE_CALL" if total >= 80 else "LEARN_MORE" if total >= 70 else "PASS"
-    sc["scores"], sc["total"], sc["verdict"] = s, int(round(total)), verdict
+def calibrate_scorecard(mini_memo: str, sc: dict, rubric: Rubric = DEFAULT_RUBRIC) -> dict:
+    # traction floor for $100k+ MRR, typical-risk clamp, moat nudge on defensibility keywords
+    mrr = extract_metrics(extract_field("Traction", mini_memo)).mrr
+    moat_kw = has_moat_keyword(extract_field("Moat / Defensibility", mini_memo))
+    sc["raw_scores"] = dict(sc.get("scores") or {})
+    sc["signals"] = {"mrr": mrr, "moat_keyword": moat_kw}
+    sc["scores"], sc["total"], sc["verdict"] = rubric.apply(sc["raw_scores"], mrr, moat_kw)
     return sc
 
 def build_decision_rationale(mini: str, sc: dict) -> str:
@@ -387,7 +492,7 @@ def build_decision_rationale(mini: str, sc: dict) -> str:
         reasons.append(f"Business model unclear ({s.get('business_model',0)}/5): pricing/expansion motion needs detail.")
     # positive drivers
     tr_txt = extract_field("Traction", mini)
-    mrr = _parse_mrr(tr_txt or "")
+    mrr = extract_metrics(tr_txt or "").mrr
     if isinstance(mrr, int) and mrr >= 100_000:
         reasons.append(f"Strong traction (≈${mrr:,} MRR) supports demand.")
     if s.get("team",0) >= 20:
@@ -422,12 +527,14 @@ SECTION_ALIASES = {
 ALL_HEADERS = sorted({h for k, vs in SECTION_ALIASES.items() for h in ([k] + vs)},
                      key=len, reverse=True)
 
-def extract_field(label: str, text: str) -> str:
+def extract_field(label: str, text: Union[str, MemoDoc]) -> str:
     """
     Find the block after a header matching `label` or any alias, until the next known header.
-    Handles optional emoji and **bold** in headings.
+    Handles optional emoji and **bold** in headings. Pass a parsed MemoDoc to skip the regex scan.
     """
     labels = SECTION_ALIASES.get(label, [label])
+    if isinstance(text, MemoDoc):
+        return text.field(labels)
 
     # Build the alternations for CURRENT header and for the lookahead to the NEXT header
     label_re = "(?:" + "|".join(re.escape(x) for x in labels) + ")"
@@ -442,20 +549,6 @@ def extract_field(label: str, text: str) -> str:
     m = re.search(pattern, text)
     return m.group(1).strip() if m else "Unknown"
 
-def extract_field(label: str, text: str) -> str:
-    """
-    Extract the block after a header that matches `label` or any of its aliases.
-    Emoji and **bold** are optional; match until the next known header or end of text.
-    """
-    labels = SECTION_ALIASES.get(label, [label])
-    label_re = "|".join(re.escape(x) for x in labels)
-    next_re  = "|".join(re.escape(x) for x in ALL_HEADERS)
-    # optional emoji/symbols at start, optional **bold**
-    header = rf"^\s*(?:[🏷️📈🔍🛠📊💵🧱👥🚩🧪]\s*)?\**{re.escape(label)}\**\s*$"
-    pattern = rf"(?ims){header}\n+(.*?)(?=^\s*(?:[🏷️📈🔍🛠📊💵🧱👥🚩🧪]\s*)?\**(?:{next_headers})\**\s*$|\Z)"
-    m = re.search(pattern, text)
-    return m.group(1).strip() if m else "Unknown"
-
 # --- TAGGING ---------------------------------------------------------------
 # --- Auto-tagging -----------------------------------------------------------
 TAG_RULES = [
@@ -518,41 +611,235 @@ def infer_tags(
 
 
 
-def process_deal(name: str, email_to, prompt: str):
-    full_output = build_memo_with_assistant(prompt)
-
+def _chat_memo(prompt: str, model: str, max_tokens: int = 1500) -> str:
+    resp = GOVERNOR.call(client.chat.completions.with_raw_response.create,
+                         model=model, messages=[{"role": "user", "content": prompt}],
+                         max_tokens=max_tokens, tokens=estimate_tokens(prompt, max_tokens))
+    USAGE.record("mini", model, resp.usage)
+    return resp.choices[0].message.content or ""
+
+def _mini_only_prompt(prompt: str) -> str:
+    # the long-form memo is produced section by section; keep only the email part
+    head = prompt.split("### FULL DEAL MEMO", 1)[0].rstrip().rstrip("-").rstrip()
+    return head + "\n\nOnly write the mini deal memo email; the full memo is generated separately.\n"
+
+def generate_outputs(prompt: str, info: Optional[StartupInfo] = None,
+                     extra: Optional[Dict[str, Any]] = None, memo_mode: str = MEMO_MODE):
+    """Returns (mini_memo, full_memo)."""
+    if memo_mode == "sections" and info is not None:
+        # mini memo (assistant) runs alongside the section requests
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            mini_f = ex.submit(carry(build_memo_with_assistant), _mini_only_prompt(prompt), "mini")
+            parts = generate_memo_sections(client, info, extra)
+            mini_memo = mini_f.result()
+        return mini_memo.strip(), stitch_sections(list(parts.items()))
+    if memo_mode == "lite" and info is not None:
+        # over budget: chat completions on the cheaper model, no assistant run
+        with ThreadPoolExecutor(max_workers=1) as ex:
+            mini_f = ex.submit(carry(_chat_memo), _mini_only_prompt(prompt), USAGE_LITE_MODEL)
+            parts = generate_memo_sections(client, info, extra, model=USAGE_LITE_MODEL)
+            mini_memo = mini_f.result()
+        return mini_memo.strip(), stitch_sections(list(parts.items()))
+
+    return split_memo_output(build_memo_with_assistant(prompt))
+
+def split_memo_output(full_output: str):
+    """One assistant reply -> (mini_memo, full_memo); without the marker both are the whole reply."""
     if "### FULL DEAL MEMO" in full_output:
         mini_memo, full_memo = full_output.split("### FULL DEAL MEMO", 1)
     else:
         mini_memo = full_output
         full_memo = full_output
+    return mini_memo.strip(), full_memo.strip()
+
+
+# LLM stages that outlive their deal's deadline keep running here. Sized for
+# every deal that can be in flight plus as many late stages still finishing.
+_LLM_POOL = ThreadPoolExecutor(
+    max_workers=MEMO_LLM_THREADS or 2 * max(4, DEAL_CONCURRENCY, WORKER_THREADS), thread_name_prefix="llm")
+
+def _submit_llm(fn, *args, rid: Optional[str] = None):
+    """Submit to _LLM_POOL; the returned event is set when the job leaves the pool's queue."""
+    started = threading.Event()
+    def run(*a):
+        started.set()
+        return fn(*a)
+    return _LLM_POOL.submit(carry(run, rid), *args), started
+
+def process_deal(name: str, email_to, prompt: str, info: Optional[StartupInfo] = None,
+                 extra: Optional[Dict[str, Any]] = None, memo_mode: str = MEMO_MODE,
+                 answers: Optional[Dict[str, str]] = None, rid: Optional[str] = None,
+                 sheet_row: Optional[int] = None, deadline: Optional[float] = None):
+    bind(rid)
+    memo_mode = USAGE.admit(prompt, memo_mode, rid)
+    if memo_mode == "defer":
+        raise BudgetDeferred(USAGE.defer_until())
+    if memo_mode == "fallback" and info is not None:
+        return _provisional_deal(name, prompt, info, extra, None, memo_mode, answers, rid, sheet_row,
+                                 reason="the model budget can't cover a memo")
+    STATUS.mark(rid, "generating", mode=memo_mode)
+    if MEMO_SLA_S <= 0 or info is None:
+        try:
+            mini_memo, full_memo = generate_outputs(prompt, info, extra, memo_mode)
+        except SectionsFailed as e:
+            if info is None or not USAGE.over_deal_budget():
+                raise   # transient: the queue retries the deal
+            print(f"SECTIONS {name}: {e}; deal budget spent, sending the form-only memo", flush=True)
+            return _provisional_deal(name, prompt, info, extra, None, memo_mode, answers, rid, sheet_row,
+                                     reason="this deal's model budget ran out mid-memo")
+        return _finish_deal(name, prompt, info, extra, mini_memo, full_memo, answers=answers, rid=rid,
+                            sheet_row=sheet_row)
+
+    deadline = deadline or time.time() + MEMO_SLA_S
+    queued = time.time()
+    fut, started = _submit_llm(generate_outputs, prompt, info, extra, memo_mode)
+    started.wait()
+    deadline += time.time() - queued   # time spent waiting for a pool thread is not the model's
+    try:
+        mini_memo, full_memo = fut.result(timeout=max(0.0, deadline - time.time()))
+    except FuturesTimeout:
+        print(f"SLA {name}: LLM stage missed its {MEMO_SLA_S:.0f}s deadline; sending provisional memo", flush=True)
+        return _provisional_deal(name, prompt, info, extra, fut, memo_mode, answers, rid, sheet_row)
+    except Exception as e:
+        print(f"SLA {name}: LLM stage failed ({e}); sending provisional memo", flush=True)
+        return _provisional_deal(name, prompt, info, extra, fut, memo_mode, answers, rid, sheet_row,
+                                 failed=True)
+    return _finish_deal(name, prompt, info, extra, mini_memo, full_memo, answers=answers, rid=rid,
+                        sheet_row=sheet_row)
+
+
+def _provisional_deal(name: str, prompt: str, info: StartupInfo, extra: Optional[Dict[str, Any]],
+                      fut, memo_mode: str, answers: Optional[Dict[str, str]], rid: Optional[str],
+                      sheet_row: Optional[int], reason: Optional[str] = None, failed: bool = False):
+    """
+    Form-only mini memo and rule-based score now; the full memo follows on `fut`
+    (`failed`: it raised rather than ran late, and is retried once).
+    Without a `fut` (budget spent) the form-only memo is all the deal gets.
+    """
+    memo = build_fallback_memo(info, extra, MEMO_SLA_S, reason=reason, failed=failed)
+    doc = parse_memo(memo)
+    sc = calibrate_scorecard(doc, score_rules(info, extra))
+    score_block = build_decision_rationale(doc, sc)
+    email_doc = doc.email_body() + parse_memo(score_block)
+    summary = doc.summary()
+
+    gp_list = [e.strip() for e in (GP_RECIPIENTS or "").split(",") if e.strip()]
+    if not gp_list:
+        raise RuntimeError("No GP_RECIPIENTS set; refusing to send.")
+    delivery = deliver_memo(
+        gp_list,
+        subject=f"Deal Memo ({'provisional' if fut is not None else 'form only'}) – {name} ({info.round})",
+        text=render_text(parse_memo(f"Hi GP,\n\n{summary}") + email_doc),
+        html_body=render_html(parse_memo(f"Hi GP,\n\n{summary}") + email_doc),
+        pdf_bytes=None,
+        pdf_name=None,
+        meta={"name": name, "round": info.round, "total": sc["total"], "verdict": sc["verdict"],
+              "summary": summary, "mrr": sc["signals"]["mrr"]},
+    )
 
-    mini_memo = mini_memo.strip()
-    full_memo = full_memo.strip()
+    traction = extra.get("traction_detail", "") if extra else ""
+    traction = traction or info.traction or "Unknown"
+    action = {"TAKE_CALL": "📞 Take a Call", "LEARN_MORE": "⚖️ Learn More", "PASS": "❌ Pass"}[sc["verdict"]]
+    values = [name, summary, traction, extract_revenue(traction), info.team or "Unknown", info.round,
+              ", ".join(infer_tags(memo, info, extra)) or "AI", str(sc["total"]),
+              ("Provisional memo sent" if fut is not None else "Form-only memo sent") if delivery == "sent"
+              else "Queued for digest", action,
+              ("Provisional (form only): " + ", ".join(f"{k} {v}" for k, v in sc["scores"].items()))[:500]]
+    if sheet_row:
+        update_row_oauth(token_path=GOOGLE_TOKEN_PATH, spreadsheet_id=SPREADSHEET_ID,
+                         range_name=row_range(SHEET_RANGE, sheet_row), values=values)
+    else:
+        sheet_row = appended_row_number(append_row_oauth(
+            token_path=GOOGLE_TOKEN_PATH, spreadsheet_id=SPREADSHEET_ID,
+            range_name=SHEET_RANGE, values=values))
+    STATUS.mark(rid, "provisional", delivery=delivery, verdict=sc["verdict"], sheet_row=sheet_row)
+    _remember_company(info, extra, rid)
+    if fut is None:
+        USAGE.release(rid)
+        STATUS.mark(rid, "done", verdict=sc["verdict"], total=sc["total"], form_only=True)
+        return {"ok": True, "pdf": None, "provisional": True}
+
+    _full_memo_followup(name, prompt, info, extra, fut, memo_mode, answers, rid, sheet_row)
+    return {"ok": True, "pdf": None, "provisional": True}
+
+def _full_memo_followup(name: str, prompt: str, info: StartupInfo, extra: Optional[Dict[str, Any]],
+                        fut, memo_mode: str, answers: Optional[Dict[str, str]], rid: Optional[str],
+                        sheet_row: Optional[int], attempt: int = 0):
+    # when the late LLM stage lands, send the real memo into the same row; retry once on failure
+    def _done(f):
+        try:
+            mini_memo, full_memo = f.result()
+        except Exception as e:
+            print(f"SLA {name}: full memo attempt {attempt + 1} failed: {e}", flush=True)
+            retry = attempt == 0 and not USAGE.over_deal_budget(rid or "")
+            if not retry:
+                USAGE.release(rid)
+            STATUS.mark(rid, "retrying" if retry else "failed", error=str(e)[:500])
+            if retry:
+                _full_memo_followup(name, prompt, info, extra,
+                                    _submit_llm(generate_outputs, prompt, info, extra, memo_mode,
+                                                rid=rid or "")[0],
+                                    memo_mode, answers, rid, sheet_row, attempt=1)
+            return
+        try:
+            _finish_deal(name, prompt, info, extra, mini_memo, full_memo, answers=answers, rid=rid,
+                         sheet_row=sheet_row, followup=True)
+        except Exception as e:
+            print(f"SLA {name}: follow-up delivery failed: {e}", flush=True)
+            STATUS.mark(rid, "failed", error=str(e)[:500])
+    fut.add_done_callback(_done)
+
+
+def _finish_deal(name: str, prompt: str, info: Optional[StartupInfo], extra: Optional[Dict[str, Any]],
+                 mini_memo: str, full_memo: str, answers: Optional[Dict[str, str]] = None,
+                 rid: Optional[str] = None, raw_scores: Optional[Dict[str, Any]] = None,
+                 sheet_row: Optional[int] = None, changed: Optional[List[str]] = None,
+                 followup: bool = False):
+    """
+    Render, score, deliver and log a finished memo. A resubmission passes its
+    reused subscores, the Sheet row to overwrite and the changed answer keys;
+    a follow-up to a provisional memo passes that memo's Sheet row.
+    """
+    if MEMO_RECORD_DIR and not changed and info is not None:
+        # raw model output + form, for the offline regression corpus (utils/memo_bench.py)
+        record_memo(MEMO_RECORD_DIR, name, info, extra, mini_memo, full_memo)
 
-    pdf_path = f"output/{name}_DealMemo.pdf"
-    generate_pdf_from_text(full_memo, pdf_path)
+    # parse once; the PDF, the email and the Sheets fields all read from these
+    mini_doc = parse_memo(mini_memo)
+    full_doc = parse_memo(full_memo)
+    STATUS.mark(rid, "parsed", sections=len(full_doc.sections))
+
+    pdf_bytes = render_pdf_cached(full_memo, doc=full_doc)
+    pdf_name = f"{safe_filename(name)}_DealMemo.pdf"
+    STATUS.mark(rid, "pdf", bytes=len(pdf_bytes or b""))
+    pdf_path = archive_pdf_async(pdf_bytes, name, PDF_ARCHIVE_DIR) if PDF_ARCHIVE_DIR else None
 
         # ---------- build combined email body ----------
     # 1) intro paragraph (merge the “two emails”)
-    intro_summary = extract_summary(mini_memo)
+    model_summary = mini_doc.summary()
+    intro_summary = model_summary
     if not intro_summary:
         # safe fallback if model didn’t provide a good summary
-        intro_summary = f"Here is a mini memo for {name}. They are raising a {info_round_from_prompt(prompt)} round, with interest from {extract_field('Startup Overview', mini_memo) or 'notable investors'}."
-
-    intro = f"Hi GP,\n\n{intro_summary}\n\nFull PDF memo attached."
-
-    # 2) keep the model’s sections but strip greeting/header duplication
-    mini_body = strip_greeting(mini_memo)
-    # drop any 'Full PDF memo attached' lines from the model body to avoid duplicates
-    mini_body = re.sub(r"(?i)^.*Full (PDF )?memo attached.*\n?", "", mini_body, flags=re.M)
-
-    # 3) scoring + rationale (deterministic)
-    sc = parse_score_any(mini_memo, full_memo) or {"scores": {}}
-    sc = calibrate_scorecard(mini_memo, sc)
-    score_block = build_decision_rationale(mini_memo, sc)
-
-    combined_email = "### EMAIL\n\n" + intro + "\n\n" + mini_body + "\n\n" + score_block + "\n"
+        intro_summary = f"Here is a mini memo for {name}. They are raising a {info_round_from_prompt(prompt)} round, with interest from {extract_field('Startup Overview', mini_doc) or 'notable investors'}."
+
+    intro = f"Hi GP,\n\n{intro_summary}"
+    if changed:
+        intro += (f"\n\nUpdated after a resubmission ({', '.join(changed)}); "
+                  f"the other sections are unchanged.")
+    elif followup:
+        intro += "\n\nThis is the full memo following the provisional one sent earlier."
+
+    # 2) scoring + rationale (deterministic)
+    sc = ({"scores": dict(raw_scores)} if raw_scores is not None
+          else parse_score_any(mini_memo, full_memo) or {"scores": {}})
+    sc = calibrate_scorecard(mini_doc, sc)
+    score_block = build_decision_rationale(mini_doc, sc)
+    archive_scorecard(name, sc["raw_scores"], sc["signals"]["mrr"], sc["signals"]["moat_keyword"],
+                      sc["total"], sc["verdict"])
+
+    # 3) keep the model’s sections minus greeting, scorecard JSON and 'attached' lines
+    email_doc = parse_memo(intro) + mini_doc.email_body() + parse_memo(score_block)
+    combined_email = render_text(email_doc)
 
     # ---------- send one email ----------
     gp_list = [e.strip() for e in (GP_RECIPIENTS or "").split(",") if e.strip()]
@@ -563,60 +850,55 @@ def process_deal(name: str, email_to, prompt: str):
     # Prefer explicit GP recipients from env; do NOT email founder by default
     # if empty, nothing is sent; that’s safer than emailing founder
 
-    send_email_oauth (
-    token_path=GOOGLE_TOKEN_PATH,
-    sender=GMAIL_SENDER,
-    to=recipients,
-    subject=f"Deal Memo – {name} ({info_round_from_prompt(prompt)})",
-    mini_memo=combined_email,   # ← was mini_memo
-    attachment_path=pdf_path
+    # instant send, or parked for the hourly/daily digest (Take a Call always goes now)
+    delivery = deliver_memo(
+    recipients,
+    subject=f"Deal Memo{' (updated)' if changed else ' (full)' if followup else ''} – {name} ({info_round_from_prompt(prompt)})",
+    text=combined_email,
+    html_body=render_html(email_doc),
+    pdf_bytes=pdf_bytes,
+    pdf_name=pdf_name,
+    meta={"name": name, "round": info_round_from_prompt(prompt), "total": sc.get("total"),
+          "verdict": sc.get("verdict"), "summary": model_summary or intro_summary,
+          "mrr": extract_metrics(extract_field("Traction", mini_doc)).mrr},
     )
+    STATUS.mark(rid, "emailed", delivery=delivery, verdict=sc.get("verdict"), total=sc.get("total"))
 
 
         # Extract data and log to Google Sheets
 
     # Robust intro summary
-    summary = extract_summary(mini_memo)
+    summary = model_summary
     if not summary:
         summary = (
-            f"{name} is building {extract_field('Solution', mini_memo) or 'an AI product'}; "
+            f"{name} is building {extract_field('Solution', mini_doc) or 'an AI product'}; "
             f"stage: {info_round_from_prompt(prompt)}; "
-            f"traction: {extract_field('Traction', mini_memo)}; "
-            f"backed by {extract_field('Startup Overview', mini_memo) or 'notable investors'}."
+            f"traction: {extract_field('Traction', mini_doc)}; "
+            f"backed by {extract_field('Startup Overview', mini_doc) or 'notable investors'}."
         )
 
-    traction = extract_field("Traction", mini_memo)
-    team     = extract_field("Team", mini_memo)
+    traction = extract_field("Traction", mini_doc)
+    team     = extract_field("Team", mini_doc)
     revenue  = extract_revenue(traction)
 
-    round_str = info_round_from_prompt(prompt)
-    tags_list = infer_tags(
-    mini_memo,
-    product="",        # if you have this handy, pass it
-    investors="",      # same here
-    market="",         # or pass extra_context['market'] if you thread it through
-    round_str=round_str,
-    )
+    tags_list = infer_tags(mini_memo, info, extra)
     tags = ", ".join(tags_list) if tags_list else "AI"
 
 
 
     # If the model used a different header, try common alternates explicitly
     if traction == "Unknown":
-        traction = extract_field("Revenue, Contracts & Pipeline", mini_memo)  # alias handled too
+        traction = extract_field("Revenue, Contracts & Pipeline", mini_doc)  # alias handled too
 
     # If we still couldn't find explicit revenue, search the whole memo
     if revenue == "Unknown":
         revenue = extract_revenue(mini_memo)
 
     if team == "Unknown":
-        team = extract_field("Founders", mini_memo)  # covered by aliases
-
+        team = extract_field("Founders", mini_doc)  # covered by aliases
 
-
-    # Parse scorecard from mini or full, then calibrate
-    scorecard = parse_score_any(mini_memo, full_memo) or {"scores": {}}
-    scorecard = calibrate_scorecard(mini_memo, scorecard)
+    # Scorecard was parsed + calibrated once above for the email
+    scorecard = sc
 
     # Numeric score for Sheets
     total_int = int(scorecard.get("total", 0))
@@ -628,7 +910,7 @@ def process_deal(name: str, email_to, prompt: str):
     action       = action_map.get(verdict_code, "⚖️ Learn More")
 
     # Concise rationale for the Sheet (use the same logic as email, but flatten)
-    rationale_md = build_decision_rationale(mini_memo, scorecard)  # markdown block
+    rationale_md = score_block  # markdown block
     # Strip headings/bullets and condense to one line
     rationale_txt = re.sub(r"\*\*", "", rationale_md)                 # remove bold markers
     rationale_txt = rationale_txt.split("Why:", 1)[-1].strip()         # keep the reasons
@@ -644,21 +926,57 @@ def process_deal(name: str, email_to, prompt: str):
         info_round_from_prompt(prompt),
         tags,
         score,
-        "Mini memo sent",
+        ("Memo updated" if changed or followup else "Mini memo sent") if delivery == "sent" else "Queued for digest",
         action,
         reason,
     ]
 
-    append_row_oauth(
-        token_path=GOOGLE_TOKEN_PATH,
-        spreadsheet_id=SPREADSHEET_ID,
-        range_name=SHEET_RANGE,
-        values=csv_row,
-    )
+    if sheet_row:
+        # resubmission: overwrite the company's existing row
+        update_row_oauth(
+            token_path=GOOGLE_TOKEN_PATH,
+            spreadsheet_id=SPREADSHEET_ID,
+            range_name=row_range(SHEET_RANGE, sheet_row),
+            values=csv_row,
+        )
+    else:
+        resp = append_row_oauth(
+            token_path=GOOGLE_TOKEN_PATH,
+            spreadsheet_id=SPREADSHEET_ID,
+            range_name=SHEET_RANGE,
+            values=csv_row,
+        )
+        sheet_row = appended_row_number(resp)
+    STATUS.mark(rid, "logged", sheet_row=sheet_row)
+
+    usage = USAGE.deal(rid) if rid else None
+    if rid and answers is not None:
+        STORE.put(rid, {"answers": answers, "mini_memo": mini_memo, "full_memo": full_memo,
+                        "scores": sc["raw_scores"], "sheet_row": sheet_row,
+                        "deck_summary": (extra or {}).get("deck_summary", ""),
+                        "web_summary": (extra or {}).get("web_summary", ""), "usage": usage})
+
+    USAGE.release(rid)
+    STATUS.mark(rid, "done", verdict=verdict_code, total=total_int,
+                cost_usd=usage["cost_usd"] if usage else None)
+    if info is not None and not followup:   # a follow-up's deal was indexed with its provisional memo
+        _remember_company(info, extra, rid, source="resubmit" if changed else "webhook")
+    return {"ok": True, "pdf": pdf_path}
 
 
-    return {"ok": True, "pdf": pdf_path}
 
+def _remember_company(info: StartupInfo, extra: Optional[Dict[str, Any]], rid: Optional[str],
+                      source: str = "webhook"):
+    # into the dedupe index only once the GP has the memo: a deal that fails
+    # must not block its own resubmission for the dedupe window
+    if DEDUPE_MODE not in ("flag", "skip"):
+        return
+    blank = lambda v: "" if (v or "").strip().upper() in ("", "NA", "N/A") else v
+    try:
+        INDEX.add(blank(info.name), blank(info.website), (extra or {}).get("founder_email", ""),
+                  rid=rid or "", source=source)
+    except OSError as e:
+        print(f"DEDUPE index write failed for {info.name}: {e}", flush=True)
 
 
 def info_round_from_prompt(prompt: str) -> str:
@@ -668,6 +986,146 @@ def info_round_from_prompt(prompt: str) -> str:
             return tag
     return "N/A"
 
-async def submit(info: StartupInfo, extra_context: Optional[Dict[str, Any]] = None):
+def process_prescreen_pass(info: StartupInfo, extra: Optional[Dict[str, Any]], sc: dict,
+                           rid: Optional[str] = None):
+    """Below-threshold tier: short email + Sheets row, no assistant run or PDF."""
+    extra = extra or {}
+    traction = extra.get("traction_detail", "") or info.traction or "Unknown"
+    team = extra.get("team_detail", "") or info.team or "Unknown"
+    summary = (f"{info.name} is building {info.product or extra.get('solution', '') or 'N/A'}; "
+               f"raising {info.round}; investors: {info.investors}.")
+    score_block = build_decision_rationale("", sc)
+
+    body = (
+        "### EMAIL\n\nHi GP,\n\n"
+        f"{summary}\n\n"
+        f"Screened out before the full memo (pre-screen {sc['total']}/100, "
+        f"threshold {PRESCREEN_THRESHOLD}). No PDF was generated.\n\n"
+        f"🏷️ **Startup Overview**\n- **Website**: {info.website}\n- **Round Stage**: {info.round}\n"
+        f"- **Investors**: {info.investors}\n\n"
+        f"📊 **Traction**\n{traction}\n\n"
+        f"👥 **Team**\n{team}\n\n"
+        f"{score_block}\n"
+    )
+
+    gp_list = [e.strip() for e in (GP_RECIPIENTS or "").split(",") if e.strip()]
+    if not gp_list:
+        raise RuntimeError("No GP_RECIPIENTS set; refusing to send.")
+    delivery = deliver_memo(
+        gp_list,
+        subject=f"Pre-screen – {info.name} ({info.round})",
+        text=body,
+        html_body=render_html(parse_memo(body)),
+        pdf_bytes=None,
+        pdf_name=None,
+        meta={"name": info.name, "round": info.round, "total": sc["total"],
+              "verdict": sc["verdict"], "summary": summary, "mrr": extract_metrics(traction).mrr},
+    )
+    STATUS.mark(rid, "emailed", delivery=delivery, verdict=sc["verdict"], total=sc["total"])
+
+    tags_list = infer_tags(summary, info, extra)
+    action = {"TAKE_CALL": "📞 Take a Call", "LEARN_MORE": "⚖️ Learn More", "PASS": "❌ Pass"}[sc["verdict"]]
+    reason = ("Pre-screen: " + ", ".join(f"{k} {v}" for k, v in sc["scores"].items()))[:500]
+    append_row_oauth(
+        token_path=GOOGLE_TOKEN_PATH,
+        spreadsheet_id=SPREADSHEET_ID,
+        range_name=SHEET_RANGE,
+        values=[info.name, summary, traction, extract_revenue(traction), team, info.round,
+                ", ".join(tags_list) or "AI", str(sc["total"]),
+                "Pre-screen sent" if delivery == "sent" else "Queued for digest", action, reason],
+    )
+    STATUS.mark(rid, "logged")
+    STATUS.mark(rid, "done", verdict=sc["verdict"], total=sc["total"], prescreen=True)
+    _remember_company(info, extra, rid)
+    return {"ok": True, "pdf": None, "prescreen": sc}
+
+async def submit(info: StartupInfo, extra_context: Optional[Dict[str, Any]] = None,
+                 answers: Optional[Dict[str, str]] = None, rid: Optional[str] = None,
+                 sheet_row: Optional[int] = None):
+    extra_context = dict(extra_context or {})
+    bind(rid)   # to_thread copies the context, so every stage below is billed to this deal
+    deadline = time.time() + MEMO_SLA_S if MEMO_SLA_S > 0 else None   # counts pre-screen + deck too
+    # pre-LLM work runs side by side, off the event loop
+    screen = (asyncio.to_thread(prescreen, info, extra_context, PRESCREEN_MODE, client)
+              if PRESCREEN_MODE in ("rules", "model") else asyncio.sleep(0))
+    sc, deck_summary, web_summary = await asyncio.gather(
+        screen, asyncio.to_thread(ingest_deck, extra_context.get("pitch_deck_url")),
+        enrich_company(info, extra_context))
+    if sc is not None:
+        print(f"PRESCREEN {info.name}: {sc['total']} ({sc['source']})", flush=True)
+        STATUS.mark(rid, "prescreened", total=sc["total"], passed=sc["total"] >= PRESCREEN_THRESHOLD)
+        if sc["total"] < PRESCREEN_THRESHOLD:
+            return await asyncio.to_thread(process_prescreen_pass, info, extra_context, sc, rid)
+    if deck_summary:
+        extra_context["deck_summary"] = deck_summary
+    if web_summary:
+        extra_context["web_summary"] = web_summary
     prompt = _build_prompt(info, extra_context)
-    return process_deal(name=info.name, email_to=info.email_to, prompt=prompt)
+    return await asyncio.to_thread(process_deal, name=info.name, email_to=info.email_to,
+                                   prompt=prompt, info=info, extra=extra_context,
+                                   answers=answers, rid=rid, sheet_row=sheet_row, deadline=deadline)
+
+
+def process_resubmission(prev: Dict[str, Any], info: StartupInfo, extra: Dict[str, Any],
+                         answers: Dict[str, str], rid: str, plan: Dict[str, List[str]],
+                         changed: List[str]):
+    """
+    Regenerate only the memo sections and subscores a resubmission touched,
+    splice them into the stored memo, then re-render, re-send and overwrite
+    the existing Sheets row. Falls back to a full run if a section can't be found.
+    """
+    extra = dict(extra)
+    for k in ("deck_summary", "web_summary"):
+        if prev.get(k):
+            extra[k] = prev[k]
+    bind(rid)
+    if "pitch_deck_url" in changed:
+        # upload URLs change on every submission; only a deck that reads differently counts
+        # (an unreadable new deck keeps the old notes)
+        deck_summary = ingest_deck(extra.get("pitch_deck_url"))
+        if deck_summary in ("", prev.get("deck_summary", "")):
+            changed = [f for f in changed if f != "pitch_deck_url"]
+            plan = plan_update(changed)
+            if not plan["fields"]:
+                print(f"RESUBMIT {info.name}: same deck under a new URL, nothing to redo", flush=True)
+                STATUS.mark(rid, "done", unchanged=True)
+                return {"ok": True, "unchanged": True}
+        else:
+            extra["deck_summary"] = deck_summary
+    prompt = _build_prompt(info, extra)
+    _, miss_full = splice_sections(prev["full_memo"], {t: "" for t in plan["full"]})
+    _, miss_mini = splice_sections(prev["mini_memo"], {t: "" for t in plan["mini"]}, SECTION_ALIASES)
+    if miss_full or miss_mini:
+        print(f"RESUBMIT {info.name}: no heading for {miss_full + miss_mini}, full run", flush=True)
+        return process_deal(info.name, info.email_to, prompt, info=info, extra=extra,
+                            answers=answers, rid=rid, sheet_row=prev.get("sheet_row"))
+
+    mode = USAGE.admit(prompt, "incremental", rid)
+    if mode == "defer":
+        raise BudgetDeferred(USAGE.defer_until())
+    if mode == "fallback":
+        return _provisional_deal(info.name, prompt, info, extra, None, mode, answers, rid, prev.get("sheet_row"),
+                                 reason="the model budget can't cover a memo")
+    model = MEMO_SECTION_MODEL if mode == "incremental" else USAGE_LITE_MODEL
+    t0 = time.time()
+    STATUS.mark(rid, "generating", mode=mode, sections=plan["full"] + plan["mini"])
+    context = build_section_context(info, extra)
+    with ThreadPoolExecutor(max_workers=max(1, MEMO_SECTION_CONCURRENCY)) as ex:
+        full_f = {t: ex.submit(carry(generate_section), client, context, t, full_instruction(t), model)
+                  for t in plan["full"]}
+        mini_f = {t: ex.submit(carry(generate_section), client, context, t, MINI_INSTRUCTIONS[t], model)
+                  for t in plan["mini"]}
+        score_f = ex.submit(carry(rescore), client, context, plan["scores"], prev.get("scores") or {}, model)
+        full_memo, _ = splice_sections(prev["full_memo"], {t: f.result() for t, f in full_f.items()})
+        mini_memo, _ = splice_sections(prev["mini_memo"], {t: f.result() for t, f in mini_f.items()},
+                                       SECTION_ALIASES)
+        try:
+            new_scores = score_f.result()
+        except Exception as e:
+            print(f"RESUBMIT rescore failed, keeping previous subscores: {e}", flush=True)
+            new_scores = {}
+    print(f"RESUBMIT {info.name}: {changed} -> {len(full_f) + len(mini_f)} sections, "
+          f"scores {sorted(new_scores)} in {time.time() - t0:.1f}s", flush=True)
+    return _finish_deal(info.name, prompt, info, extra, mini_memo, full_memo, answers=answers, rid=rid,
+                        raw_scores={**(prev.get("scores") or {}), **new_scores},
+                        sheet_row=prev.get("sheet_row"), changed=changed)
@@ -0,0 +1,211 @@
+# utils/deck.py
+import hashlib, io, json, multiprocessing, os, re, threading, time, urllib.parse, urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+from utils.config import (
+    TYPEFORM_TOKEN, DECK_MAX_BYTES, DECK_TIMEOUT_S, DECK_CACHE_DIR,
+    DECK_SUMMARY_CHARS, DECK_WORKERS, DECK_URL_TTL_H, DECK_CACHE_MAX_BYTES,
+)
+from utils.enrich import open_checked, read_within
+
+# Optional PDF text extraction
+_HAS_PYPDF = True
+try:
+    from pypdf import PdfReader
+except Exception:
+    _HAS_PYPDF = False
+
+PAGES_PER_WORKER = 4   # below this many pages per worker, extraction stays in-process
+_SWEEP_EVERY = 50      # cache puts between prune passes
+
+
+class DeckTooLarge(ValueError):
+    pass
+
+
+def _typeform_host(url: str) -> bool:
+    """Only Typeform's own https hosts get the bearer token."""
+    parts = urllib.parse.urlsplit(url)
+    host = (parts.hostname or "").lower()
+    return parts.scheme == "https" and (host == "typeform.com" or host.endswith(".typeform.com"))
+
+
+def download_deck(url: str, max_bytes: int = DECK_MAX_BYTES, timeout: float = DECK_TIMEOUT_S) -> bytes:
+    """
+    Stream the deck, aborting as soon as it exceeds max_bytes or `timeout`
+    seconds have passed since connect. Fetched through enrich's checked
+    opener, so a form answer can't point the download at a private address.
+    """
+    deadline = time.monotonic() + timeout
+    req = urllib.request.Request(url, headers={"User-Agent": "vc-evaluator/1.0"})
+    if TYPEFORM_TOKEN and _typeform_host(url):
+        # unredirected: the token stays with Typeform even if the upload redirects to a CDN
+        req.add_unredirected_header("Authorization", f"Bearer {TYPEFORM_TOKEN}")
+    resp, state = open_checked(req, timeout)
+    with resp:
+        declared = resp.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise DeckTooLarge(f"deck is {declared} bytes (cap {max_bytes})")
+        data = read_within(resp, state, max_bytes + 1, deadline, "deck")
+    if len(data) > max_bytes:
+        raise DeckTooLarge(f"deck exceeds {max_bytes} bytes")
+    return data
+
+
+# --- extraction ---
+def _extract_range(data: bytes, start: int, stop: int) -> List[str]:
+    # runs in a worker process; each worker parses its own reader
+    reader = PdfReader(io.BytesIO(data))
+    return [(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool() -> ProcessPoolExecutor:
+    # one pool for the life of the process, started on first use; workers are
+    # spawned rather than forked because decks arrive on threads inside the server
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=max(1, DECK_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _POOL
+
+def _reset_pool(broken: ProcessPoolExecutor):
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is broken:
+            _POOL = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def extract_pages(data: bytes, workers: int = DECK_WORKERS) -> List[str]:
+    if not _HAS_PYPDF:
+        raise RuntimeError("pypdf is not installed; cannot read pitch decks")
+    n = len(PdfReader(io.BytesIO(data)).pages)
+    workers = max(1, min(workers, n // PAGES_PER_WORKER))
+    if workers == 1:
+        return _extract_range(data, 0, n)
+    step = -(-n // workers)
+    ranges = [(i, min(i + step, n)) for i in range(0, n, step)]
+    pool = _pool()
+    try:
+        parts = pool.map(_extract_range, [data] * len(ranges), *zip(*ranges))
+        return [page for part in parts for page in part]
+    except BrokenProcessPool as e:
+        # a worker died (OOM on a hostile PDF, killed): next deck gets a fresh pool
+        print(f"DECK extraction pool broke ({e}); extracting in-process", flush=True)
+        _reset_pool(pool)
+        return _extract_range(data, 0, n)
+
+
+# --- cache: url -> content hash -> pages ---
+# URL entries expire after DECK_URL_TTL_H (the file behind a link can change);
+# texts are keyed by content, touched on every hit and evicted oldest-first
+# once the cache passes DECK_CACHE_MAX_BYTES.
+_puts = 0
+
+def _cache_path(kind: str, key: str) -> str:
+    return os.path.join(DECK_CACHE_DIR, kind, f"{key}.json")
+
+def _cache_get(kind: str, key: str) -> Optional[dict]:
+    path = _cache_path(kind, key)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            hit = json.load(f)
+        if kind == "text":
+            now = time.time()
+            os.utime(path, (now, now))   # recency for eviction
+    except (OSError, ValueError):
+        return None
+    return hit
+
+def _cache_put(kind: str, key: str, value: dict):
+    global _puts
+    path = _cache_path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+    os.replace(tmp, path)
+    _puts += 1
+    if _puts % _SWEEP_EVERY == 1:
+        prune_cache()
+
+def prune_cache(root: Optional[str] = None, url_ttl_s: float = DECK_URL_TTL_H * 3600,
+                max_bytes: int = DECK_CACHE_MAX_BYTES) -> int:
+    """Drop expired URL entries, then the least recently used texts beyond max_bytes."""
+    root = root or DECK_CACHE_DIR
+    now, removed = time.time(), 0
+
+    def _entries(kind: str):
+        try:
+            return [(e.path, e.stat()) for e in os.scandir(os.path.join(root, kind)) if e.name.endswith(".json")]
+        except OSError:
+            return []
+
+    for path, st in _entries("urls"):
+        if now - st.st_mtime > url_ttl_s:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    texts = sorted(_entries("text"), key=lambda e: e[1].st_mtime)
+    total = sum(st.st_size for _, st in texts)
+    for path, st in texts:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+        total -= st.st_size
+    return removed
+
+def load_deck_pages(url: str, url_ttl_s: float = DECK_URL_TTL_H * 3600) -> List[str]:
+    url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    hit = _cache_get("urls", url_key)
+    if hit and time.time() - hit.get("ts", 0) < url_ttl_s:
+        cached = _cache_get("text", hit["sha256"])
+        if cached:
+            return cached["pages"]
+    data = download_deck(url)
+    digest = hashlib.sha256(data).hexdigest()
+    cached = _cache_get("text", digest)
+    pages = cached["pages"] if cached else extract_pages(data)
+    if not cached:
+        _cache_put("text", digest, {"pages": pages})
+    _cache_put("urls", url_key, {"sha256": digest, "ts": time.time()})
+    return pages
+
+
+# --- summary ---
+_KEY_LINE = re.compile(r"[$€£%]|\d|\b(?:ARR|MRR|customers?|users?|revenue|growth|TAM|SAM|SOM|raising|round)\b", re.I)
+
+def summarize_pages(pages: List[str], max_chars: int = DECK_SUMMARY_CHARS) -> str:
+    """Page title plus the lines carrying numbers/metrics, within a char budget."""
+    out, used = [], 0
+    for i, text in enumerate(pages, 1):
+        lines = [re.sub(r"\s+", " ", ln).strip() for ln in (text or "").splitlines()]
+        lines = [ln for ln in lines if ln]
+        if not lines:
+            continue
+        keys = [ln for ln in lines[1:] if _KEY_LINE.search(ln)][:4]
+        entry = f"p{i}: {lines[0][:80]}" + (" — " + "; ".join(k[:120] for k in keys) if keys else "")
+        if used + len(entry) > max_chars:
+            break
+        out.append(entry)
+        used += len(entry) + 1
+    return "\n".join(out)
+
+def ingest_deck(url: Optional[str]) -> str:
+    """Deck URL -> compact summary for the prompt; '' if missing or unreadable."""
+    if not url or not url.lower().startswith(("http://", "https://")):
+        return ""
+    try:
+        return summarize_pages(load_deck_pages(url))
+    except Exception as e:
+        print(f"DECK ingest failed for {url}: {e}", flush=True)
+        return ""
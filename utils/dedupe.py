@@ -0,0 +1,195 @@
+# utils/dedupe.py
+import json, os, re, threading, time
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from utils.config import (
+    DEDUPE_INDEX_PATH, DEDUPE_WINDOW_DAYS, DEDUPE_FUZZY_RATIO,
+    GOOGLE_TOKEN_PATH, SPREADSHEET_ID, SHEET_RANGE,
+)
+
+# Company identity: website domain, normalized name, founder email. Exact keys
+# are dict lookups; names also get a fuzzy pass over a trigram-blocked shortlist.
+
+_LEGAL = re.compile(r"\b(inc|incorporated|llc|ltd|limited|corp|corporation|co|gmbh|sa|sas|bv|plc|pty|the)\b")
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_FREEMAIL = {"gmail.com", "googlemail.com"}
+
+
+def normalize_name(name: str) -> str:
+    n = _NON_ALNUM.sub(" ", (name or "").lower())
+    n = _LEGAL.sub(" ", n)
+    return " ".join(n.split())
+
+def _squash(name_key: str) -> str:
+    # "acme ai" and "acmeai" are the same company
+    return name_key.replace(" ", "")
+
+def _grams(key: str) -> List[str]:
+    return [key[i:i + 3] for i in range(max(1, len(key) - 2))]
+
+def normalize_domain(url: str) -> str:
+    # the whole host: foo.vercel.app and bar.vercel.app (github.io, notion.site,
+    # webflow.io, ...) are different startups, so nothing is cut but "www."
+    u = (url or "").strip().lower()
+    if not u or u in ("na", "n/a"):
+        return ""
+    host = (urlparse(u if "//" in u else "//" + u).hostname or "").strip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    return host if "." in host else ""
+
+def normalize_email(email: str) -> str:
+    e = (email or "").strip().lower()
+    if "@" not in e:
+        return ""
+    local, domain = e.split("@", 1)
+    local = local.split("+", 1)[0]
+    if domain in _FREEMAIL:
+        local = local.replace(".", "")
+        domain = "gmail.com"
+    return f"{local}@{domain}"
+
+
+class CompanyIndex:
+    def __init__(self, path: str = DEDUPE_INDEX_PATH, fuzzy_ratio: float = DEDUPE_FUZZY_RATIO):
+        self.path = path
+        self.fuzzy_ratio = fuzzy_ratio
+        self.lock = threading.Lock()
+        self.entries: List[Dict[str, Any]] = []
+        self.by_domain: Dict[str, int] = {}
+        self.by_name: Dict[str, int] = {}
+        self.by_email: Dict[str, int] = {}
+        self.by_gram: Dict[str, List[int]] = {}
+        self.offset = 0
+        self.loaded = 0
+        # names of entries dropped from memory once past the window, so a
+        # restart's Sheet seeding doesn't bring them back as new
+        self.retired: set = set()
+
+    def _load(self):
+        # reads only what was appended since last time, so entries written by
+        # other worker processes show up without a restart
+        try:
+            if os.path.getsize(self.path) <= self.offset:
+                return
+        except OSError:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break   # a concurrent append still in flight
+                self.offset += len(raw)
+                try:
+                    self._insert(json.loads(raw))
+                except ValueError:
+                    continue
+                self.loaded += 1
+                if self.loaded % 200 == 0:
+                    self._prune()
+
+    def _prune(self, window_days: float = DEDUPE_WINDOW_DAYS):
+        # lookups ignore entries older than the window; stop holding them in memory
+        cutoff = time.time() - window_days * 86400
+        keep = [e for e in self.entries if e["ts"] >= cutoff]
+        if len(keep) == len(self.entries):
+            return
+        self.retired.update(_squash(e.get("name_key", "")) for e in self.entries if e["ts"] < cutoff)
+        self.entries, self.by_domain, self.by_name, self.by_email, self.by_gram = [], {}, {}, {}, {}
+        for e in keep:
+            self._insert(e)
+
+    def _insert(self, e: Dict[str, Any]) -> int:
+        i = len(self.entries)
+        self.entries.append(e)
+        # latest submission wins for exact keys
+        if e.get("domain"): self.by_domain[e["domain"]] = i
+        if e.get("email"): self.by_email[e["email"]] = i
+        key = _squash(e.get("name_key", ""))
+        if key:
+            self.by_name[key] = i
+            for g in _grams(key):
+                self.by_gram.setdefault(g, []).append(i)
+        return i
+
+    def add(self, name: str, website: str = "", email: str = "", rid: str = "",
+            source: str = "webhook", ts: Optional[float] = None) -> Dict[str, Any]:
+        e = {"name": name, "name_key": normalize_name(name), "domain": normalize_domain(website),
+             "email": normalize_email(email), "rid": rid, "source": source, "ts": ts or time.time()}
+        with self.lock:
+            self._load()
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(e) + "\n")
+            self._load()   # picks up our line (and any other process's) in file order
+        return e
+
+    def _fuzzy(self, key: str) -> Optional[int]:
+        # shortlist: entries sharing at least half of the query's trigrams
+        grams = _grams(key)
+        counts: Dict[int, int] = {}
+        for g in grams:
+            for i in self.by_gram.get(g, ()):
+                counts[i] = counts.get(i, 0) + 1
+        need = max(1, len(grams) // 2)
+        best, best_i = 0.0, None
+        for i, c in counts.items():
+            if c < need:
+                continue
+            other = _squash(self.entries[i]["name_key"])
+            if 2 * min(len(key), len(other)) / (len(key) + len(other)) < self.fuzzy_ratio:
+                continue
+            r = SequenceMatcher(None, key, other).ratio()
+            if r > best:
+                best, best_i = r, i
+        return best_i if best >= self.fuzzy_ratio else None
+
+    def lookup(self, name: str, website: str = "", email: str = "",
+               window_days: float = DEDUPE_WINDOW_DAYS) -> Optional[Dict[str, Any]]:
+        """Most specific match first: domain, then founder email, exact name, fuzzy name."""
+        domain, em, key = normalize_domain(website), normalize_email(email), _squash(normalize_name(name))
+        cutoff = time.time() - window_days * 86400
+        with self.lock:
+            self._load()
+            hits = [("domain", self.by_domain.get(domain) if domain else None),
+                    ("email", self.by_email.get(em) if em else None),
+                    ("name", self.by_name.get(key) if key else None)]
+            for how, i in hits:
+                if i is not None and self.entries[i]["ts"] >= cutoff:
+                    return {**self.entries[i], "match": how}
+            i = self._fuzzy(key) if key else None
+            if i is not None and self.entries[i]["ts"] >= cutoff:
+                return {**self.entries[i], "match": "fuzzy_name"}
+        return None
+
+
+INDEX = CompanyIndex()
+
+
+def seed_from_sheet() -> int:
+    """Load company names already logged in the Sheet (column A) into the index."""
+    from utils.sheet import read_rows_oauth
+    sheet = SHEET_RANGE.split("!", 1)[0] if "!" in SHEET_RANGE else "Sheet1"
+    rows = read_rows_oauth(GOOGLE_TOKEN_PATH, SPREADSHEET_ID, f"{sheet}!A:A")
+    with INDEX.lock:
+        INDEX._load()
+        known = {_squash(e["name_key"]) for e in INDEX.entries} | INDEX.retired
+    added = 0
+    for row in rows:
+        name = (row[0] if row else "").strip()
+        if not name or _squash(normalize_name(name)) in known:
+            continue
+        # sheet rows carry no timestamp; the dedupe window counts from first seeding
+        INDEX.add(name, source="sheet")
+        known.add(_squash(normalize_name(name)))
+        added += 1
+    return added
+
+def start_sheet_seed():
+    def _run():
+        try:
+            print(f"DEDUPE seeded {seed_from_sheet()} companies from the Sheet", flush=True)
+        except Exception as e:
+            print(f"DEDUPE sheet seed failed: {e}", flush=True)
+    threading.Thread(target=_run, name="dedupe-seed", daemon=True).start()
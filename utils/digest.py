@@ -0,0 +1,215 @@
+# utils/digest.py
+import html, io, json, os, threading, time, uuid, zipfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from utils.config import (
+    GOOGLE_TOKEN_PATH, GMAIL_SENDER, DELIVERY_MODE, DIGEST_DIR, DIGEST_ATTACH,
+    DIGEST_HOUR_UTC, DIGEST_MAX_ATTACH_BYTES,
+)
+from utils.email import send_email_oauth
+
+VERDICT_RANK = {"TAKE_CALL": 0, "LEARN_MORE": 1, "PASS": 2}
+VERDICT_LABEL = {"TAKE_CALL": "📞 Take a Call", "LEARN_MORE": "⚖️ Learn More", "PASS": "❌ Pass"}
+
+_lock = threading.Lock()
+_ORPHAN_S = 900   # a batch dir untouched this long was left by a flush that died mid-send
+
+
+def _window_id(ts: float, mode: str = DELIVERY_MODE) -> int:
+    if mode == "hourly":
+        return int(ts // 3600)
+    # daily windows roll over at DIGEST_HOUR_UTC
+    return int((ts - DIGEST_HOUR_UTC * 3600) // 86400)
+
+def _pending_dir() -> str:
+    return os.path.join(DIGEST_DIR, "pending")
+
+
+def deliver_memo(recipients: List[str], subject: str, text: str, html_body: str,
+                 pdf_bytes: Optional[bytes], pdf_name: Optional[str],
+                 meta: Dict[str, Any]) -> str:
+    """
+    Send now (instant mode, or a Take a Call verdict) or park the memo for the
+    next digest. `meta` needs name, round, total, verdict and summary; an
+    optional numeric mrr breaks score ties in the ranking.
+    Returns "sent" or "queued".
+    """
+    if DELIVERY_MODE not in ("hourly", "daily") or meta.get("verdict") == "TAKE_CALL":
+        send_email_oauth(
+            token_path=GOOGLE_TOKEN_PATH, sender=GMAIL_SENDER, to=recipients,
+            subject=subject, mini_memo=text, html_body=html_body,
+            attachment_bytes=pdf_bytes, attachment_name=pdf_name,
+        )
+        return "sent"
+
+    entry_id = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
+    os.makedirs(_pending_dir(), exist_ok=True)
+    entry = {**meta, "id": entry_id, "queued_at": time.time(), "recipients": recipients,
+             "subject": subject, "html": html_body, "pdf_name": pdf_name if pdf_bytes else None}
+    base = os.path.join(_pending_dir(), entry_id)
+    if pdf_bytes:
+        with open(base + ".pdf", "wb") as f:
+            f.write(pdf_bytes)
+    tmp = base + ".json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, base + ".json")   # the .json appearing is what makes an entry visible
+    return "queued"
+
+
+def _recover_orphans(grace_s: float = _ORPHAN_S) -> int:
+    """Move entries of abandoned batch_* dirs back to pending (they may be sent twice, never lost)."""
+    if not os.path.isdir(DIGEST_DIR):
+        return 0
+    moved = 0
+    for d in os.scandir(DIGEST_DIR):
+        if not (d.is_dir() and d.name.startswith("batch_")):
+            continue
+        try:
+            if time.time() - d.stat().st_mtime < grace_s:
+                continue   # possibly a flush still sending, here or in another process
+            os.makedirs(_pending_dir(), exist_ok=True)
+            for fname in os.listdir(d.path):
+                os.rename(os.path.join(d.path, fname), os.path.join(_pending_dir(), fname))
+                moved += fname.endswith(".json")
+            os.rmdir(d.path)
+        except OSError as e:
+            print(f"DIGEST could not recover {d.name}: {e}", flush=True)
+    if moved:
+        print(f"DIGEST requeued {moved} memos from interrupted flushes", flush=True)
+    return moved
+
+def _claim_due(now: float, force: bool) -> List[Dict[str, Any]]:
+    # rename into a per-batch dir so concurrent flushes never double-send
+    pend = _pending_dir()
+    if not os.path.isdir(pend):
+        return []
+    batch = os.path.join(DIGEST_DIR, f"batch_{uuid.uuid4().hex[:8]}")
+    claimed: List[Dict[str, Any]] = []
+    current = _window_id(now)
+    for fname in sorted(os.listdir(pend)):
+        if not fname.endswith(".json"):
+            continue
+        path = os.path.join(pend, fname)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not force and _window_id(entry["queued_at"]) >= current:
+            continue
+        os.makedirs(batch, exist_ok=True)
+        try:
+            os.rename(path, os.path.join(batch, fname))
+        except OSError:
+            continue   # another flusher got it
+        pdf = path[:-5] + ".pdf"
+        if os.path.exists(pdf):
+            os.rename(pdf, os.path.join(batch, fname[:-5] + ".pdf"))
+        entry["_dir"] = batch
+        claimed.append(entry)
+    return claimed
+
+def _ranked_table(entries: List[Dict[str, Any]]) -> str:
+    rows = "".join(
+        f"<tr><td>{i}</td><td><b>{html.escape(e['name'])}</b></td><td>{html.escape(e.get('round', ''))}</td>"
+        f"<td>{e.get('total', '')}</td><td>{VERDICT_LABEL.get(e.get('verdict'), e.get('verdict', ''))}</td>"
+        f"<td>{html.escape((e.get('summary') or '')[:220])}</td></tr>"
+        for i, e in enumerate(entries, 1))
+    head = "".join(f"<th align='left'>{h}</th>" for h in ("#", "Company", "Round", "Score", "Verdict", "Summary"))
+    return (f"<table cellpadding='6' style='border-collapse: collapse; font-size: 13px;' border='1'>"
+            f"<tr>{head}</tr>{rows}</table>")
+
+def _attachments(entries: List[Dict[str, Any]]):
+    files, omitted, total = [], [], 0
+    for e in entries:
+        if not e.get("pdf_name"):
+            continue
+        with open(os.path.join(e["_dir"], e["id"] + ".pdf"), "rb") as f:
+            data = f.read()
+        if total + len(data) > DIGEST_MAX_ATTACH_BYTES:
+            omitted.append(e["name"])
+            continue
+        total += len(data)
+        files.append((e["pdf_name"], data))
+    if DIGEST_ATTACH == "zip" and files:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+            for name, data in files:
+                z.writestr(name, data)
+        return [("DealMemos.zip", buf.getvalue(), "zip")], omitted
+    return [(name, data, "pdf") for name, data in files], omitted
+
+def _release(entries: List[Dict[str, Any]]):
+    # put claimed entries back so the next flush retries them
+    for e in entries:
+        for ext in (".pdf", ".json"):
+            src = os.path.join(e["_dir"], e["id"] + ext)
+            if os.path.exists(src):
+                os.rename(src, os.path.join(_pending_dir(), e["id"] + ext))
+
+def flush_digest(force: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+    """Send one digest per recipient list for every entry whose window has closed."""
+    now = now or time.time()
+    with _lock:
+        _recover_orphans()
+        entries = _claim_due(now, force)
+    if not entries:
+        return {"sent": 0, "deals": 0}
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for e in entries:
+        groups.setdefault(",".join(e["recipients"]), []).append(e)
+
+    sent, deals = 0, 0
+    for key, group in groups.items():
+        group.sort(key=lambda e: (VERDICT_RANK.get(e.get("verdict"), 3), -int(e.get("total") or 0),
+                                  -(e.get("mrr") or 0)))
+        try:
+            files, omitted = _attachments(group)
+            note = (f"<p><i>PDFs omitted (size cap): {html.escape(', '.join(omitted))}</i></p>"
+                    if omitted else "")
+            details = "".join(f"<hr><h2>{i}. {html.escape(e['name'])}</h2>{e['html']}"
+                              for i, e in enumerate(group, 1))
+            stamp = datetime.fromtimestamp(now, timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+            body = (f"<p>Hi GP,</p><p>{len(group)} deals processed since the last digest, "
+                    f"ranked by verdict and score.</p>{_ranked_table(group)}{note}{details}")
+            send_email_oauth(
+                token_path=GOOGLE_TOKEN_PATH, sender=GMAIL_SENDER, to=key.split(","),
+                subject=f"Deal Digest – {len(group)} deals ({stamp})",
+                mini_memo="", html_body=body, attachments=files,
+            )
+        except Exception as e:
+            print(f"DIGEST send failed, requeueing {len(group)}: {e}", flush=True)
+            _release(group)
+            continue
+        for e in group:
+            for ext in (".pdf", ".json"):
+                try:
+                    os.remove(os.path.join(e["_dir"], e["id"] + ext))
+                except OSError:
+                    pass
+        sent += 1
+        deals += len(group)
+    for d in {e["_dir"] for e in entries}:
+        try:
+            os.rmdir(d)
+        except OSError:
+            pass
+    return {"sent": sent, "deals": deals}
+
+
+def start_digest_scheduler(interval_s: int = 60):
+    """Background loop that flushes closed windows; no-op in instant mode."""
+    if DELIVERY_MODE not in ("hourly", "daily"):
+        return None
+    def _loop():
+        while True:
+            try:
+                flush_digest()
+            except Exception as e:
+                print(f"DIGEST loop error: {e}", flush=True)
+            time.sleep(interval_s)
+    t = threading.Thread(target=_loop, name="digest", daemon=True)
+    t.start()
+    return t
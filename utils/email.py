@@ -1,5 +1,5 @@
-import os, base64
-from typing import List, Union, Optional
+import os, base64, json
+from typing import List, Union, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
@@ -35,6 +35,10 @@ def send_email_oauth(
     subject: str,
     mini_memo: str,
     attachment_path: Optional[str] = None,
+    attachment_bytes: Optional[bytes] = None,
+    attachment_name: Optional[str] = None,
+    html_body: Optional[str] = None,
+    attachments: Optional[List[Tuple[str, bytes, str]]] = None,
     cc: Union[str, List[str], None] = None,
     bcc: Union[str, List[str], None] = None,
 ) -> str:
@@ -51,13 +55,22 @@ def send_email_oauth(
     if cc_list: msg['Cc'] = ", ".join(cc_list)
     msg['Subject'] = subject
 
-    # Mini memo as HTML inside email
+    # Mini memo as HTML inside email; prefer the pre-rendered body from memo_doc
+    attached = "📎 Full PDF memo attached.<br>" if (attachment_path or attachment_bytes) else ""
+    if attachments:
+        attached = f"📎 {len(attachments)} attachment(s).<br>"
+    if html_body is not None:
+        style = "font-family: Arial, Helvetica, sans-serif; font-size: 14px; line-height: 1.4;"
+        body = html_body
+    else:
+        style = "font-family: monospace; white-space: pre-wrap;"
+        body = mini_memo.replace('\n', '<br>')
     html = f"""
     <html>
-    <body style="font-family: monospace; white-space: pre-wrap;">
-        {mini_memo.replace('\n', '<br>')}
+    <body style="{style}">
+        {body}
         <br><br>
-        📎 Full PDF memo attached.<br>
+        {attached}
         <br>
         Best,<br>
         VC Evaluator GPT
@@ -67,13 +80,24 @@ def send_email_oauth(
     msg.attach(MIMEText(html, 'html'))
 
 
-    if attachment_path:
+    if attachment_bytes is not None:
+        part = MIMEApplication(attachment_bytes, _subtype='pdf')
+        part.add_header('Content-Disposition', 'attachment',
+                        filename=attachment_name or 'DealMemo.pdf')
+        msg.attach(part)
+    elif attachment_path:
         with open(attachment_path, 'rb') as f:
             part = MIMEApplication(f.read(), _subtype='pdf')
             part.add_header('Content-Disposition', 'attachment',
                             filename=os.path.basename(attachment_path))
             msg.attach(part)
 
+    # extra attachments as (filename, bytes, mime subtype), e.g. digest PDFs or a zip
+    for fname, data, subtype in attachments or []:
+        part = MIMEApplication(data, _subtype=subtype)
+        part.add_header('Content-Disposition', 'attachment', filename=fname)
+        msg.attach(part)
+
     raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
     sent = service.users().messages().send(userId='me', body={'raw': raw}).execute()
     return sent.get('id', '')
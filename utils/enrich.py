@@ -0,0 +1,282 @@
+# utils/enrich.py
+import asyncio, hashlib, ipaddress, json, os, re, socket, time, urllib.parse, urllib.request
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from utils.config import (
+    ENRICH_ENABLED, ENRICH_TIMEOUT_S, ENRICH_MAX_BYTES, ENRICH_MAX_URLS, ENRICH_CONCURRENCY,
+    ENRICH_SUMMARY_CHARS, ENRICH_CACHE_DIR, ENRICH_TTL_H, ENRICH_ALLOW_PRIVATE,
+)
+
+# What the company's own pages say, for the prompt: the homepage plus any
+# press or LinkedIn links from the answers, fetched concurrently (asyncio over
+# urllib threads, like the deck download, each page held to a total deadline),
+# cut to title, description, headings and the sentences with numbers in them.
+# Failures are cached briefly and skipped.
+
+_URL_RE = re.compile(r"https?://[^\s,;<>\"')\]]+", re.I)
+_KEY_SENTENCE = re.compile(r"[$€£%]|\d|\b(?:customers?|clients?|users?|founded|team|backed|investors?|"
+                           r"raised|trusted|partners?|launch(?:ed)?|award|revenue|growth)\b", re.I)
+_ERROR_TTL_S = 3600
+CHUNK = 64 * 1024
+
+
+class FetchRefused(ValueError):
+    pass
+
+
+def _check_url(url: str):
+    """Refuse non-http(s) URLs; the address is checked when the connection is made."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise FetchRefused(f"not an http(s) URL: {url}")
+
+
+def _resolve(host: str, port: int) -> str:
+    """One lookup per connection: refuse private/loopback answers (SSRF), return the address to dial."""
+    infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    if not ENRICH_ALLOW_PRIVATE:
+        for info in infos:
+            ip = ipaddress.ip_address(info[4][0])
+            if ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved or ip.is_multicast:
+                raise FetchRefused(f"{host} resolves to {ip}")
+    return infos[0][4][0]
+
+
+class _Pinned:
+    """
+    urllib handler mixin: each connection dials the address _resolve checked
+    (Host header and TLS name stay the hostname), so a second DNS answer can't
+    swap in a private one. The last socket is kept in `state` for read_within.
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        super().__init__()
+        self.state = state
+
+    def do_open(self, http_class, req, **kwargs):
+        def connection(host, **args):
+            conn = http_class(host, **args)
+            ip = _resolve(conn.host, conn.port)
+            conn._create_connection = lambda addr, *a, **k: socket.create_connection((ip, addr[1]), *a, **k)
+            connect = conn.connect
+
+            def pinned_connect():
+                connect()
+                self.state["sock"] = conn.sock
+            conn.connect = pinned_connect
+            return conn
+        return super().do_open(connection, req, **kwargs)
+
+class _PinnedHTTP(_Pinned, urllib.request.HTTPHandler):
+    pass
+
+class _PinnedHTTPS(_Pinned, urllib.request.HTTPSHandler):
+    pass
+
+class _CheckedRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def open_checked(req: urllib.request.Request, timeout: float):
+    """
+    Open req through the SSRF checks: http(s) only, every hop (redirects
+    included) resolved once, refused if private, and dialled at the checked
+    address. Returns (response, state) for read_within.
+    """
+    _check_url(req.full_url)
+    state: Dict[str, Any] = {}
+    opener = urllib.request.build_opener(_CheckedRedirect, _PinnedHTTP(state), _PinnedHTTPS(state))
+    return opener.open(req, timeout=timeout), state
+
+
+def read_within(resp, state: Dict[str, Any], limit: int, deadline: float, what: str = "page") -> bytes:
+    """Read up to limit bytes of resp, raising TimeoutError once the monotonic deadline passes."""
+    buf = bytearray()
+    while len(buf) < limit:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"{what} not read in time")
+        if state.get("sock") is not None and not resp.isclosed():
+            state["sock"].settimeout(left)   # a trickling server can't stretch the read past the deadline
+        chunk = resp.read1(min(CHUNK, limit - len(buf)))   # returns after one recv
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+
+def fetch_page(url: str, max_bytes: int = ENRICH_MAX_BYTES, timeout: float = ENRICH_TIMEOUT_S) -> str:
+    """
+    GET an HTML/text page, at most max_bytes of it (the rest is dropped, not an
+    error), in at most `timeout` seconds from connect to last byte.
+    """
+    deadline = time.monotonic() + timeout
+    req = urllib.request.Request(url, headers={"User-Agent": "vc-evaluator/1.0 (+deal memo enrichment)",
+                                               "Accept": "text/html,text/plain;q=0.9"})
+    resp, state = open_checked(req, timeout)
+    with resp:
+        ctype = resp.headers.get("Content-Type", "")
+        if ctype and not ctype.startswith(("text/html", "text/plain", "application/xhtml")):
+            raise FetchRefused(f"unsupported content type {ctype}")
+        data = read_within(resp, state, max_bytes, deadline)
+        charset = resp.headers.get_content_charset() or "utf-8"
+    return data.decode(charset, errors="replace")
+
+
+# --- extraction ---
+class _PageText(HTMLParser):
+    _SKIP = {"script", "style", "noscript", "svg", "nav", "footer", "form", "template"}
+    _BLOCK = {"p", "div", "li", "section", "article", "br", "tr", "h1", "h2", "h3", "blockquote"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title, self.description = "", ""
+        self.headings: List[str] = []
+        self.lines: List[str] = []
+        self._skip = 0
+        self._tag = ""
+        self._buf: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip += 1
+        elif tag == "meta":
+            a = dict(attrs)
+            if (a.get("name") or a.get("property") or "").lower() in ("description", "og:description") \
+                    and not self.description:
+                self.description = (a.get("content") or "").strip()
+        elif tag in self._BLOCK:
+            self._flush()
+        self._tag = tag
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self._BLOCK or tag == "title":
+            self._flush(tag)
+
+    def handle_data(self, data):
+        if self._skip:
+            return
+        if self._tag == "title" and not self.title:
+            self.title = " ".join(data.split())
+            return
+        self._buf.append(data)
+
+    def _flush(self, tag: str = ""):
+        text = " ".join("".join(self._buf).split())
+        self._buf = []
+        if not text:
+            return
+        if tag in ("h1", "h2", "h3"):
+            self.headings.append(text)
+        else:
+            self.lines.append(text)
+
+
+def extract_page(html_text: str) -> Dict[str, Any]:
+    p = _PageText()
+    try:
+        p.feed(html_text)
+        p.close()
+    except Exception:
+        pass   # best effort on broken markup; keep what was parsed
+    p._flush()
+    return {"title": p.title[:150], "description": p.description[:300],
+            "headings": p.headings[:12], "lines": [ln for ln in p.lines if len(ln) > 25][:200]}
+
+def summarize_page(url: str, page: Dict[str, Any], max_chars: int) -> str:
+    host = urllib.parse.urlsplit(url).hostname or url
+    head = " — ".join(x for x in (page["title"], page["description"]) if x)
+    parts = [f"{host}: {head}" if head else host]
+    if page["headings"]:
+        parts.append("Headings: " + "; ".join(h[:80] for h in page["headings"][:6]))
+    sentences = [s.strip() for ln in page["lines"] for s in re.split(r"(?<=[.!?])\s+", ln)]
+    keys = [s for s in sentences if 25 < len(s) < 240 and _KEY_SENTENCE.search(s)]
+    used = sum(len(x) for x in parts)
+    for s in dict.fromkeys(keys):          # de-duplicated, page order
+        if used + len(s) > max_chars:
+            break
+        parts.append(f"- {s}")
+        used += len(s) + 3
+    return "\n".join(parts)[:max_chars]
+
+
+# --- cache: url -> {"ts", "page"} or {"ts", "error"} ---
+def _cache_path(url: str) -> str:
+    return os.path.join(ENRICH_CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+def _cache_get(url: str, ttl_s: float) -> Optional[dict]:
+    try:
+        with open(_cache_path(url), "r", encoding="utf-8") as f:
+            hit = json.load(f)
+    except (OSError, ValueError):
+        return None
+    age = time.time() - hit.get("ts", 0)
+    return hit if age < (ttl_s if "page" in hit else min(ttl_s, _ERROR_TTL_S)) else None
+
+def _cache_put(url: str, value: dict):
+    path = _cache_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**value, "ts": time.time()}, f)
+    os.replace(tmp, path)
+
+def load_page(url: str, ttl_s: float = ENRICH_TTL_H * 3600) -> Optional[Dict[str, Any]]:
+    hit = _cache_get(url, ttl_s)
+    if hit is not None:
+        return hit.get("page")
+    try:
+        page = extract_page(fetch_page(url))
+    except Exception as e:
+        print(f"ENRICH {url}: {e}", flush=True)
+        _cache_put(url, {"error": str(e)[:200]})
+        return None
+    _cache_put(url, {"page": page})
+    return page
+
+
+# --- stage ---
+def _normalize(url: str) -> str:
+    url = (url or "").strip().strip("<>")
+    if not url or url.lower() in ("na", "n/a", "none", "-"):
+        return ""
+    if not re.match(r"(?i)https?://", url):
+        url = "https://" + url.lstrip("/")
+    return url
+
+def enrichment_urls(info: Any, extra: Optional[Dict[str, Any]], limit: int = ENRICH_MAX_URLS) -> List[str]:
+    """Homepage first, then press links, then LinkedIn profiles mentioned in the team answer."""
+    extra = extra or {}
+    urls = [_normalize(info.website)]
+    urls += _URL_RE.findall(extra.get("press_links", "") or "")
+    urls += [u for u in _URL_RE.findall((extra.get("team_detail", "") or info.team or "")) if "linkedin.com" in u.lower()]
+    return [u for u in dict.fromkeys(u.rstrip(".") for u in urls if u)][:limit]
+
+async def enrich_company(info: Any, extra: Optional[Dict[str, Any]] = None,
+                         max_chars: int = ENRICH_SUMMARY_CHARS,
+                         concurrency: int = ENRICH_CONCURRENCY) -> str:
+    """Compact web summary for the prompt; '' when disabled or nothing could be read."""
+    if not ENRICH_ENABLED:
+        return ""
+    urls = enrichment_urls(info, extra)
+    if not urls:
+        return ""
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(url: str):
+        # the slot is held until the fetch thread returns; fetch_page bounds that by ENRICH_TIMEOUT_S
+        async with sem:
+            return await asyncio.to_thread(load_page, url)
+
+    t0 = time.time()
+    pages = await asyncio.gather(*(_one(u) for u in urls))
+    # homepage gets half the budget when there are other pages to share it with
+    rest = len(urls) - 1
+    budget = [max_chars // 2 if rest else max_chars] + [max_chars // (2 * max(1, rest))] * rest
+    out = [summarize_page(u, p, b) for u, p, b in zip(urls, pages, budget) if p]
+    print(f"ENRICH {info.name}: {len(out)}/{len(urls)} pages in {time.time() - t0:.1f}s", flush=True)
+    return "\n\n".join(out)
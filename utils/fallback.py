@@ -0,0 +1,79 @@
+# utils/fallback.py
+from typing import Any, Dict, Optional
+from utils.traction import extract_metrics
+
+# Deterministic mini memo for when the LLM stage misses the deal's deadline:
+# the same form fields _build_prompt feeds the model, laid out in the mini
+# memo's section order so the email, Sheets and PDF paths parse it unchanged.
+
+
+def _bullets(text: str) -> str:
+    lines = [ln.strip(" -•\t") for ln in (text or "").splitlines() if ln.strip()]
+    return "\n".join(f"- {ln}" for ln in lines) or "- N/A"
+
+def _figures(text: str) -> str:
+    m = extract_metrics(text)
+    parts = []
+    if m.mrr:
+        parts.append(f"MRR ≈ ${m.mrr:,} (ARR ≈ ${m.arr:,})")
+    if m.growth_pct is not None:
+        parts.append(f"growth {m.growth_pct:g}%" + (f" per {m.growth_period}" if m.growth_period else ""))
+    if m.customers:
+        parts.append(f"{m.customers:,} customers")
+    if m.users:
+        parts.append(f"{m.users:,} users")
+    return "; ".join(parts)
+
+def build_fallback_memo(info: Any, extra: Optional[Dict[str, Any]], deadline_s: float,
+                        reason: Optional[str] = None, failed: bool = False) -> str:
+    """
+    A `reason` means no model memo will follow (e.g. the day's budget is spent);
+    `failed` means the model call errored rather than ran past the deadline.
+    """
+    extra = extra or {}
+    if reason:
+        note = f"- Written from the form answers because {reason}.\n- No full memo or PDF will follow for this deal."
+    elif failed:
+        note = ("- Written from the form answers because the model call failed.\n"
+                "- The full memo and PDF follow automatically if the retry succeeds.")
+    else:
+        note = (f"- Written from the form answers because the model did not finish within {deadline_s:.0f}s.\n"
+                f"- The full memo and PDF follow automatically once it does.")
+    traction = extra.get("traction_detail", "") or info.traction
+    team = extra.get("team_detail", "") or info.team
+    figures = _figures(traction)
+    return f"""Hi GP,
+
+{info.name} is building {info.product or extra.get('solution', '') or 'N/A'}. They are raising a {info.round} round, with interest from {info.investors or 'N/A'}.
+
+⚠️ **Provisional**
+{note}
+
+🏷️ **Startup Overview**
+- **Name**: {info.name}
+- **Website**: {info.website}
+- **Industry**: {extra.get('industry', '') or 'N/A'}
+- **Round Stage**: {info.round}
+- **Investors**: {info.investors}
+
+📈 **Market**
+{_bullets(extra.get('market', ''))}
+{_bullets(extra.get('competition', '')) if extra.get('competition') else ''}
+
+🔍 **Problem**
+{_bullets(extra.get('problem', ''))}
+
+🛠 **Solution**
+{_bullets(extra.get('solution', '') or info.product)}
+
+📊 **Traction**
+{_bullets(traction)}
+{f'- **Parsed figures**: {figures}' if figures else ''}
+
+👥 **Team**
+{_bullets(team)}
+{f'- **University**: {extra["university"]}' if extra.get('university') else ''}
+
+Best,
+VC Evaluator
+"""
@@ -0,0 +1,207 @@
+# utils/form_schema.py
+import json, os, re, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.config import FORM_SCHEMA_PATH, FORM_SCHEMA_CHECK_S
+from utils.field_map import FIELD_ID_MAP
+
+try:
+    import orjson
+except ImportError:   # stdlib fallback: same result, slower on big payloads
+    orjson = None
+
+# Typeform answers -> parsed answers, StartupInfo and prompt extras in one pass.
+# Every answer carries a `type`; its extractor is picked by a dict lookup
+# instead of probing each value key. The field id -> answer key map is compiled
+# from FIELD_ID_MAP, or from FORM_SCHEMA_PATH when set, which is re-read when
+# its mtime changes (replace the file by rename so readers never see half of it):
+#
+#   {"version": "form v4", "fields": {"mzHp4Tu0OoYM": "name", ...},
+#    "refs": {"company_moat": "moat"}}
+#
+# `refs` match Typeform's field refs, which survive question edits. Keys that
+# don't feed StartupInfo go into the prompt extras under their own name. Keys
+# the prompt has no heading for are listed by other_answers() in the prompt and
+# the section fact sheet, so a new question needs a schema change, not a deploy.
+
+# answer key -> StartupInfo field, with the default used when it isn't answered
+INFO_FIELDS = {"name": ("name", "NA"), "website": ("website", "NA"), "round": ("round", "Seed"),
+               "investors": ("investors", "N/A"), "traction": ("traction", ""), "team": ("team", ""),
+               "solution": ("product", "")}
+# answer key -> prompt extra; every other mapped key becomes extra[key]
+EXTRA_FIELDS = {"first_name": "first_name", "last_name": "last_name", "founder_email": "founder_email",
+                "incorporation": "incorporation", "position": "position", "problem": "problem",
+                "solution": "solution", "market": "market", "team": "team_detail",
+                "university": "university", "competition": "competition", "milestones": "milestones",
+                "vision": "vision", "pitch_deck_url": "pitch_deck_url"}
+# extras the pipeline fills in itself after the form is parsed
+_RESERVED = {"deck_summary", "web_summary"}
+# extras the prompt template and the section fact sheet place under a heading of their own
+PLACED_EXTRAS = set(EXTRA_FIELDS.values()) | _RESERVED | {
+    "traction_detail", "business_model", "moat", "risks", "product_stage", "cap_table", "press_links",
+    "round_size", "industry"}
+_KEY_RE = re.compile(r"^[a-z][a-z0-9_]{0,63}$")
+_MAX_UNMAPPED = 200
+
+
+def other_answers(extra: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+    """(label, answer) for answered extras with no heading in the prompt, e.g. a question added by schema."""
+    return [(k.replace("_", " ").capitalize(), str(v).strip()) for k, v in (extra or {}).items()
+            if k not in PLACED_EXTRAS and isinstance(v, (str, int, float)) and str(v).strip()]
+
+
+def loads(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def _probe(a: Dict[str, Any]) -> str:
+    # untyped or unknown answers: the old try-every-key extraction
+    for k in ("text", "email", "url", "number", "boolean", "phone_number", "date"):
+        v = a.get(k)
+        if v not in (None, ""):
+            return str(v).strip()
+    return _choice(a) or _choices(a) or _file(a)
+
+def _scalar(key: str) -> Callable[[Dict[str, Any]], str]:
+    def get(a: Dict[str, Any]) -> str:
+        v = a.get(key)
+        return "" if v in (None, "") else str(v).strip()
+    return get
+
+def _choice(a: Dict[str, Any]) -> str:
+    ch = a.get("choice") or {}
+    return str(ch.get("label") or ch.get("other") or "").strip()
+
+def _choices(a: Dict[str, Any]) -> str:
+    ch = a.get("choices") or {}
+    labels = [str(x).strip() for x in (ch.get("labels") or [])]
+    if ch.get("other"):
+        labels.append(str(ch["other"]).strip())
+    return ", ".join(labels)
+
+def _file(a: Dict[str, Any]) -> str:
+    if a.get("file_url"):
+        return str(a["file_url"]).strip()
+    for f in a.get("files") or ():
+        url = f.get("url") or f.get("file_url")
+        if url:
+            return str(url).strip()
+    return ""
+
+EXTRACTORS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "text": _scalar("text"), "email": _scalar("email"), "url": _scalar("url"),
+    "number": _scalar("number"), "boolean": _scalar("boolean"), "phone_number": _scalar("phone_number"),
+    "date": _scalar("date"), "choice": _choice, "choices": _choices, "file_url": _file,
+}
+
+
+class CompiledSchema:
+    """A field map resolved ahead of time: id/ref -> (key, destinations)."""
+
+    def __init__(self, fields: Dict[str, str], refs: Optional[Dict[str, str]] = None,
+                 version: str = "built-in", source: str = ""):
+        self.version, self.source = version, source
+        self.loaded_at = time.time()
+        self.fields, self.refs = dict(fields), dict(refs or {})
+        for fid, key in list(self.fields.items()) + list(self.refs.items()):
+            if not isinstance(fid, str) or not isinstance(key, str) or not _KEY_RE.match(key) or key in _RESERVED:
+                raise ValueError(f"bad schema entry {fid!r}: {key!r}")
+        self.routes: Dict[str, Tuple[Optional[str], Optional[str]]] = {
+            key: (INFO_FIELDS.get(key, (None,))[0], EXTRA_FIELDS.get(key, None if key in INFO_FIELDS else key))
+            for key in set(self.fields.values()) | set(self.refs.values())}
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompiledSchema":
+        with open(path, "rb") as f:
+            data = loads(f.read())
+        if not isinstance(data, dict):
+            raise ValueError("schema must be a JSON object")
+        fields = data["fields"] if "fields" in data else data    # a bare {id: key} map works too
+        if not isinstance(fields, dict) or not isinstance(data.get("refs", {}), dict):
+            raise ValueError("`fields` and `refs` must be objects")
+        return cls(fields, data.get("refs"), str(data.get("version") or os.path.basename(path)), path)
+
+
+class FormSchema:
+    def __init__(self, path: str = FORM_SCHEMA_PATH, check_s: float = FORM_SCHEMA_CHECK_S):
+        self.path = path
+        self.check_s = check_s
+        self.compiled = CompiledSchema(FIELD_ID_MAP)
+        self.stats = {"reloads": 0, "errors": 0, "parsed": 0}
+        self.unmapped: Dict[str, int] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if path:
+            self.maybe_reload(force=True)
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """Swap in the schema file if it changed; a bad file keeps the current schema."""
+        now = time.time()
+        if not self.path or (not force and now - self._checked < self.check_s):
+            return False
+        if not self._lock.acquire(blocking=force):
+            return False        # another request is already checking
+        try:
+            self._checked = now
+            try:
+                st = os.stat(self.path)
+            except OSError as e:
+                if force:
+                    print(f"SCHEMA {self.path} not readable ({e}); using the built-in field map", flush=True)
+                return False
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            try:
+                compiled = CompiledSchema.from_file(self.path)
+            except (OSError, ValueError) as e:
+                self.stats["errors"] += 1
+                print(f"SCHEMA {self.path} rejected, keeping {self.compiled.version}: {e}", flush=True)
+                return False
+            self.compiled = compiled    # one reference swap: a parse sees the old or the new map, never a mix
+            self.stats["reloads"] += 1
+            print(f"SCHEMA loaded {compiled.version} ({len(compiled.fields)} fields, "
+                  f"{len(compiled.refs)} refs)", flush=True)
+            return True
+        finally:
+            self._lock.release()
+
+    def parse(self, form_response: Dict[str, Any]) -> Tuple[Dict[str, str], Any, Dict[str, str], Dict[str, str]]:
+        """(parsed answers, StartupInfo, prompt extras, unmapped answers by field id)."""
+        from utils.core import StartupInfo   # lazily: core pulls in OpenAI, Google and PDF libraries
+        self.maybe_reload()
+        c = self.compiled
+        parsed: Dict[str, str] = {}
+        info = {attr: default for attr, default in INFO_FIELDS.values()}
+        extra = {dest: "" for dest in EXTRA_FIELDS.values()}
+        unmapped: Dict[str, str] = {}
+        for a in form_response.get("answers") or ():
+            field = a.get("field") or {}
+            fid = field.get("id")
+            key = c.fields.get(fid) or c.refs.get(field.get("ref"))
+            value = EXTRACTORS.get(a.get("type"), _probe)(a)
+            if key is None:
+                unmapped[fid or field.get("ref") or "?"] = value
+                continue
+            parsed[key] = value
+            to_info, to_extra = c.routes[key]
+            if to_info:
+                info[to_info] = value
+            if to_extra:
+                extra[to_extra] = value
+        self.stats["parsed"] += 1
+        for fid in unmapped:
+            if fid in self.unmapped or len(self.unmapped) < _MAX_UNMAPPED:
+                if fid not in self.unmapped:
+                    print(f"SCHEMA unmapped field {fid} (schema {c.version}); add it to the field map", flush=True)
+                self.unmapped[fid] = self.unmapped.get(fid, 0) + 1
+        return parsed, StartupInfo(**info, email_to=""), extra, unmapped
+
+    def metrics(self) -> Dict[str, Any]:
+        c = self.compiled
+        return {"version": c.version, "source": c.source or "built-in", "fields": len(c.fields),
+                "refs": len(c.refs), "loaded_at": c.loaded_at, **self.stats, "unmapped": dict(self.unmapped)}
+
+
+SCHEMA = FormSchema()
@@ -0,0 +1,93 @@
+# utils/hedge.py
+import threading
+from collections import deque
+from typing import Dict, Optional
+from utils.config import (
+    HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_MIN_DELAY_S, HEDGE_MAX_EXTRA,
+)
+
+
+def percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    xs = sorted(values)
+    k = (len(xs) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+class HedgePolicy:
+    """
+    Decides when a slow assistant run gets a backup run, based on how long
+    recent primaries took (from their start to the deal's first completion),
+    and keeps the hedging counters. A primary cancelled because its hedge won
+    counts with the time it had run: a lower bound, so the percentile can't
+    drift down just because hedges keep winning.
+    """
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED, pct: float = HEDGE_PERCENTILE,
+                 min_samples: int = HEDGE_MIN_SAMPLES, min_delay_s: float = HEDGE_MIN_DELAY_S,
+                 max_extra: float = HEDGE_MAX_EXTRA, window: int = 200):
+        self.enabled = enabled
+        self.pct = pct
+        self.min_samples = min_samples
+        self.min_delay_s = min_delay_s
+        self.max_extra = max_extra
+        self.durations = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, float] = {
+            "runs": 0, "hedges_fired": 0, "hedges_skipped_budget": 0,
+            "hedge_wins": 0, "primary_wins": 0, "est_seconds_saved": 0.0, "censored_samples": 0,
+        }
+
+    def threshold(self) -> Optional[float]:
+        with self.lock:
+            if len(self.durations) < self.min_samples:
+                return None
+            p = percentile(list(self.durations), self.pct)
+        return max(p, self.min_delay_s)
+
+    def decide(self, elapsed: float) -> Optional[bool]:
+        """None: not yet. True: start a hedge. False: over budget, stop asking."""
+        if not self.enabled:
+            return False
+        t = self.threshold()
+        if t is None or elapsed < t:
+            return None
+        with self.lock:
+            # cap extra spend: hedges as a share of all runs started
+            if self.metrics["hedges_fired"] + 1 > self.max_extra * max(1, self.metrics["runs"]):
+                self.metrics["hedges_skipped_budget"] += 1
+                return False
+            self.metrics["hedges_fired"] += 1
+        return True
+
+    def record_run(self):
+        with self.lock:
+            self.metrics["runs"] += 1
+
+    def record_duration(self, seconds: float, censored: bool = False):
+        """`censored`: the run was cancelled, so it would have taken at least `seconds`."""
+        with self.lock:
+            self.durations.append(seconds)
+            if censored:
+                self.metrics["censored_samples"] += 1
+
+    def record_outcome(self, hedged: bool, hedge_won: bool, elapsed: float):
+        with self.lock:
+            if not hedged:
+                return
+            if hedge_won:
+                self.metrics["hedge_wins"] += 1
+                # estimate: a primary slow enough to be hedged tends to finish
+                # around the mean of recorded tail durations
+                t = percentile(list(self.durations), self.pct) or elapsed
+                tail = [d for d in self.durations if d >= t]
+                if tail:
+                    self.metrics["est_seconds_saved"] += max(0.0, sum(tail) / len(tail) - elapsed)
+            else:
+                self.metrics["primary_wins"] += 1
+
+
+HEDGE = HedgePolicy()
@@ -0,0 +1,200 @@
+# utils/memo_bench.py
+import argparse, json, os, shutil, sys, tempfile, time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+# Offline regression benchmark for everything after the LLM: memo parsing,
+# field extraction, scorecard parsing and calibration, tags, rationale, email
+# and PDF rendering and the Sheets row. The real _finish_deal runs over a corpus
+# of recorded assistant outputs (bench/memos/*.json), with delivery and Sheets
+# captured instead of sent, and each case's outputs are checked against the
+# expected fields stored with it. Throughput is reported as memos/sec plus
+# inclusive per-function timings, so a parser speedup can be checked against
+# correctness in one run.
+#
+#   python -m utils.memo_bench                  # accuracy + timings, 5 passes
+#   python -m utils.memo_bench --no-pdf -n 50   # parser-only throughput
+#   python -m utils.memo_bench --accept         # store current outputs as expected (review the diff)
+#
+# New cases come from production: with MEMO_RECORD_DIR set every finished memo
+# is saved with its form (contact details dropped; utils/memo_record.py); copy
+# the useful ones into bench/memos, check them, and --accept them.
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench", "memos")
+FIELDS = ["summary", "traction", "revenue", "team", "round", "tags", "score", "verdict", "action",
+          "mrr", "reason", "subject"]
+_TIMED = ["parse_memo", "extract_field", "extract_revenue", "extract_metrics", "parse_score_any",
+          "calibrate_scorecard", "build_decision_rationale", "infer_tags", "archive_scorecard",
+          "render_html", "render_text", "render_pdf_cached", "info_round_from_prompt"]
+
+
+def load_corpus(root: str = CORPUS_DIR, only: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    cases = []
+    for fn in sorted(os.listdir(root)):
+        if fn.endswith(".json") and (not only or fn[:-5] in only):
+            with open(os.path.join(root, fn), "r", encoding="utf-8") as f:
+                cases.append({**json.load(f), "_id": fn[:-5], "_path": os.path.join(root, fn)})
+    return cases
+
+
+class _Timers:
+    def __init__(self):
+        self.total: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def wrap(self, label: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.total[label] += time.perf_counter() - t0
+                self.calls[label] += 1
+        return timed
+
+
+def _same(field: str, expected: Any, got: Any) -> bool:
+    if field == "tags":
+        return sorted(expected or []) == sorted(got or [])
+    if isinstance(expected, str) and isinstance(got, str):
+        return " ".join(expected.split()) == " ".join(got.split())
+    if isinstance(expected, (int, float)) and isinstance(got, (int, float)):
+        return abs(expected - got) < 1e-6
+    return expected == got
+
+
+def _setup(scratch: str, pdf: bool):
+    """Point every store at `scratch`, import the pipeline, capture delivery and Sheets."""
+    os.environ.update({
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-bench", "GP_RECIPIENTS": "gp@bench.example",
+        "STATUS_DB_PATH": f"{scratch}/status.db", "USAGE_DB_PATH": f"{scratch}/usage.db",
+        "SCORE_ARCHIVE_PATH": f"{scratch}/score_archive.jsonl", "PDF_CACHE_DIR": f"{scratch}/pdf",
+        "RESUBMIT_DIR": f"{scratch}/submissions", "WORK_DB_PATH": f"{scratch}/work.db",
+        "DEDUPE_INDEX_PATH": f"{scratch}/company_index.jsonl", "PDF_ARCHIVE_DIR": "", "MEMO_RECORD_DIR": "",
+        "DELIVERY_MODE": "instant",
+    })
+    import utils.core as core
+    from utils.memo_doc import MemoDoc
+    from utils.pdf import render_pdf_bytes
+
+    capture: Dict[str, Any] = {}
+
+    def deliver(recipients, subject, text, html_body, pdf_bytes, pdf_name, meta):
+        capture["email"] = {"subject": subject, "meta": meta, "pdf_bytes": len(pdf_bytes or b"")}
+        return "sent"
+
+    def sheet(token_path, spreadsheet_id, range_name, values):
+        capture["row"] = values
+        return {"updates": {"updatedRange": "Sheet1!A2:K2"}}
+
+    core.deliver_memo, core.append_row_oauth, core.update_row_oauth = deliver, sheet, sheet
+    # uncached, so every pass pays for the render like a new memo would
+    core.render_pdf_cached = ((lambda text, doc=None: render_pdf_bytes(text, doc=doc)) if pdf
+                              else (lambda text, doc=None: b""))
+    timers = _Timers()
+    for name in _TIMED:
+        setattr(core, name, timers.wrap(name, getattr(core, name)))
+    for name in ("summary", "email_body", "field"):
+        setattr(MemoDoc, name, timers.wrap(f"MemoDoc.{name}", getattr(MemoDoc, name)))
+    return core, capture, timers
+
+
+def observe(core, case: Dict[str, Any], capture: Dict[str, Any]) -> Dict[str, Any]:
+    info = core.StartupInfo(**case["info"])
+    extra = case.get("extra") or {}
+    if "output" in case:
+        mini_memo, full_memo = core.split_memo_output(case["output"])
+    else:
+        mini_memo, full_memo = case["mini_memo"], case["full_memo"]
+    prompt = core._build_prompt(info, extra)
+    capture.clear()
+    t0 = time.perf_counter()
+    core._finish_deal(case["name"], prompt, info, extra, mini_memo, full_memo)
+    elapsed = time.perf_counter() - t0
+    email, row = capture["email"], capture["row"]
+    return {"summary": row[1], "traction": row[2], "revenue": row[3], "team": row[4], "round": row[5],
+            "tags": [t.strip() for t in row[6].split(",") if t.strip()], "score": int(row[7]),
+            "verdict": email["meta"].get("verdict"), "action": row[9], "mrr": email["meta"].get("mrr"),
+            "reason": row[10], "subject": email["subject"], "_elapsed": elapsed}
+
+
+def _short(v: Any, n: int = 70) -> str:
+    s = json.dumps(v, ensure_ascii=False) if not isinstance(v, str) else repr(" ".join(v.split()))
+    return s if len(s) <= n else s[:n - 3] + "..."
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Accuracy + throughput of the post-LLM pipeline over recorded memos.")
+    ap.add_argument("cases", nargs="*", help="case ids (file names without .json); default all")
+    ap.add_argument("--corpus", default=CORPUS_DIR)
+    ap.add_argument("-n", "--repeat", type=int, default=5, help="timed passes over the corpus")
+    ap.add_argument("--no-pdf", action="store_true", help="skip PDF rendering (parser-only timings)")
+    ap.add_argument("--accept", action="store_true", help="write current outputs as the expected fields")
+    ap.add_argument("--min-accuracy", type=float, default=1.0)
+    args = ap.parse_args(argv)
+
+    cases = load_corpus(args.corpus, args.cases)
+    if not cases:
+        print(f"BENCH no cases in {args.corpus}", flush=True)
+        return 2
+    scratch = tempfile.mkdtemp(prefix="vc_bench_")
+    try:
+        core, capture, timers = _setup(scratch, pdf=not args.no_pdf)
+        results = {c["_id"]: observe(core, c, capture) for c in cases}   # also warms imports and regex caches
+
+        if args.accept:
+            for c in cases:
+                got = {k: v for k, v in results[c["_id"]].items() if not k.startswith("_")}
+                changed = [k for k in FIELDS if not _same(k, c.get("expected", {}).get(k), got[k])]
+                body = {k: v for k, v in c.items() if not k.startswith("_")}
+                body["expected"] = got
+                with open(c["_path"], "w", encoding="utf-8") as f:
+                    json.dump(body, f, ensure_ascii=False, indent=1)
+                    f.write("\n")
+                print(f"BENCH {c['_id']}: {'updated ' + ', '.join(changed) if changed else 'unchanged'}")
+            return 0
+
+        checked, hits = defaultdict(int), defaultdict(int)
+        misses = []
+        for c in cases:
+            got = results[c["_id"]]
+            for field, want in (c.get("expected") or {}).items():
+                checked[field] += 1
+                if _same(field, want, got.get(field)):
+                    hits[field] += 1
+                else:
+                    misses.append((c["_id"], field, want, got.get(field)))
+
+        timers.total.clear()
+        timers.calls.clear()
+        t0, elapsed = time.perf_counter(), 0.0
+        for _ in range(args.repeat):
+            for c in cases:
+                elapsed += observe(core, c, capture)["_elapsed"]
+        wall = time.perf_counter() - t0
+        memos = args.repeat * len(cases)
+
+        total_checked, total_hits = sum(checked.values()), sum(hits.values())
+        accuracy = total_hits / total_checked if total_checked else 0.0
+        print(f"BENCH {len(cases)} cases x {args.repeat} passes{' (no PDF)' if args.no_pdf else ''}: "
+              f"{memos / elapsed:.1f} memos/s in _finish_deal ({elapsed / memos * 1000:.1f} ms/memo, "
+              f"{wall:.1f}s wall)")
+        print(f"accuracy: {total_hits}/{total_checked} fields ({accuracy:.1%})")
+        for field in FIELDS:
+            if checked[field]:
+                print(f"  {field:<10} {hits[field]}/{checked[field]}")
+        if misses:
+            print("mismatches:")
+            for cid, field, want, got in misses:
+                print(f"  {cid} {field}: expected {_short(want)} got {_short(got)}")
+        print("per function (inclusive, per memo):")
+        for label in sorted(timers.total, key=lambda k: -timers.total[k]):
+            print(f"  {label:<26} {timers.total[label] / memos * 1000:8.3f} ms  "
+                  f"{timers.calls[label] / memos:5.1f} calls")
+        return 0 if accuracy >= args.min_accuracy else 1
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
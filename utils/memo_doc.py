@@ -0,0 +1,276 @@
+# utils/memo_doc.py
+import html, re
+from typing import Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+
+# One parse of the assistant's markdown, shared by the email HTML builder
+# (utils/email.py via process_deal) and the PDF renderer (utils/pdf.py).
+
+
+class Block(BaseModel):
+    kind: str                 # paragraph | bullets | code | rule
+    text: str = ""
+    items: List[str] = []
+    depths: List[int] = []    # indent level per bullet item
+
+
+class Section(BaseModel):
+    title: str = ""           # "" for the preamble before the first heading
+    level: int = 0            # markdown heading level; bold-line headings count as 3
+    icon: str = ""            # leading emoji, e.g. "🏷️" (kept for email, dropped in PDF)
+    blocks: List[Block] = []
+
+
+class MemoDoc(BaseModel):
+    sections: List[Section] = []
+
+    def field(self, labels: Iterable[str]) -> str:
+        """Body text of the first section whose title matches any label (case-insensitive)."""
+        wanted = {l.lower() for l in labels}
+        for sec in self.sections:
+            if sec.title.lower() in wanted:
+                body = [b for b in sec.blocks if b.kind == "bullets"
+                        or (b.kind == "paragraph" and not _SIGNOFF.match(b.text))]
+                return blocks_to_text(body).strip() or "Unknown"
+        return "Unknown"
+
+    def summary(self) -> str:
+        """Paragraphs between the 'Hi GP,' greeting and the next heading."""
+        found, out = False, []
+        for sec in self.sections:
+            if found and sec.title:
+                break
+            for b in sec.blocks:
+                if not found:
+                    if b.kind == "paragraph" and _GREETING.match(b.text):
+                        found = True
+                        rest = _GREETING.sub("", b.text, count=1).strip()
+                        if rest:
+                            out.append(rest)
+                    continue
+                if b.kind != "paragraph":
+                    break
+                out.append(b.text)
+        return "\n\n".join(out).strip()
+
+    def email_body(self) -> "MemoDoc":
+        """
+        The model's sections without the greeting + intro, wrapper headings,
+        'memo attached' lines, code blocks (the JSON scorecard) and sign-off.
+        """
+        secs: List[Section] = []
+        in_intro = False
+        for sec in self.sections:
+            if _WRAPPER.match(sec.title):
+                sec = Section(blocks=sec.blocks)
+            elif sec.title:
+                in_intro = False
+            blocks = []
+            for b in sec.blocks:
+                if b.kind == "paragraph" and _GREETING.match(b.text):
+                    in_intro = True
+                    continue
+                if in_intro and b.kind == "paragraph":
+                    continue
+                in_intro = False
+                if b.kind == "code" or b.kind == "rule":
+                    continue
+                if b.kind == "paragraph":
+                    if _SIGNOFF.match(b.text):
+                        continue
+                    text = _ATTACHED.sub("", b.text).strip()
+                    if not text:
+                        continue
+                    b = Block(kind="paragraph", text=text)
+                blocks.append(b)
+            if sec.title or blocks:
+                secs.append(Section(title=sec.title, level=sec.level, icon=sec.icon, blocks=blocks))
+        return MemoDoc(sections=secs)
+
+    def __add__(self, other: "MemoDoc") -> "MemoDoc":
+        return MemoDoc(sections=self.sections + other.sections)
+
+
+_GREETING = re.compile(r"(?i)^\s*Hi GP,?\s*")
+_SIGNOFF = re.compile(r"(?is)^\s*Best,?\s*(?:\n.*)?$")
+_ATTACHED = re.compile(r"(?im)^.*Full (?:PDF )?memo attached.*$\n?")
+_WRAPPER = re.compile(r"(?i)^(?:MINI DEAL MEMO EMAIL|EMAIL|FULL DEAL MEMO)$")
+
+_MD_HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+# a line that is only **Title** (optionally after emoji), e.g. "🏷️ **Startup Overview**"
+_BOLD_HEADING = re.compile(r"^\s*((?:[^\w\s*#\-\[(`\"']+\s*)*)\*\*([^*\n]+?)\*\*\s*:?\s*$")
+_BULLET = re.compile(r"^(\s*)(?:[-*•]|\d+[.)])\s+(.*)$")
+_RULE = re.compile(r"^\s*(?:-{3,}|\*{3,}|_{3,})\s*$")
+_FENCE = re.compile(r"^\s*```")
+
+
+def _clean_title(t: str) -> str:
+    t = re.sub(r"^[^\w]+", "", t.replace("**", "")).strip()
+    return t.rstrip(":").strip()
+
+def parse_memo(text: str) -> MemoDoc:
+    sections: List[Section] = [Section()]
+    para: List[str] = []
+    bullets: Optional[Block] = None
+    code: Optional[List[str]] = None
+
+    def flush():
+        nonlocal para, bullets
+        if para:
+            sections[-1].blocks.append(Block(kind="paragraph", text="\n".join(para)))
+            para = []
+        if bullets is not None:
+            sections[-1].blocks.append(bullets)
+            bullets = None
+
+    for line in (text or "").splitlines():
+        if code is not None:
+            if _FENCE.match(line):
+                sections[-1].blocks.append(Block(kind="code", text="\n".join(code)))
+                code = None
+            else:
+                code.append(line)
+            continue
+        if _FENCE.match(line):
+            flush()
+            code = []
+            continue
+        if not line.strip():
+            flush()
+            continue
+        m = _MD_HEADING.match(line)
+        b = None if m else _BOLD_HEADING.match(line)
+        if m or b:
+            flush()
+            title = _clean_title(m.group(2) if m else b.group(2))
+            icon = "" if m else b.group(1).split()[0] if b.group(1).strip() else ""
+            sections.append(Section(title=title, level=len(m.group(1)) if m else 3, icon=icon))
+            continue
+        if _RULE.match(line):
+            flush()
+            sections[-1].blocks.append(Block(kind="rule"))
+            continue
+        bm = _BULLET.match(line)
+        if bm:
+            if para:
+                flush()
+            if bullets is None:
+                bullets = Block(kind="bullets")
+            bullets.items.append(bm.group(2).strip())
+            bullets.depths.append(len(bm.group(1).replace("\t", "    ")) // 2)
+            continue
+        if bullets is not None and line[:1].isspace():
+            bullets.items[-1] += " " + line.strip()   # wrapped bullet text
+            continue
+        if bullets is not None:
+            flush()
+        para.append(line.rstrip())
+    if code is not None:
+        sections[-1].blocks.append(Block(kind="code", text="\n".join(code)))
+    flush()
+    if not sections[0].blocks:
+        sections.pop(0)
+    return MemoDoc(sections=sections)
+
+
+def splice_sections(text: str, bodies: Dict[str, str],
+                    aliases: Optional[Dict[str, List[str]]] = None) -> Tuple[str, List[str]]:
+    """
+    Replace the body under each heading in `bodies` (matched case-insensitively,
+    also by `aliases`) and keep every other line of `text` as is. A body runs
+    until the next heading, code fence, rule or sign-off. Returns the new text
+    and the titles that had no heading to replace.
+    """
+    names = {t: {n.lower() for n in [t] + (aliases or {}).get(t, [])} for t in bodies}
+    out: List[str] = []
+    done: List[str] = []
+    skipping, in_code = False, False
+    for line in (text or "").splitlines():
+        if _FENCE.match(line):
+            in_code, skipping = not in_code, False
+            out.append(line)
+            continue
+        if in_code:
+            out.append(line)
+            continue
+        m = _MD_HEADING.match(line)
+        b = None if m else _BOLD_HEADING.match(line)
+        if m or b:
+            title = _clean_title(m.group(2) if m else b.group(2)).lower()
+            hit = next((t for t, ns in names.items() if title in ns and t not in done), None)
+            out.append(line)
+            skipping = hit is not None
+            if hit:
+                done.append(hit)
+                out.extend(["", bodies[hit].strip(), ""])
+            continue
+        if skipping and (_RULE.match(line) or _SIGNOFF.match(line)):
+            skipping = False
+        if not skipping:
+            out.append(line)
+    return "\n".join(out), [t for t in bodies if t not in done]
+
+
+# --- renderers ---
+_INLINE = [
+    (re.compile(r"\*\*(.+?)\*\*"), r"<b>\1</b>"),
+    (re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])"), r"<i>\1</i>"),
+    (re.compile(r"`([^`]+)`"), r"<code>\1</code>"),
+    (re.compile(r"\[([^\]]+)\]\((https?://[^)\s]+)\)"), r'<a href="\2">\1</a>'),
+]
+
+def inline_html(text: str) -> str:
+    out = html.escape(text, quote=False)
+    for rx, rep in _INLINE:
+        out = rx.sub(rep, out)
+    return out.replace("\n", "<br>")
+
+def _strip_inline(text: str) -> str:
+    text = re.sub(r"\*\*(.+?)\*\*", r"\1", text)
+    text = re.sub(r"\[([^\]]+)\]\((https?://[^)\s]+)\)", r"\1 (\2)", text)
+    return text.replace("`", "")
+
+def render_html(doc: MemoDoc, heading_tag: str = "h3", icons: bool = True) -> str:
+    parts: List[str] = []
+    for sec in doc.sections:
+        if sec.title:
+            icon = f"{sec.icon} " if icons and sec.icon else ""
+            parts.append(f"<{heading_tag}>{icon}{inline_html(sec.title)}</{heading_tag}>")
+        for b in sec.blocks:
+            if b.kind == "paragraph":
+                parts.append(f"<p>{inline_html(b.text)}</p>")
+            elif b.kind == "bullets":
+                lis = "".join(
+                    f'<li style="margin-left:{d * 16}px">{inline_html(t)}</li>' if d else f"<li>{inline_html(t)}</li>"
+                    for t, d in zip(b.items, b.depths))
+                parts.append(f"<ul>{lis}</ul>")
+            elif b.kind == "code":
+                parts.append(f"<pre>{html.escape(b.text)}</pre>")
+            elif b.kind == "rule":
+                parts.append("<hr>")
+    return "\n".join(parts)
+
+def blocks_to_text(blocks: List[Block]) -> str:
+    lines: List[str] = []
+    for b in blocks:
+        if b.kind == "paragraph":
+            lines.append(b.text)
+        elif b.kind == "bullets":
+            lines.extend("  " * d + "- " + t for t, d in zip(b.items, b.depths))
+        elif b.kind == "code":
+            lines.append(b.text)
+        lines.append("")
+    return "\n".join(lines).strip()
+
+def render_text(doc: MemoDoc) -> str:
+    """Plain text for the FPDF fallback: headings on their own line, no markdown markers."""
+    out: List[str] = []
+    for sec in doc.sections:
+        if sec.title:
+            out.append(sec.title)
+            out.append("")
+        body = blocks_to_text(sec.blocks)
+        if body:
+            out.append(_strip_inline(body))
+            out.append("")
+    return "\n".join(out).strip()
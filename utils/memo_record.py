@@ -0,0 +1,28 @@
+# utils/memo_record.py
+import hashlib, json, os, re, time
+from typing import Any, Dict, Optional
+
+# Pipeline side of the memo benchmark: with MEMO_RECORD_DIR set, _finish_deal
+# saves each finished memo's raw model output and form here in the case format
+# utils/memo_bench.py reads. Kept apart from the benchmark so production does
+# not import it.
+
+_CONTACT = {"first_name", "last_name", "founder_email"}
+
+
+def record_memo(root: str, name: str, info: Any, extra: Optional[Dict[str, Any]],
+                mini_memo: str, full_memo: str):
+    """Save one finished memo as a benchmark case (no expected fields yet). Never raises."""
+    case = {"name": name, "info": info.model_dump(),
+            "extra": {k: v for k, v in (extra or {}).items() if k not in _CONTACT},
+            "mini_memo": mini_memo, "full_memo": full_memo, "recorded_at": time.time()}
+    slug = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")[:40] or "memo"
+    digest = hashlib.sha256((mini_memo + full_memo).encode("utf-8")).hexdigest()[:8]
+    path = os.path.join(root, f"{time.strftime('%Y%m%d')}_{slug}_{digest}.json")
+    try:
+        os.makedirs(root, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(case, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"BENCH record of {name} failed: {e}", flush=True)
@@ -1,15 +1,43 @@
 from fpdf import FPDF
 from fpdf.errors import FPDFException
-import os, re
+from concurrent.futures import ThreadPoolExecutor
+import io, os, re
+from typing import Optional
+from utils.memo_doc import MemoDoc, parse_memo, render_html, render_text
+from utils.config import PDF_OPTIMIZE, PDF_IMAGE_MAX_PX, PDF_IMAGE_QUALITY, PDF_ARCHIVE_MAX_FILES
+
+# Bump whenever rendering output changes, so cached PDFs are not reused
+RENDERER_VERSION = "4"
 
 # Optional HTML pipeline
 _HAS_HTML = True
 try:
-    import markdown2
     from xhtml2pdf import pisa
 except Exception:
     _HAS_HTML = False
 
+PDF_CSS = """
+<style>
+  body { font-family: Helvetica; font-size: 10.5pt; line-height: 1.35; }
+  h1, h2, h3 { color: #1a1a1a; margin: 12pt 0 4pt 0; }
+  h3 { font-size: 12.5pt; }
+  pre { font-size: 8.5pt; background: #f4f4f4; }
+</style>
+"""
+
+# Optional post-processing. fpdf2 already subsets embedded fonts and Latin-1
+# memos use core fonts, so recompression and object dedup only take another
+# ~5-13% off typical memos (short of a severalfold cut); image downsampling is
+# the remaining lever when decks or charts are embedded. Sizes are summed in
+# PDF_STATS for /webhook/metrics rather than logged per render.
+_HAS_PYPDF = True
+try:
+    from pypdf import PdfWriter
+except Exception:
+    _HAS_PYPDF = False
+
+PDF_STATS = {"optimized": 0, "bytes_before": 0, "bytes_after": 0}
+
 
 # --- sanitizers ---
 def sanitize_text(text: str):
@@ -99,42 +127,50 @@ _EMOJI_RE = re.compile(
 def remove_emojis(text: str) -> str:
     return _EMOJI_RE.sub("", text)
 
-def generate_pdf_from_text(text: str, output_path: str):
-    # Ensure directory exists BEFORE writing anything
-    outdir = os.path.dirname(output_path) or "."
-    os.makedirs(outdir, exist_ok=True)
+def safe_filename(name: str, max_len: int = 80) -> str:
+    # company names come straight from the form; keep them out of path syntax
+    cleaned = re.sub(r"[^A-Za-z0-9._-]+", "_", name or "").strip("._")
+    return cleaned[:max_len] or "deal"
 
-    # Try HTML -> PDF if libs are available
-    if _HAS_HTML:
-        try:
-            html = markdown2.markdown(text or "")
-            with open(output_path, "wb") as f:
-                pisa.CreatePDF(html, dest=f)
-            # If xhtml2pdf produced a non-empty file, we're done
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                return output_path
-        except Exception:
-            # fall through to FPDF fallback
-            pass
+def _render_html(doc: MemoDoc):
+    html = f"<html><head>{PDF_CSS}</head><body>{render_html(doc, icons=False)}</body></html>"
+    buf = io.BytesIO()
+    result = pisa.CreatePDF(html, dest=buf)
+    if getattr(result, "err", 0):
+        return None
+    data = buf.getvalue()
+    return data or None
 
-    # Fallback: plain FPDF rendering (always works)
+def _is_latin1(text: str) -> bool:
+    try:
+        text.encode("latin-1")
+        return True
+    except UnicodeEncodeError:
+        return False
+
+def _render_fpdf(text: str, optimize: bool = PDF_OPTIMIZE) -> bytes:
     pdf = FPDF()
     pdf.set_margins(15, 15, 15)
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.add_page()
 
-    # Load Unicode font if available; otherwise Arial
+    cleaned = sanitize_text(text or "")
+
+    # Latin-1 text renders with a core font and embeds nothing; otherwise load
+    # the Unicode font (fpdf2 embeds only the glyphs used)
     font_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "fonts", "DejaVuSans.ttf"))
-    if os.path.exists(font_path):
-        pdf.add_font("DejaVu", "", font_path, uni=True)
+    if optimize and _is_latin1(cleaned):
+        pdf.set_font("Helvetica", size=11)
+    elif os.path.exists(font_path):
+        pdf.add_font("DejaVu", "", font_path)
         pdf.set_font("DejaVu", size=11)
     else:
         pdf.set_font("Arial", size=11)
+    pdf.set_compression(True)
 
     max_w = pdf.w - pdf.l_margin - pdf.r_margin
     line_h = 6
 
-    cleaned = sanitize_text(text or "")
     for raw_line in cleaned.strip().split("\n"):
         prepped = break_long_sequences(raw_line, max_len=30)
         try:
@@ -143,5 +179,104 @@ def generate_pdf_from_text(text: str, output_path: str):
             pdf.set_x(pdf.l_margin)
             write_wrapped_line(pdf, prepped, line_h, max_w)
 
-    pdf.output(output_path)
+    return bytes(pdf.output())
+
+def optimize_pdf_bytes(data: bytes, image_max_px: int = PDF_IMAGE_MAX_PX,
+                       image_quality: int = PDF_IMAGE_QUALITY) -> bytes:
+    """Recompress content streams, drop duplicate objects, optionally downsample images."""
+    if not _HAS_PYPDF:
+        return data
+    writer = PdfWriter(clone_from=io.BytesIO(data))
+    for page in writer.pages:
+        page.compress_content_streams(level=9)
+        if image_max_px:
+            for img in page.images:
+                pil = img.image
+                if max(pil.size) > image_max_px:
+                    pil.thumbnail((image_max_px, image_max_px))
+                img.replace(pil, quality=image_quality)
+    writer.compress_identical_objects()
+    buf = io.BytesIO()
+    writer.write(buf)
+    out = buf.getvalue()
+    return out if len(out) < len(data) else data
+
+def renderer_signature() -> str:
+    # everything that changes the output bytes; used as part of cache keys
+    return f"{RENDERER_VERSION}:{int(PDF_OPTIMIZE)}:{PDF_IMAGE_MAX_PX}:{PDF_IMAGE_QUALITY}"
+
+def _render(doc: MemoDoc) -> bytes:
+    # Try HTML -> PDF if libs are available
+    if _HAS_HTML:
+        try:
+            data = _render_html(doc)
+            if data:
+                return data
+        except Exception:
+            # fall through to FPDF fallback
+            pass
+    # Fallback: plain FPDF rendering (always works)
+    return _render_fpdf(render_text(doc))
+
+def render_pdf_bytes(text: str, optimize: bool = PDF_OPTIMIZE, doc: Optional[MemoDoc] = None) -> bytes:
+    """Render the memo to PDF bytes in memory; nothing touches disk. Pass `doc` if already parsed."""
+    data = _render(doc if doc is not None else parse_memo(text))
+    if not optimize:
+        return data
+    before = len(data)
+    try:
+        data = optimize_pdf_bytes(data)
+    except Exception as e:
+        print(f"PDF optimize skipped: {e}", flush=True)
+    PDF_STATS["optimized"] += 1
+    PDF_STATS["bytes_before"] += before
+    PDF_STATS["bytes_after"] += len(data)
+    return data
+
+def write_pdf(data: bytes, output_path: str) -> str:
+    # write to a temp file and rename, so a failed write never leaves a partial PDF
+    outdir = os.path.dirname(output_path) or "."
+    os.makedirs(outdir, exist_ok=True)
+    tmp = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, output_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
     return output_path
+
+def generate_pdf_from_text(text: str, output_path: str):
+    return write_pdf(render_pdf_bytes(text), output_path)
+
+# Optional archive of rendered memos, written off the request path
+_ARCHIVER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-archive")
+
+def prune_archive(archive_dir: str, max_files: int = PDF_ARCHIVE_MAX_FILES) -> int:
+    """Delete the oldest archived memos beyond max_files (0 keeps everything)."""
+    if max_files <= 0:
+        return 0
+    try:
+        memos = [e for e in os.scandir(archive_dir) if e.name.endswith("_DealMemo.pdf")]
+    except OSError:
+        return 0
+    memos.sort(key=lambda e: e.stat().st_mtime)
+    removed = 0
+    for e in memos[:max(0, len(memos) - max_files)]:
+        try:
+            os.remove(e.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _archive(data: bytes, path: str):
+    write_pdf(data, path)
+    prune_archive(os.path.dirname(path))
+
+def archive_pdf_async(data: bytes, name: str, archive_dir: str) -> str:
+    """Queue a copy of the PDF for disk; returns the path it will land at."""
+    path = os.path.join(archive_dir, f"{safe_filename(name)}_DealMemo.pdf")
+    _ARCHIVER.submit(_archive, data, path)
+    return path
@@ -0,0 +1,104 @@
+# utils/pdf_cache.py
+import hashlib, os, threading, time
+from collections import OrderedDict
+from typing import Dict, Optional
+from utils.memo_doc import MemoDoc
+from utils.config import PDF_CACHE_DIR, PDF_CACHE_MAX_ENTRIES, PDF_CACHE_MAX_BYTES
+from utils.pdf import renderer_signature, render_pdf_bytes, write_pdf
+
+
+def cache_key(text: str) -> str:
+    # the exact text the renderer parses: the HTML path keeps emoji and dashes
+    # that sanitize_text would fold, so two memos differing only there differ here
+    h = hashlib.sha256()
+    h.update(renderer_signature().encode("utf-8") + b"\0")
+    h.update((text or "").encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+class PdfCache:
+    """
+    Bounded LRU of rendered PDFs on disk, one file per key. Recency lives in
+    an OrderedDict rebuilt from file mtimes on first use.
+    """
+
+    def __init__(self, root: str = PDF_CACHE_DIR, max_entries: int = PDF_CACHE_MAX_ENTRIES,
+                 max_bytes: int = PDF_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.index: Optional["OrderedDict[str, int]"] = None   # key -> size, oldest first
+        self.total = 0
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pdf")
+
+    def _load_index(self):
+        if self.index is not None:
+            return
+        entries = []
+        if os.path.isdir(self.root):
+            for e in os.scandir(self.root):
+                if e.name.endswith(".pdf"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, e.name[:-4], st.st_size))
+        self.index = OrderedDict((k, size) for _, k, size in sorted(entries))
+        self.total = sum(self.index.values())
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            self._load_index()
+            if key not in self.index:
+                self.stats["misses"] += 1
+                return None
+            self.index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            now = time.time()
+            os.utime(self._path(key), (now, now))  # recency survives restarts
+        except OSError:
+            with self.lock:
+                self.total -= self.index.pop(key, 0)
+                self.stats["misses"] += 1
+            return None
+        with self.lock:
+            self.stats["hits"] += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        write_pdf(data, self._path(key))
+        with self.lock:
+            self._load_index()
+            self.total += len(data) - self.index.pop(key, 0)
+            self.index[key] = len(data)
+            while self.index and (len(self.index) > self.max_entries or self.total > self.max_bytes):
+                old, size = self.index.popitem(last=False)
+                self.total -= size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(self._path(old))
+                except OSError:
+                    pass
+
+    def summary(self) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {**self.stats, "entries": len(self.index or {}), "bytes": self.total,
+                    "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0}
+
+
+PDF_CACHE = PdfCache()
+
+def render_pdf_cached(text: str, doc: Optional[MemoDoc] = None) -> bytes:
+    key = cache_key(text)
+    data = PDF_CACHE.get(key)
+    if data is None:
+        data = render_pdf_bytes(text, doc=doc)
+        try:
+            PDF_CACHE.put(key, data)
+        except OSError as e:
+            print(f"PDF cache write failed: {e}", flush=True)
+    return data
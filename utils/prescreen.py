@@ -0,0 +1,162 @@
+# utils/prescreen.py
+import json, re
+from typing import Any, Dict, Optional
+from utils.config import PRESCREEN_MODEL
+from utils.ratelimit import GOVERNOR, estimate_tokens
+from utils.rubric import DEFAULT_RUBRIC, has_moat_keyword
+from utils.usage import USAGE
+from utils.traction import extract_metrics
+
+# Cheap first tier: a rough scorecard from the form fields alone, in the same
+# {"scores", "total", "verdict"} shape the memo parsers produce. Verdict
+# thresholds and moat keywords come from the rubric, so a rubric change moves
+# the pre-screen too.
+
+TEAM_SIGNALS = ["ex-google", "ex-meta", "ex-amazon", "ex-microsoft", "ex-apple", "openai",
+                "deepmind", "exited", "acquired", "y combinator", "yc ", "phd", "serial",
+                "founded", "former cto", "former ceo", "vp "]
+MOAT_WEAK_SIGNALS = ["patent", "proprietary", "network effect", "ip ", "exclusive", "dataset"]
+RECURRING_MODELS = ["subscription", "saas", "recurring", "per seat", "per-seat", "license",
+                    "usage-based", "usage based"]
+TRANSACTION_MODELS = ["transaction", "commission", "take rate", "marketplace", "fee"]
+REGULATED = ["healthcare", "hospital", "insurance", "bank", "lending", "government",
+             "defense", "pharma", "clinical"]
+MAX_POINTS = {"team": 25, "market": 20, "traction": 20, "business_model": 10, "moat": 25}
+
+
+def _has(text: str, words) -> bool:
+    return any(w in text for w in words)
+
+def _fields(info: Any, extra: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    extra = extra or {}
+    return {
+        "team":     " ".join(filter(None, [extra.get("team_detail", ""), getattr(info, "team", "")])),
+        "market":   " ".join(filter(None, [extra.get("market", ""), extra.get("competition", "")])),
+        "traction": " ".join(filter(None, [extra.get("traction_detail", ""), getattr(info, "traction", "")])),
+        "model":    extra.get("business_model", ""),
+        "moat":     " ".join(filter(None, [extra.get("moat", ""), extra.get("solution", ""),
+                                            getattr(info, "product", "")])),
+        "risk":     " ".join(filter(None, [extra.get("risks", ""), extra.get("industry", ""),
+                                            extra.get("market", ""), extra.get("problem", "")])),
+        "university": extra.get("university", ""),
+    }
+
+def verdict_for(total: int) -> str:
+    return DEFAULT_RUBRIC.verdict(total)
+
+def score_rules(info: Any, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    f = {k: v.lower() for k, v in _fields(info, extra).items()}
+
+    team = 0
+    if f["team"]:
+        team = 6 + (8 if _has(f["team"], TEAM_SIGNALS) else 0)
+        team += min(4, 2 * f["team"].count("linkedin"))
+        team += 3 if f["university"] else 0
+        team += 3 if _has(f["team"], ["cto", "technical co-founder", "engineer"]) else 0
+
+    market = 0
+    if f["market"]:
+        market = 5
+        if re.search(r"\b\d+(?:\.\d+)?\s*(?:b|bn|billion)\b", f["market"]):
+            market += 8
+        elif "million" in f["market"]:
+            market += 3
+    tm = extract_metrics(f["traction"])
+    mrr = tm.mrr
+    customers = max(tm.customers or 0, tm.users or 0)
+    if mrr or customers >= 10:
+        market += 5
+
+    traction = 0
+    if f["traction"]:
+        traction = 3
+        if mrr:
+            traction = 18 if mrr >= 100_000 else 13 if mrr >= 20_000 else 9 if mrr >= 5_000 else 6
+        traction += 3 if customers >= 10 else 0
+        traction += 2 if tm.growth_pct is not None else 0
+
+    # business model and moat have no question on the built-in form; without one
+    # (or a keyword elsewhere in the answers) they are imputed below, not scored 0-ish
+    extra = extra or {}
+    unasked = set()
+    src = f["model"] + " " + f["traction"]
+    if _has(src, RECURRING_MODELS):
+        business_model = 7
+    elif _has(src, TRANSACTION_MODELS):
+        business_model = 6
+    elif "business_model" in extra:
+        business_model = 3 if src.strip() else 0
+    else:
+        business_model = 0
+        unasked.add("business_model")
+
+    if has_moat_keyword(f["moat"]):
+        moat = DEFAULT_RUBRIC.moat_floor
+    elif _has(f["moat"], MOAT_WEAK_SIGNALS):
+        moat = 16
+    elif "moat" in extra:
+        moat = 10 if f["moat"] else 0
+    else:
+        moat = 0
+        unasked.add("moat")
+
+    risk_adj = -3 if _has(f["risk"], REGULATED) else 0
+
+    scores = {
+        "team": min(team, 25), "market": min(market, 20), "traction": min(traction, 20),
+        "business_model": min(business_model, 10), "moat": min(int(moat), 25),
+    }
+    # rescale: an unasked subscore gets the share of its points the answered ones earned
+    asked = [k for k in MAX_POINTS if k not in unasked]
+    share = sum(scores[k] for k in asked) / sum(MAX_POINTS[k] for k in asked) if asked else 0.0
+    for k in unasked:
+        scores[k] = int(round(MAX_POINTS[k] * share))
+    scores.update(risk_adj=risk_adj, bonus=0)
+    total = max(0, min(100, sum(scores.values())))
+    return {"scores": scores, "total": total, "verdict": verdict_for(total), "source": "rules",
+            "imputed": sorted(unasked)}
+
+
+PRESCREEN_PROMPT = """Score this startup application for a VC pre-screen. Use only the facts given.
+Rubric (max points): team 25, market 20, traction 20, business_model 10, moat 25,
+risk_adj 0 to -15, bonus 0 to +10. Total is the sum, bounded 0..100.
+Reply with JSON only: {{"scores": {{"team": 0, "market": 0, "traction": 0, "business_model": 0, "moat": 0, "risk_adj": 0, "bonus": 0}}, "total": 0}}
+
+Company: {name} ({website}), round: {round}, lead investor: {investors}
+Problem: {problem}
+Solution: {solution}
+Market: {market}
+Traction: {traction}
+Business model: {model}
+Team: {team}
+University: {university}
+"""
+
+def score_model(info: Any, extra: Optional[Dict[str, Any]], client) -> Dict[str, Any]:
+    extra = extra or {}
+    f = _fields(info, extra)
+    prompt = PRESCREEN_PROMPT.format(
+        name=info.name, website=info.website, round=info.round, investors=info.investors,
+        problem=extra.get("problem", ""), solution=extra.get("solution", "") or info.product,
+        market=f["market"], traction=f["traction"], model=f["model"], team=f["team"],
+        university=f["university"],
+    )
+    resp = GOVERNOR.call(client.chat.completions.with_raw_response.create,
+                         model=PRESCREEN_MODEL,
+                         messages=[{"role": "user", "content": prompt}],
+                         response_format={"type": "json_object"},
+                         max_tokens=200,
+                         tokens=estimate_tokens(prompt, 200))
+    USAGE.record("prescreen", PRESCREEN_MODEL, resp.usage)
+    sc = json.loads(resp.choices[0].message.content or "{}")
+    scores = {k: int(v) for k, v in (sc.get("scores") or {}).items()}
+    total = max(0, min(100, int(sc.get("total", sum(scores.values())))))
+    return {"scores": scores, "total": total, "verdict": verdict_for(total), "source": "model"}
+
+def prescreen(info: Any, extra: Optional[Dict[str, Any]], mode: str, client=None) -> Dict[str, Any]:
+    if mode == "model" and client is not None:
+        try:
+            return score_model(info, extra, client)
+        except Exception as e:
+            print(f"PRESCREEN model failed, using rules: {e}", flush=True)
+    return score_rules(info, extra)
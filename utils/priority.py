@@ -0,0 +1,161 @@
+# utils/priority.py
+import asyncio, re, threading, time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from utils.config import PRIORITY_WEIGHTS, PRIORITY_AGING_S, DEAL_CONCURRENCY
+from utils.hedge import percentile
+
+# Which deals reach the GPs first when there is a backlog. A deal's lane comes
+# from its form answers; LanePolicy decides which lane is served next (stride
+# scheduling over the lane weights, with aging). The work queue uses it when a
+# worker claims a job, LaneGate when deals run inline in the web process.
+
+LANES = ["high", "normal", "low"]
+
+# a lead counts only when the answer names one: "No lead yet" or "looking for
+# one" is the absence of a lead, whatever else the text says
+_NO_LEAD_RE = re.compile(
+    r"(?i)^\W*$|\b(?:no|nope|nah|none|not(?:\s+yet)?|nobody|unknown|maybe|tb[ad]|n/?a|yet\s+to|looking|"
+    r"seeking|searching|hoping|open\s+to|pending|in\s+(?:talks|discussions?)|bootstrapp(?:ed|ing)|"
+    r"self[\s-]*funded|friends\s+(?:and|&)\s+family)\b")
+# A named firm is case-sensitive: a capitalised word inside a sentence ("from
+# Sequoia"), an answer that is only capitalised names ("Kima Ventures"), or
+# "a16z". A sentence's own first word ("Just us", "Talking to some folks") is not.
+_LEAD_RE = re.compile(
+    r"(?i:\b(?:led\s+by|lead(?:ing)?|committed|term\s+sheet|ventures?|capital|partners|vc|fund|angels?|"
+    r"accelerator|combinator|syndicate)\b)"
+    r"|(?<=[\w,;&(]\s)[A-Z][\w&.-]+"
+    r"|^\s*[A-Z][\w&.-]+(?:\s+[A-Z][\w&.-]+){0,3}\s*$"
+    r"|\b[a-z]+\d+[a-z]*\b")
+_ROUND_RANK = [(re.compile(r"(?i)series\s*[b-z]\b|growth"), 3),
+               (re.compile(r"(?i)series\s*a\b"), 2),
+               (re.compile(r"(?i)pre[\s-]*seed|angel|friends"), 0),
+               (re.compile(r"(?i)\bseed\b"), 1)]
+_WARM_RE = re.compile(r"(?i)\b(?:warm\s+intro|intro(?:duced|duction)?\s+(?:by|from|via)|referr(?:ed|al)\s+(?:by|from))\b")
+
+
+def _weights(spec: str) -> Dict[str, float]:
+    out = {lane: 1.0 for lane in LANES}
+    for part in (spec or "").split(","):
+        lane, _, w = part.partition(":")
+        if lane.strip() in out:
+            try:
+                out[lane.strip()] = max(0.1, float(w))
+            except ValueError:
+                pass
+    return out
+
+
+def deal_priority(parsed: Dict[str, str]) -> Tuple[str, List[str]]:
+    """Lane for a deal from its parsed answers, with the reasons that put it there."""
+    score, reasons = 0, []
+    investors = (parsed.get("investors") or "").strip()
+    if not _NO_LEAD_RE.search(investors) and _LEAD_RE.search(investors):
+        score += 2
+        reasons.append("lead investor")
+    rank = next((r for rx, r in _ROUND_RANK if rx.search(parsed.get("round") or "")), 0)
+    if rank:
+        score += rank
+        reasons.append(f"round {parsed.get('round')}")
+    if parsed.get("referral") or any(_WARM_RE.search(v or "") for v in parsed.values()):
+        score += 2
+        reasons.append("warm intro")
+    lane = "high" if score >= 3 else "normal" if score >= 1 else "low"
+    return lane, reasons
+
+
+def percentiles(values: Iterable[float], qs=(50, 90, 99)) -> Dict[str, float]:
+    vals = sorted(values)
+    return {f"p{q}": round(percentile(vals, q), 1) if vals else 0.0 for q in qs}
+
+
+class LanePolicy:
+    """
+    Picks the lane to serve next given the enqueue time of each non-empty lane's
+    oldest deal. Every PRIORITY_AGING_S a waiting deal counts as one lane higher;
+    among the (aged) lanes present, the one with the lowest stride pass wins, so
+    over a backlog lanes are served in proportion to their weights.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, aging_s: float = PRIORITY_AGING_S):
+        self.weights = weights or _weights(PRIORITY_WEIGHTS)
+        self.aging_s = aging_s
+        self._pass = {lane: 0.0 for lane in LANES}
+        self._vtime = 0.0
+        self._lock = threading.Lock()
+
+    def effective(self, lane: str, waited: float) -> str:
+        i = LANES.index(lane) if lane in LANES else LANES.index("normal")
+        if self.aging_s > 0:
+            i = max(0, i - int(waited // self.aging_s))
+        return LANES[i]
+
+    def pick(self, heads: Dict[str, float], now: Optional[float] = None) -> Optional[str]:
+        if not heads:
+            return None
+        now = now or time.time()
+        eff = {lane: self.effective(lane, now - t) for lane, t in heads.items()}
+        with self._lock:
+            # a lane that sat idle resumes at the current virtual time, not with banked credit
+            passes = {e: max(self._pass[e], self._vtime) for e in set(eff.values())}
+            served = min(passes, key=lambda e: (passes[e], LANES.index(e)))
+            self._vtime = passes[served]
+            self._pass[served] = passes[served] + 1.0 / self.weights[served]
+        # within the served lane, an aged-up deal competes with native ones by age
+        return min((lane for lane in heads if eff[lane] == served), key=lambda lane: heads[lane])
+
+
+POLICY = LanePolicy()
+
+
+class LaneGate:
+    """
+    Inline-mode scheduler: at most `slots` deals run at once in this process;
+    the rest wait in their lane and are released by POLICY as slots free up.
+    """
+
+    def __init__(self, slots: int = DEAL_CONCURRENCY, policy: LanePolicy = POLICY):
+        self.slots = slots
+        self.policy = policy
+        self.active = 0
+        self.waiting: Dict[str, deque] = {lane: deque() for lane in LANES}
+        self.waits: Dict[str, deque] = {lane: deque(maxlen=500) for lane in LANES}
+
+    async def run(self, lane: str, fn, *args, **kwargs) -> Any:
+        lane = lane if lane in LANES else "normal"
+        t0 = time.time()
+        if self.slots > 0 and (self.active >= self.slots or any(self.waiting.values())):
+            fut = asyncio.get_running_loop().create_future()
+            self.waiting[lane].append((t0, fut))
+            try:
+                await fut                  # the releasing deal hands its slot over
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release()        # slot was handed to us just before the cancel
+                raise
+        else:
+            self.active += 1
+        self.waits[lane].append(time.time() - t0)
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self._release()
+
+    def _release(self):
+        while True:
+            heads = {lane: q[0][0] for lane, q in self.waiting.items() if q}
+            lane = self.policy.pick(heads)
+            if lane is None:
+                self.active -= 1
+                return
+            _, fut = self.waiting[lane].popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {lane: {"waiting": len(self.waiting[lane]), **percentiles(self.waits[lane])}
+                for lane in LANES} | {"running": self.active, "slots": self.slots}
+
+
+GATE = LaneGate()
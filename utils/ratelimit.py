@@ -0,0 +1,179 @@
+# utils/ratelimit.py
+import random, re, threading, time
+from typing import Any, Callable, Dict, Optional
+from openai import RateLimitError
+from utils.config import (
+    OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_RETRIES,
+    OPENAI_COMPLETION_TOKENS_EST,
+)
+
+CHARS_PER_TOKEN = 4   # rough English average; good enough for admission control
+
+
+def estimate_tokens(prompt: str, completion_tokens: int = OPENAI_COMPLETION_TOKENS_EST) -> int:
+    # prompt tokens from length + the completion we expect the memo to take
+    return len(prompt or "") // CHARS_PER_TOKEN + completion_tokens
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    # OpenAI resets look like "1s", "6m0s", "120ms", "1h2m3.5s"
+    if not value:
+        return None
+    total, found = 0.0, False
+    for num, unit in _DURATION_RE.findall(value):
+        found = True
+        n = float(num)
+        total += {"ms": n / 1000, "s": n, "m": n * 60, "h": n * 3600}[unit]
+    return total if found else None
+
+
+def _retry_after(headers: Any, message: str = "") -> Optional[float]:
+    if headers is None:
+        return None
+    if headers.get("retry-after-ms"):
+        return _parse_reset(headers["retry-after-ms"] + "ms")
+    if headers.get("retry-after"):
+        return _parse_reset(headers["retry-after"] + "s")
+    # wait for the limit that was hit: the 429 message names it ("... on tokens per min"),
+    # and an exhausted bucket shows up as remaining == 0
+    req = _parse_reset(headers.get("x-ratelimit-reset-requests"))
+    tok = _parse_reset(headers.get("x-ratelimit-reset-tokens"))
+    hit_tokens = "token" in (message or "").lower() or str(headers.get("x-ratelimit-remaining-tokens")) == "0"
+    hit_requests = str(headers.get("x-ratelimit-remaining-requests")) == "0"
+    waits = [w for w, hit in ((tok, hit_tokens), (req, hit_requests)) if hit and w is not None]
+    return max(waits) if waits else (req if req is not None else tok)
+
+
+class TokenBucket:
+    """Continuous-refill bucket; capacity is the per-minute limit."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.capacity / 60.0)
+        self.stamp = now
+
+    def set_capacity(self, per_minute: int):
+        with self.lock:
+            self._refill()
+            self.capacity = float(max(1, per_minute))
+            self.level = min(self.level, self.capacity)
+
+    def sync_remaining(self, remaining: int):
+        # server view wins when it is stricter than ours
+        with self.lock:
+            self._refill()
+            self.level = min(self.level, float(remaining))
+
+    def take(self, n: float) -> float:
+        """Take n units; returns seconds to wait (0 if admitted)."""
+        with self.lock:
+            self._refill()
+            n = min(n, self.capacity)  # never ask for more than the bucket holds
+            if self.level >= n:
+                self.level -= n
+                return 0.0
+            return (n - self.level) * 60.0 / self.capacity
+
+    def charge(self, n: float):
+        """Debit n units even past empty; later takes wait until the debt refills."""
+        with self.lock:
+            self._refill()
+            self.level -= n
+
+    def give(self, n: float):
+        with self.lock:
+            self._refill()
+            self.level = min(self.capacity, self.level + n)
+
+
+class RateGovernor:
+    """
+    Process-wide admission control for OpenAI calls: one bucket for requests,
+    one for tokens. Limits are learned from x-ratelimit-* headers and 429s are
+    retried with jittered exponential backoff.
+    """
+
+    def __init__(self, rpm: int, tpm: int, max_retries: int = OPENAI_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.stats: Dict[str, float] = {"admitted": 0, "throttled_s": 0.0, "rate_limited": 0}
+
+    def admit(self, tokens: int = 0):
+        while True:
+            wait = self.requests.take(1)
+            if wait == 0:
+                break
+            self.stats["throttled_s"] += wait
+            time.sleep(wait)
+        while tokens:
+            wait = self.tokens.take(tokens)
+            if wait == 0:
+                break
+            self.stats["throttled_s"] += wait
+            time.sleep(wait)
+        self.stats["admitted"] += 1
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        # correct the token bucket once the real usage is known
+        if actual is None:
+            return
+        diff = estimated - actual
+        if diff > 0:
+            self.tokens.give(diff)
+        elif diff < 0:
+            self.tokens.charge(-diff)   # an overage is owed even when the bucket is low
+
+    def learn(self, headers: Any):
+        if not headers:
+            return
+        def _int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+        lim_r, lim_t = _int("x-ratelimit-limit-requests"), _int("x-ratelimit-limit-tokens")
+        if lim_r: self.requests.set_capacity(lim_r)
+        if lim_t: self.tokens.set_capacity(lim_t)
+        rem_r, rem_t = _int("x-ratelimit-remaining-requests"), _int("x-ratelimit-remaining-tokens")
+        if rem_r is not None: self.requests.sync_remaining(rem_r)
+        if rem_t is not None: self.tokens.sync_remaining(rem_t)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+        return max(delay, retry_after or 0.0)
+
+    def call(self, raw_method: Callable[..., Any], *args, tokens: int = 0, **kwargs):
+        """
+        Call an OpenAI `.with_raw_response` method through the governor and
+        return the parsed result.
+        """
+        attempt = 0
+        while True:
+            self.admit(tokens)
+            try:
+                resp = raw_method(*args, **kwargs)
+            except RateLimitError as e:
+                self.stats["rate_limited"] += 1
+                self.tokens.give(tokens)  # nothing was consumed server-side
+                headers = getattr(getattr(e, "response", None), "headers", None)
+                self.learn(headers)
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = _retry_after(headers, str(e))
+                time.sleep(self.backoff(attempt, retry_after))
+                attempt += 1
+                continue
+            self.learn(resp.headers)
+            return resp.parse()
+
+
+GOVERNOR = RateGovernor(OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT)
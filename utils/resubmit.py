@@ -0,0 +1,159 @@
+# utils/resubmit.py
+import hashlib, json, os, time
+from typing import Any, Dict, List, Optional
+from utils.config import RESUBMIT_DIR, RESUBMIT_MAX_SECTIONS, MEMO_SECTION_MODEL, DEDUPE_WINDOW_DAYS
+from utils.ratelimit import GOVERNOR, estimate_tokens
+from utils.usage import USAGE
+from utils.sections import MEMO_SECTIONS
+
+# What a changed form answer touches: (full memo sections, mini memo sections,
+# scorecard keys). Anything not listed here (name, website, ...) needs a full run.
+# A new deck URL redoes the sections the deck feeds most, unless the file turns
+# out to read the same as before (core.process_resubmission checks).
+FIELD_IMPACT = {
+    "traction":    (["Why we're excited", "Traction"], ["Traction"], ["traction", "market"]),
+    "round":       (["Synopsis", "The Cap Table"], ["Startup Overview"], []),
+    "investors":   (["The Cap Table"], ["Startup Overview"], []),
+    "problem":     (["Problem"], ["Problem"], []),
+    "solution":    (["Solution"], ["Solution"], ["product", "moat"]),
+    "market":      (["Market Size"], ["Market"], ["market"]),
+    "competition": (["Competitors"], ["Market"], ["moat"]),
+    "team":        (["The Team"], ["Team"], ["team"]),
+    "university":  (["The Team"], ["Team"], ["team"]),
+    "milestones":  (["Exit Strategy"], [], ["vision"]),
+    "vision":      (["Exit Strategy"], [], ["vision"]),
+    "pitch_deck_url": (["Why we're excited", "Traction", "Market Size"], ["Traction", "Market"],
+                       ["traction", "market"]),
+}
+# contact details never reach the memo
+IGNORED_FIELDS = {"first_name", "last_name", "founder_email", "position", "incorporation"}
+
+MINI_INSTRUCTIONS = {
+    "Startup Overview": "Bullets for the mini memo email: **Name**, **Website**, **Industry**, "
+                        "**Round Stage**, **Round Size**, **Investors**.",
+    "Market": "2-4 short bullets for the mini memo email: market size and competition.",
+    "Problem": "2-3 short bullets for the mini memo email.",
+    "Solution": "2-3 short bullets for the mini memo email.",
+    "Traction": "2-4 short bullets for the mini memo email with the exact figures given.",
+    "Team": "2-4 short bullets for the mini memo email: founders, experience, previous companies.",
+}
+_FULL_INSTRUCTIONS = dict(MEMO_SECTIONS)
+
+
+def _norm(v: Any) -> str:
+    return " ".join(str(v or "").split())
+
+def diff_answers(old: Dict[str, str], new: Dict[str, str]) -> List[str]:
+    """Answer keys whose (whitespace-normalized) value changed."""
+    return sorted(k for k in set(old) | set(new) if _norm(old.get(k)) != _norm(new.get(k)))
+
+def same_company(match: str, old: Dict[str, str], new: Dict[str, str]) -> bool:
+    """
+    Whether an index hit is this company's own earlier submission, so its memo
+    and Sheet row may be reused. Domain and exact-name hits are; an email or
+    fuzzy-name hit only if the name and website are unchanged.
+    """
+    if match in ("domain", "name"):
+        return True
+    return not ({"name", "website"} & set(diff_answers(old, new)))
+
+def plan_update(changed: List[str]) -> Optional[Dict[str, List[str]]]:
+    """Sections and subscores to regenerate, or None when a full run is needed."""
+    fields: List[str] = []
+    full: List[str] = []
+    mini: List[str] = []
+    scores: List[str] = []
+    for k in changed:
+        if k in IGNORED_FIELDS:
+            continue
+        if k not in FIELD_IMPACT:
+            return None
+        fields.append(k)
+        f, m, s = FIELD_IMPACT[k]
+        full += [t for t in f if t not in full]
+        mini += [t for t in m if t not in mini]
+        scores += [t for t in s if t not in scores]
+    if len(full) + len(mini) > RESUBMIT_MAX_SECTIONS:
+        return None
+    return {"fields": fields, "full": full, "mini": mini, "scores": scores}
+
+def full_instruction(title: str) -> str:
+    return _FULL_INSTRUCTIONS[title]
+
+
+class SubmissionStore:
+    """Last processed submission per response id: answers, memo texts, raw subscores, Sheet row."""
+
+    def __init__(self, root: str = RESUBMIT_DIR, max_age_days: float = DEDUPE_WINDOW_DAYS):
+        self.root = root
+        # a resubmission is only matched within the dedupe window; older records are dead weight
+        self.max_age_s = max_age_days * 86400
+        self._puts = 0
+
+    def _path(self, rid: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(rid.encode("utf-8")).hexdigest()[:32] + ".json")
+
+    def get(self, rid: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not rid:
+            return None
+        try:
+            with open(self._path(rid), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, rid: str, record: Dict[str, Any]):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._path(rid) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({**record, "rid": rid, "ts": time.time()}, f)
+        os.replace(tmp, self._path(rid))
+        self._puts += 1
+        if self._puts % 200 == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        cutoff = time.time() - self.max_age_s
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        for e in entries:
+            try:
+                if e.name.endswith(".json") and e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+STORE = SubmissionStore()
+
+
+def rescore(client, context: str, keys: List[str], prev_scores: Dict[str, Any],
+            model: str = MEMO_SECTION_MODEL) -> Dict[str, float]:
+    """Re-score only `keys` against the updated facts; other subscores are kept."""
+    if not keys:
+        return {}
+    prompt = (f"Company facts (updated):\n{context}\n\n"
+              f"Previous scorecard: {json.dumps(prev_scores)}\n"
+              f"Some facts changed. Re-score ONLY these keys on the same scale as before: "
+              f"{', '.join(keys)}. Reply with a JSON object of just those keys.")
+    resp = GOVERNOR.call(client.chat.completions.with_raw_response.create,
+                         model=model,
+                         response_format={"type": "json_object"},
+                         messages=[{"role": "user", "content": prompt}],
+                         max_tokens=120,
+                         tokens=estimate_tokens(prompt, 120))
+    USAGE.record("rescore", model, resp.usage)
+    data = json.loads(resp.choices[0].message.content or "{}")
+    out = {}
+    for k in keys:
+        try:
+            v = float(data[k])
+        except (KeyError, TypeError, ValueError):
+            continue
+        out[k] = int(v) if v.is_integer() else v
+    return out
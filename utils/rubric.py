@@ -0,0 +1,213 @@
+# utils/rubric.py
+import itertools, json, os, time
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from utils.config import SCORE_ARCHIVE_PATH
+
+# The scoring rubric in one place: calibrate_scorecard applies it to a single
+# memo, simulate() replays variants of it over every archived scorecard.
+
+SUBSCORES = ["team", "market", "product", "vision", "traction", "business_model",
+             "moat", "risk_adj", "bonus"]
+VERDICTS = ["TAKE_CALL", "LEARN_MORE", "PASS"]
+MOAT_FLOOR_KEYWORDS = ["government api", "gov api", "compliance", "biometric", "white-label",
+                       "white label", "proprietary data", "dpa", "soc2", "iso 27001"]
+
+_TR, _MOAT, _RISK = (SUBSCORES.index(k) for k in ("traction", "moat", "risk_adj"))
+
+
+class Rubric(BaseModel):
+    weights: Dict[str, float] = {}     # per-subscore multiplier, missing = 1.0
+    take_call: float = 80              # total >= take_call -> TAKE_CALL
+    learn_more: float = 70             # total >= learn_more -> LEARN_MORE
+    traction_floor: float = 9          # traction subscore floor ...
+    traction_floor_mrr: float = 100_000  # ... once MRR reaches this
+    moat_floor: float = 20             # moat floor when defensibility keywords are present
+    risk_floor: float = -3             # risk_adj is clamped to at least this
+
+    def verdict(self, total: float) -> str:
+        return "TAKE_CALL" if total >= self.take_call else "LEARN_MORE" if total >= self.learn_more else "PASS"
+
+    def apply(self, scores: Dict[str, Any], mrr: Optional[int],
+              moat_keyword: bool) -> Tuple[Dict[str, Any], int, str]:
+        """Floors, clamp and weighted total for one scorecard; returns (scores, total, verdict)."""
+        s = dict(scores)
+        if mrr is not None and mrr >= self.traction_floor_mrr:
+            s["traction"] = _whole(max(_num(s.get("traction")), self.traction_floor))
+        s["risk_adj"] = _whole(max(_num(s.get("risk_adj")), self.risk_floor))
+        if moat_keyword:
+            s["moat"] = _whole(max(_num(s.get("moat")), self.moat_floor))
+        total = int(round(sum(self.weights.get(k, 1.0) * _num(s.get(k)) for k in SUBSCORES)))
+        return s, total, self.verdict(total)
+
+
+DEFAULT_RUBRIC = Rubric()
+
+
+def _num(v: Any) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+def _whole(v: float):
+    return int(v) if float(v).is_integer() else v
+
+def has_moat_keyword(text: str) -> bool:
+    t = (text or "").lower()
+    return any(k in t for k in MOAT_FLOOR_KEYWORDS)
+
+
+def archive_scorecard(name: str, raw_scores: Dict[str, Any], mrr: Optional[int], moat_keyword: bool,
+                      total: int, verdict: str, path: str = SCORE_ARCHIVE_PATH):
+    """Append the pre-calibration subscores and calibration inputs for later replay."""
+    rec = {"ts": time.time(), "name": name, "scores": {k: _num(raw_scores.get(k)) for k in SUBSCORES},
+           "mrr": mrr, "moat_keyword": bool(moat_keyword), "total": total, "verdict": verdict}
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+    except OSError as e:
+        print(f"SCORE archive write failed: {e}", flush=True)
+
+
+# --- simulator ---
+class ScoreArchive:
+    """Historical scorecards as arrays: X (n x len(SUBSCORES)), mrr (nan = unknown), moat keyword flags."""
+
+    def __init__(self, names: List[str], X, mrr, moat_kw):
+        self.names, self.X, self.mrr, self.moat_kw = names, X, mrr, moat_kw
+
+    def __len__(self):
+        return len(self.names)
+
+
+def load_archive(path: str = SCORE_ARCHIVE_PATH) -> ScoreArchive:
+    import numpy as np
+    names, rows, mrr, kw = [], [], [], []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                names.append(r.get("name", ""))
+                rows.append([_num((r.get("scores") or {}).get(k)) for k in SUBSCORES])
+                mrr.append(np.nan if r.get("mrr") is None else float(r["mrr"]))
+                kw.append(bool(r.get("moat_keyword")))
+    X = np.array(rows, dtype=float).reshape(-1, len(SUBSCORES))
+    return ScoreArchive(names, X, np.array(mrr, dtype=float), np.array(kw, dtype=bool))
+
+
+def variant_grid(base: Rubric = DEFAULT_RUBRIC, **ranges) -> List[Rubric]:
+    """
+    Cartesian product of parameter ranges, e.g.
+    variant_grid(take_call=range(76, 86), learn_more=[65, 70], w_moat=[0.8, 1.0, 1.2]).
+    `w_<subscore>` keys set weights; other keys are Rubric fields.
+    """
+    keys = list(ranges)
+    out = []
+    for combo in itertools.product(*(ranges[k] for k in keys)):
+        weights, fields = dict(base.weights), {}
+        for k, v in zip(keys, combo):
+            if k.startswith("w_"):
+                weights[k[2:]] = float(v)
+            else:
+                fields[k] = v
+        out.append(base.model_copy(update={**fields, "weights": weights}))
+    return out
+
+
+def _params(variants: List[Rubric]):
+    import numpy as np
+    W = np.array([[v.weights.get(k, 1.0) for k in SUBSCORES] for v in variants], dtype=float)
+    col = lambda name: np.array([getattr(v, name) for v in variants], dtype=float)[:, None]
+    return (W, col("take_call"), col("learn_more"), col("traction_floor"),
+            col("traction_floor_mrr"), col("moat_floor"), col("risk_floor"))
+
+def _evaluate(arch: ScoreArchive, variants: List[Rubric]):
+    # (variants x deals) totals and verdict codes (0 take call, 1 learn more, 2 pass)
+    import numpy as np
+    W, take, learn, tfloor, tmrr, mfloor, rfloor = _params(variants)
+    X = arch.X
+    with np.errstate(invalid="ignore"):
+        floor_tr = arch.mrr[None, :] >= tmrr          # nan MRR never triggers the floor
+    tr = np.where(floor_tr, np.maximum(X[:, _TR][None, :], tfloor), X[:, _TR][None, :])
+    moat = np.where(arch.moat_kw[None, :], np.maximum(X[:, _MOAT][None, :], mfloor), X[:, _MOAT][None, :])
+    risk = np.maximum(X[:, _RISK][None, :], rfloor)
+    rest = [i for i in range(len(SUBSCORES)) if i not in (_TR, _MOAT, _RISK)]
+    total = (W[:, rest] @ X[:, rest].T
+             + W[:, _TR, None] * tr + W[:, _MOAT, None] * moat + W[:, _RISK, None] * risk)
+    total = np.rint(total)
+    verdict = np.where(total >= take, 0, np.where(total >= learn, 1, 2))
+    return total, verdict
+
+
+def simulate(variants: List[Rubric], arch: Optional[ScoreArchive] = None,
+             baseline: Rubric = DEFAULT_RUBRIC, max_cells: int = 4_000_000) -> Dict[str, Any]:
+    """
+    Replay every variant over the archive against `baseline`. Returns arrays
+    indexed by variant: flips, flip_matrix (from x to, in VERDICTS order),
+    verdict_counts, mean_total, mean_shift and p10/p50/p90 of totals.
+    Variants are evaluated in chunks of at most `max_cells` variant x deal cells.
+    """
+    import numpy as np
+    arch = arch if arch is not None else load_archive()
+    n, V = len(arch), len(variants)
+    base_total, base_v = _evaluate(arch, [baseline])
+    base_total, base_v = base_total[0], base_v[0]
+
+    flips = np.zeros(V, dtype=int)
+    flip_matrix = np.zeros((V, 3, 3), dtype=int)
+    counts = np.zeros((V, 3), dtype=int)
+    mean_total = np.full(V, np.nan)
+    mean_shift = np.full(V, np.nan)
+    pct = np.full((V, 3), np.nan)
+    step = max(1, max_cells // max(n, 1))
+    for lo in range(0, V if n else 0, step):
+        chunk = variants[lo:lo + step]
+        total, v = _evaluate(arch, chunk)
+        c = len(chunk)
+        cell = np.arange(c)[:, None] * 9 + base_v[None, :] * 3 + v
+        flip_matrix[lo:lo + c] = np.bincount(cell.ravel(), minlength=c * 9).reshape(c, 3, 3)
+        flips[lo:lo + c] = (v != base_v[None, :]).sum(axis=1)
+        counts[lo:lo + c] = flip_matrix[lo:lo + c].sum(axis=1)
+        mean_total[lo:lo + c] = total.mean(axis=1)
+        mean_shift[lo:lo + c] = (total - base_total[None, :]).mean(axis=1)
+        pct[lo:lo + c] = np.percentile(total, [10, 50, 90], axis=1).T
+    return {"deals": n, "variants": V, "baseline_counts": np.bincount(base_v, minlength=3),
+            "flips": flips, "flip_matrix": flip_matrix, "verdict_counts": counts,
+            "mean_total": mean_total, "mean_shift": mean_shift, "p10_p50_p90": pct}
+
+
+def summarize(variants: List[Rubric], result: Dict[str, Any], top: int = 10,
+              baseline: Rubric = DEFAULT_RUBRIC) -> List[Dict[str, Any]]:
+    """Variants that move the most verdicts, with what changed relative to the baseline."""
+    order = result["flips"].argsort()[::-1][:top]
+    base = baseline.model_dump()
+    rows = []
+    for i in order:
+        changed = {k: v for k, v in variants[i].model_dump().items() if v != base[k]}
+        fm = result["flip_matrix"][i]
+        rows.append({
+            "variant": int(i), "changed": changed, "flips": int(result["flips"][i]),
+            "moves": {f"{VERDICTS[a]}->{VERDICTS[b]}": int(fm[a, b])
+                      for a in range(3) for b in range(3) if a != b and fm[a, b]},
+            "verdicts": dict(zip(VERDICTS, map(int, result["verdict_counts"][i]))),
+            "mean_shift": round(float(result["mean_shift"][i]), 2),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    # quick sweep over the cutoffs and the two calibration floors
+    grid = variant_grid(take_call=range(74, 88), learn_more=range(62, 76, 2),
+                        moat_floor=[15, 18, 20, 22], traction_floor=[7, 8, 9, 10])
+    arch = load_archive()
+    t0 = time.time()
+    res = simulate(grid, arch)
+    print(f"{len(grid)} variants x {len(arch)} deals in {time.time() - t0:.2f}s; "
+          f"baseline {dict(zip(VERDICTS, map(int, res['baseline_counts'])))}")
+    for row in summarize(grid, res):
+        print(json.dumps(row))
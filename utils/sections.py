@@ -0,0 +1,112 @@
+# utils/sections.py
+import re, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from utils.config import (
+    MEMO_SECTION_MODEL, MEMO_SECTION_CONCURRENCY, MEMO_SECTION_MAX_TOKENS, MEMO_SECTION_MAX_FAILED,
+)
+from utils.form_schema import other_answers
+from utils.ratelimit import GOVERNOR, estimate_tokens
+from utils.usage import USAGE, carry
+
+# Same order as the "### FULL DEAL MEMO" structure in core._build_prompt
+MEMO_SECTIONS: List[Tuple[str, str]] = [
+    ("Why we're excited", "Open with 'We are excited to invest in <company>...' and give the 3-4 strongest reasons to invest."),
+    ("Synopsis", "One paragraph: what the company does, for whom, stage and the round."),
+    ("Problem", "The customer pain, who feels it and why existing options fail."),
+    ("Solution", "The product and how it solves the problem; key differentiators."),
+    ("Business Model", "How they make money, pricing and expansion motion, unit economics if known."),
+    ("Market Size", "TAM / SAM / SOM with the numbers given, and market growth."),
+    ("Go to Market Strategy", "Channels, ICP, sales motion and early distribution advantages."),
+    ("Traction", "Revenue, customers, growth and pipeline. Use the exact figures given."),
+    ("Competitors", "Main competitors and how the company is positioned against each."),
+    ("The Team", "Founders and key hires, relevant experience and previous companies."),
+    ("The Cap Table", "Current investors and the round structure, if known."),
+    ("Exit Strategy", "Likely acquirers or IPO path, tied to the vision and milestones."),
+    ("Press", "Notable press or links; say 'N/A' if none were provided."),
+]
+
+class SectionsFailed(RuntimeError):
+    """Too many sections failed for the memo to be worth sending."""
+
+
+SECTION_SYSTEM = ("You are a venture capital associate writing one section of a long-form "
+                  "investment memo in the style of Replit's Series C memo. Professional tone, "
+                  "markdown formatting, include data. Use only the facts provided.")
+
+
+def build_section_context(info: Any, extra: Optional[Dict[str, Any]]) -> str:
+    """Compact fact sheet shared by every section request (no rubric, no email template)."""
+    extra = extra or {}
+    rows = [
+        ("Company", info.name), ("Website", info.website), ("Industry", extra.get("industry", "")),
+        ("Round", info.round), ("Round size", extra.get("round_size", "")),
+        ("Investors", info.investors), ("Problem", extra.get("problem", "")),
+        ("Solution", extra.get("solution", "") or info.product),
+        ("Market", extra.get("market", "")), ("Competition", extra.get("competition", "")),
+        ("Traction", extra.get("traction_detail", "") or info.traction),
+        ("Business model", extra.get("business_model", "")), ("Moat", extra.get("moat", "")),
+        ("Team", extra.get("team_detail", "") or info.team),
+        ("University", extra.get("university", "")), ("Cap table", extra.get("cap_table", "")),
+        ("Vision", extra.get("vision", "")), ("Milestones", extra.get("milestones", "")),
+        ("Risks", extra.get("risks", "")), ("Product stage", extra.get("product_stage", "")),
+        ("Press", extra.get("press_links", "")),
+        *other_answers(extra),
+        ("Pitch deck notes", extra.get("deck_summary", "")),
+        ("Website notes", extra.get("web_summary", "")),
+    ]
+    return "\n".join(f"{k}: {v}" for k, v in rows if v)
+
+def _strip_heading(title: str, text: str) -> str:
+    # models often repeat the heading even when told not to
+    pat = rf"^\s*(?:#+\s*)?\**\s*{re.escape(title)}\s*\**:?\s*\n+"
+    return re.sub(pat, "", text.strip(), count=1, flags=re.I)
+
+def generate_section(client, context: str, title: str, instruction: str,
+                     model: str = MEMO_SECTION_MODEL) -> str:
+    if USAGE.over_deal_budget():
+        raise RuntimeError("deal budget spent")
+    prompt = (f"Company facts:\n{context}\n\n"
+              f"Write ONLY the body of the **{title}** section. {instruction} "
+              f"Do not repeat the heading and do not write other sections.")
+    resp = GOVERNOR.call(client.chat.completions.with_raw_response.create,
+                         model=model,
+                         messages=[{"role": "system", "content": SECTION_SYSTEM},
+                                   {"role": "user", "content": prompt}],
+                         max_tokens=MEMO_SECTION_MAX_TOKENS,
+                         tokens=estimate_tokens(prompt, MEMO_SECTION_MAX_TOKENS))
+    USAGE.record("section", model, resp.usage)
+    return _strip_heading(title, resp.choices[0].message.content or "")
+
+def stitch_sections(parts: List[Tuple[str, str]]) -> str:
+    return "\n\n".join(f"**{title}**\n\n{body}" for title, body in parts)
+
+def generate_memo_sections(client, info: Any, extra: Optional[Dict[str, Any]],
+                           sections: Optional[List[Tuple[str, str]]] = None,
+                           concurrency: int = MEMO_SECTION_CONCURRENCY,
+                           model: str = MEMO_SECTION_MODEL,
+                           max_failed: float = MEMO_SECTION_MAX_FAILED) -> Dict[str, str]:
+    """
+    Generate sections concurrently; returns {title: body} in memo order. A failed
+    section reads "N/A", but when more than `max_failed` of them fail (e.g. the
+    deal budget ran out) SectionsFailed is raised so the caller can fall back.
+    """
+    sections = sections or MEMO_SECTIONS
+    context = build_section_context(info, extra)
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        futures = [(title, ex.submit(carry(generate_section), client, context, title, instr, model))
+                   for title, instr in sections]
+        out, failed = {}, []
+        for title, fut in futures:
+            try:
+                out[title] = fut.result()
+            except Exception as e:
+                print(f"SECTION {title} failed: {e}", flush=True)
+                out[title] = "N/A"
+                failed.append((title, e))
+    print(f"SECTIONS {info.name}: {len(sections)} in {time.time() - t0:.1f}s, {len(failed)} failed", flush=True)
+    if failed and len(failed) > max_failed * len(sections):
+        raise SectionsFailed(f"{len(failed)}/{len(sections)} sections failed "
+                             f"(first: {failed[0][0]}: {failed[0][1]})") from failed[0][1]
+    return out
@@ -1,3 +1,4 @@
+import re
 from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 
@@ -14,3 +15,33 @@ def append_row_oauth(token_path, spreadsheet_id, range_name, values):
         insertDataOption='INSERT_ROWS',
         body=body
     ).execute()
+
+def read_rows_oauth(token_path, spreadsheet_id, range_name):
+    creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    service = build('sheets', 'v4', credentials=creds)
+    resp = service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=range_name,
+    ).execute()
+    return resp.get('values', [])
+
+def update_row_oauth(token_path, spreadsheet_id, range_name, values):
+    creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    service = build('sheets', 'v4', credentials=creds)
+    body = {'values': [values]}
+    return service.spreadsheets().values().update(
+        spreadsheetId=spreadsheet_id,
+        range=range_name,
+        valueInputOption='RAW',
+        body=body
+    ).execute()
+
+def appended_row_number(resp):
+    # "Sheet1!A12:K12" -> 12
+    rng = ((resp or {}).get('updates') or {}).get('updatedRange', '')
+    m = re.search(r"![A-Z]+(\d+)", rng)
+    return int(m.group(1)) if m else None
+
+def row_range(range_name, row):
+    sheet = range_name.split('!', 1)[0] if '!' in range_name else 'Sheet1'
+    return f"{sheet}!A{row}"
@@ -0,0 +1,457 @@
+# utils/soak.py
+import argparse, asyncio, gc, hashlib, itertools, json, os, random, shutil, sys, tempfile, threading, time, tracemalloc
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+# Soak test for long-running web/worker processes: thousands of synthetic deals
+# through the real pipeline (webhook -> submit -> memo -> PDF -> email -> Sheets)
+# with OpenAI, Gmail and Sheets faked in-process. Every path the pipeline writes
+# to is pointed at a scratch directory before utils.config is imported, so real
+# caches are never touched. After a warmup, tracemalloc snapshots, RSS, open
+# files, threads and disk usage are sampled every N deals; the run fails when
+# the steady-state growth is over the thresholds.
+#
+#   python -m utils.soak --deals 2000 --every 250
+#   python -m utils.soak --deals 500 --mode queue --memo-mode sections
+
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+# --- fake external clients ---
+class _Raw:
+    headers: Dict[str, str] = {}
+
+    def __init__(self, obj):
+        self._obj = obj
+
+    def parse(self):
+        return self._obj
+
+
+def _ns(**kw) -> SimpleNamespace:
+    return SimpleNamespace(**kw)
+
+
+class FakeOpenAI:
+    """Assistants threads/runs and chat completions, answering instantly with synthetic memos."""
+
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.threads: Dict[str, List[Any]] = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+        raw = lambda fn: _ns(with_raw_response=_ns(**fn))
+        self.beta = _ns(threads=_ns(
+            with_raw_response=_ns(create=self._thread_create, delete=self._thread_delete),
+            messages=raw({"create": self._message_create, "list": self._message_list}),
+            runs=raw({"create": self._run_create, "retrieve": self._run_retrieve, "cancel": self._run_cancel}),
+        ))
+        self.chat = _ns(completions=raw({"create": self._chat_create}))
+
+    def _id(self, prefix: str) -> str:
+        with self.lock:
+            self.calls += 1
+            return f"{prefix}_{next(self.ids)}"
+
+    def _usage(self, prompt: str, reply: str):
+        p, c = len(prompt) // 4, len(reply) // 4
+        return _ns(prompt_tokens=p, completion_tokens=c, total_tokens=p + c)
+
+    def _thread_create(self, **_):
+        tid = self._id("thread")
+        with self.lock:
+            self.threads[tid] = []
+        return _Raw(_ns(id=tid))
+
+    def _thread_delete(self, thread_id: str, **_):
+        with self.lock:
+            self.threads.pop(thread_id, None)
+        return _Raw(_ns(id=thread_id, deleted=True))
+
+    def _message_create(self, thread_id: str, role: str, content: str, **_):
+        self._id("msg")
+        with self.lock:
+            self.threads[thread_id].append(content)
+        return _Raw(_ns(id="msg"))
+
+    def _run_create(self, thread_id: str, **_):
+        rid = self._id("run")
+        with self.lock:
+            prompt = self.threads[thread_id][-1]
+            seed = self.rng.random()
+        reply = synthetic_memo(prompt, random.Random(seed))
+        with self.lock:
+            self.threads[thread_id].append(_ns(role="assistant", content=[_ns(text=_ns(value=reply))]))
+        return _Raw(_ns(id=rid, _usage=self._usage(prompt, reply)))
+
+    def _run_retrieve(self, thread_id: str, run_id: str, **_):
+        self._id("poll")
+        with self.lock:
+            reply = self.threads[thread_id][-1].content[0].text.value
+            prompt = self.threads[thread_id][0]
+        return _Raw(_ns(id=run_id, status="completed", model="gpt-4o", last_error=None,
+                        usage=self._usage(prompt, reply)))
+
+    def _run_cancel(self, **_):
+        return _Raw(_ns(status="cancelling"))
+
+    def _message_list(self, thread_id: str, **_):
+        self._id("list")
+        with self.lock:
+            msgs = [m for m in reversed(self.threads[thread_id]) if not isinstance(m, str)]
+        return _Raw(_ns(data=msgs))
+
+    def _chat_create(self, model: str, messages: List[Dict[str, str]], **kw):
+        self._id("chat")
+        prompt = messages[-1]["content"]
+        with self.lock:
+            rng = random.Random(self.rng.random())
+        if kw.get("response_format", {}).get("type") == "json_object":
+            reply = json.dumps({k: rng.randint(2, 15) for k in
+                                ("team", "market", "product", "vision", "traction", "business_model", "moat")})
+        elif "mini deal memo" in prompt:
+            reply = synthetic_memo(prompt, rng).split("### FULL DEAL MEMO")[0]
+        else:
+            reply = _paragraphs(rng, rng.randint(1, 3))
+        return _Raw(_ns(choices=[_ns(message=_ns(content=reply))], usage=self._usage(prompt, reply),
+                        model=model))
+
+    def live_threads(self) -> int:
+        with self.lock:
+            return len(self.threads)
+
+
+_WORDS = ("platform customers revenue growth pipeline enterprise pilots retention margin market "
+          "workflow automation compliance onboarding churn contracts expansion latency model data").split()
+
+def _paragraphs(rng: random.Random, n: int) -> str:
+    return "\n\n".join(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(40, 90))).capitalize() + "."
+                       for _ in range(n))
+
+def synthetic_memo(prompt: str, rng: random.Random) -> str:
+    """Mini memo + scorecard JSON + full memo, shaped like the assistant's real output."""
+    name = (prompt.split("for ", 1)[-1].split(",", 1)[0] or "the company")[:60]
+    scores = {"team": rng.randint(8, 24), "market": rng.randint(6, 19), "product": rng.randint(3, 9),
+              "vision": rng.randint(1, 5), "traction": rng.randint(2, 18), "business_model": rng.randint(2, 9),
+              "moat": rng.randint(8, 24), "risk_adj": -rng.randint(0, 8), "bonus": rng.randint(0, 4)}
+    total = max(0, min(100, sum(scores.values())))
+    verdict = "TAKE_CALL" if total >= 80 else "LEARN_MORE" if total >= 70 else "PASS"
+    mrr = rng.randint(5, 400)
+    full = "\n\n".join(f"**{h}**\n\n{_paragraphs(rng, rng.randint(1, 3))}" for h in (
+        "Synopsis", "Problem", "Solution", "Business Model", "Market Size", "Go to Market Strategy",
+        "Traction", "Competitors", "The Team", "The Cap Table", "Exit Strategy"))
+    return (f"### EMAIL\n\nHi GP,\n\n{name} is building workflow software; "
+            f"${mrr}k MRR and growing {rng.randint(3, 40)}% MoM.\n\n"
+            f"🏷️ **Startup Overview**\n- **Name**: {name}\n- **Investors**: {rng.choice(['a16z', 'N/A', 'Seed Co'])}\n\n"
+            f"📊 **Traction**\n${mrr}k MRR, {rng.randint(3, 200)} paying customers\n\n"
+            f"🧱 **Moat / Defensibility**\n{rng.choice(['Proprietary dataset', 'Network effects', 'None yet'])}\n\n"
+            f"👥 **Team**\nEx-{rng.choice(['Google', 'Stripe', 'Meta'])} founders\n\n"
+            f"🚩 **Red Flags / Risks**\n{_paragraphs(rng, 1)}\n\n"
+            f"```json\n{json.dumps({'scores': scores, 'total': total, 'verdict': verdict})}\n```\n\n"
+            f"Best,\nVC Evaluator GPT\n\n---\n\n### FULL DEAL MEMO\n\n"
+            f"We are excited to invest in {name}.\n\n{full}\n")
+
+
+class FakeGoogle:
+    def __init__(self):
+        self.emails = 0
+        self.rows = 0
+        self.updates = 0
+        self.lock = threading.Lock()
+
+    def send(self, **_):
+        with self.lock:
+            self.emails += 1
+
+    def append(self, **_):
+        with self.lock:
+            self.rows += 1
+            return {"updates": {"updatedRange": f"Sheet1!A{self.rows + 1}:K{self.rows + 1}"}}
+
+    def update(self, **_):
+        with self.lock:
+            self.updates += 1
+        return {}
+
+
+# --- synthetic deals ---
+_ROUNDS = ["Pre-Seed", "Seed", "Seed", "Series A", "Series B"]
+_INVESTORS = ["", "N/A", "a16z", "Sequoia", "none", "Local angels"]
+
+def synthetic_answers(i: int, rng: random.Random) -> Dict[str, str]:
+    return {
+        "first_name": rng.choice(["Ada", "Sam", "Lee", "Kim"]), "last_name": f"Founder{i}",
+        "founder_email": f"founder{i}@soak{i}.example", "incorporation": "Delaware",
+        # hashed names: "Soak 12" and "Soak 120" would fuzzy-match as the same company
+        "name": f"{hashlib.sha1(str(i).encode()).hexdigest()[:10]} Labs", "website": f"https://soak{i}.example",
+        "position": "CEO", "round": rng.choice(_ROUNDS), "investors": rng.choice(_INVESTORS),
+        "problem": _paragraphs(rng, 1), "solution": _paragraphs(rng, 1), "market": f"${rng.randint(1, 90)}B market",
+        "traction": f"${rng.randint(0, 300)}k MRR, {rng.randint(0, 60)}% MoM, {rng.randint(1, 80)} customers",
+        "team": "Ex-Google engineers" + (", intro by a portfolio founder" if rng.random() < 0.2 else ""),
+        "university": rng.choice(["MIT", "Stanford", "Waterloo", ""]), "competition": "Incumbents",
+        "milestones": "Hit $1M ARR", "vision": _paragraphs(rng, 1),
+    }
+
+def typeform_payload(answers: Dict[str, str], token: str) -> Dict[str, Any]:
+    from utils.field_map import FIELD_ID_MAP
+    ids = {v: k for k, v in FIELD_ID_MAP.items()}
+    out = []
+    for key, value in answers.items():
+        if not value or key not in ids:
+            continue
+        field = {"id": ids[key]}
+        if key == "founder_email":
+            out.append({"field": field, "type": "email", "email": value})
+        elif key == "website":
+            out.append({"field": field, "type": "url", "url": value})
+        elif key in ("round", "position"):
+            out.append({"field": field, "type": "choice", "choice": {"label": value}})
+        else:
+            out.append({"field": field, "type": "text", "text": value})
+    return {"event_id": token, "form_response": {"token": token, "answers": out}}
+
+
+# --- measurement ---
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except OSError:
+        import resource   # peak, not current, where /proc is missing
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+def dir_bytes(root: str) -> Dict[str, int]:
+    out: Dict[str, int] = {}
+    for entry in os.scandir(root):
+        total = 0
+        if entry.is_dir():
+            for dirpath, _, files in os.walk(entry.path):
+                total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files
+                             if os.path.exists(os.path.join(dirpath, f)))
+        else:
+            total = entry.stat().st_size
+        out[entry.name] = total
+    return out
+
+def module_of(filename: str, repo: str) -> str:
+    if filename.startswith(repo):
+        return os.path.relpath(filename, repo)
+    parts = filename.replace("\\", "/").split("/")
+    if "site-packages" in parts:
+        return parts[parts.index("site-packages") + 1].split(".")[0]
+    return parts[-1] if parts[-1].endswith(".py") else filename
+
+def module_growth(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, repo: str) -> Dict[str, int]:
+    grown: Dict[str, int] = {}
+    for stat in after.compare_to(before, "filename"):
+        mod = module_of(stat.traceback[0].filename, repo)
+        grown[mod] = grown.get(mod, 0) + stat.size_diff
+    return dict(sorted(grown.items(), key=lambda kv: -kv[1]))
+
+def slope(xs: List[float], ys: List[float]) -> float:
+    # least-squares growth per unit of x (per deal)
+    if len(xs) < 2:
+        return 0.0
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+
+def _isolate(root: str, args):
+    """Point every store at `root` and pick the pipeline shape, before utils.config is read."""
+    env = {
+        "OPENAI_API_KEY": "sk-soak", "OPENAI_ASSISTANT_ID": "asst_soak", "GP_RECIPIENTS": "gp@soak.example",
+        "GOOGLE_TOKEN_JSON": "", "OPENAI_RPM_LIMIT": "100000000", "OPENAI_TPM_LIMIT": "1000000000000",
+        "STATUS_DB_PATH": f"{root}/status.db", "USAGE_DB_PATH": f"{root}/usage.db", "WORK_DB_PATH": f"{root}/work.db",
+        "DEDUPE_INDEX_PATH": f"{root}/company_index.jsonl", "SCORE_ARCHIVE_PATH": f"{root}/score_archive.jsonl",
+        "RESUBMIT_DIR": f"{root}/submissions", "PDF_CACHE_DIR": f"{root}/pdf", "DIGEST_DIR": f"{root}/digest",
+        "DECK_CACHE_DIR": f"{root}/decks", "ENRICH_CACHE_DIR": f"{root}/enrich", "ENRICH_ENABLED": "0",
+        "PDF_ARCHIVE_DIR": f"{root}/output" if args.archive else "",
+        "WORK_MODE": args.mode, "MEMO_MODE": args.memo_mode, "PRESCREEN_MODE": args.prescreen,
+        "DELIVERY_MODE": args.delivery, "DEDUPE_MODE": "skip", "RESUBMIT_MODE": "incremental",
+        "MEMO_SLA_S": "0", "HEDGE_ENABLED": "0", "DEAL_CONCURRENCY": "0", "WORKER_THREADS": "0",
+    }
+    if args.retention_s > 0:
+        # compress the retention windows so expiry happens within the run and growth can level off
+        days = str(args.retention_s / 86400)
+        env.update({"DEDUPE_WINDOW_DAYS": days, "STATUS_TTL_DAYS": days, "WORK_RETAIN_DAYS": days})
+    os.environ.update(env)
+
+
+async def _run(args) -> int:
+    # imported only now: these modules read their settings at import time
+    from fastapi import BackgroundTasks
+    from starlette.requests import Request
+    import utils.core as core
+    import utils.digest as digest
+    import utils.pdf as pdf
+    from utils.webhook import typeform_webhook
+    from utils.workqueue import QUEUE, _handlers, _work_one
+
+    fake_ai, fake_google = FakeOpenAI(args.seed), FakeGoogle()
+    core.client = fake_ai
+    core.time = _ns(time=time.time, sleep=lambda s: None)   # skip the 1s run poll; fake runs finish at once
+    digest.send_email_oauth = fake_google.send
+    core.append_row_oauth, core.update_row_oauth = fake_google.append, fake_google.update
+    handlers = _handlers() if args.mode == "queue" else None
+
+    rng = random.Random(args.seed)
+    companies: List[Dict[str, str]] = []
+    results = {"ok": 0, "failed": 0, "duplicate": 0}
+
+    async def _deal(i: int):
+        if companies and rng.random() < args.resubmit:
+            answers = dict(rng.choice(companies))
+            answers["traction"] = f"${rng.randint(100, 900)}k MRR, {rng.randint(5, 80)}% MoM"
+        else:
+            answers = synthetic_answers(i, rng)
+            companies.append(answers)
+            if len(companies) > 200:
+                companies.pop(0)
+        body = json.dumps(typeform_payload(answers, f"soak-{i}")).encode("utf-8")
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        request = Request({"type": "http", "method": "POST", "path": "/webhook/typeform-webhook",
+                           "headers": [(b"content-type", b"application/json")], "query_string": b""}, receive)
+        tasks = BackgroundTasks()
+        try:
+            resp = await typeform_webhook(request, tasks)
+            await tasks()
+            results["duplicate" if resp.get("duplicate") else "ok"] += 1
+        except Exception as e:
+            results["failed"] += 1
+            if results["failed"] <= 3:
+                print(f"SOAK deal {i} failed: {type(e).__name__}: {e}", flush=True)
+
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tracemalloc.start(args.frames)
+    samples: List[Dict[str, Any]] = []
+    baseline: Optional[tracemalloc.Snapshot] = None
+    t0 = time.time()
+    done = 0
+    while done < args.deals:
+        n = min(args.concurrency, args.deals - done)
+        await asyncio.gather(*(_deal(done + k) for k in range(n)))
+        if args.mode == "queue":
+            while await asyncio.to_thread(_work_one, QUEUE, "soak:0", handlers):
+                pass
+        done += n
+        at_warmup = baseline is None and done >= args.warmup
+        if at_warmup or (baseline is not None and (done - args.warmup) % args.every < n) or done == args.deals:
+            pdf._ARCHIVER.submit(lambda: None).result()   # let queued archive writes land
+            gc.collect()
+            # the harness's own bookkeeping (recent companies, samples) is not the pipeline's
+            snap = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                 tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")])
+            if at_warmup:
+                baseline = snap
+            samples.append({"deals": done, "traced": sum(st.size for st in snap.statistics("filename")),
+                            "rss": rss_bytes(),
+                            "fds": open_fds(), "threads": threading.active_count(),
+                            "disk": dir_bytes(args.dir), "snapshot": snap, "t": time.time() - t0})
+            s = samples[-1]
+            print(f"SOAK {done:>6} deals  {done / s['t']:6.1f}/s  traced {s['traced'] / 2**20:7.1f} MB  "
+                  f"rss {s['rss'] / 2**20:7.1f} MB  disk {sum(s['disk'].values()) / 2**20:7.1f} MB  "
+                  f"fds {s['fds']:>4}  threads {s['threads']:>3}", flush=True)
+    tracemalloc.stop()
+    return _report(args, samples, baseline, repo, results, fake_ai, fake_google)
+
+
+def _report(args, samples, baseline, repo, results, fake_ai, fake_google) -> int:
+    steady = [s for s in samples if s["deals"] >= args.warmup]
+    if len(steady) < 2:
+        print("SOAK not enough samples after warmup; raise --deals or lower --warmup/--every", flush=True)
+        return 2
+    xs = [s["deals"] for s in steady]
+    heap_kb = slope(xs, [s["traced"] for s in steady]) / 1024
+    disk_kb = slope(xs, [sum(s["disk"].values()) for s in steady]) / 1024
+    rss_mb = (steady[-1]["rss"] - steady[0]["rss"]) / 2**20
+    first, last = steady[0], steady[-1]
+
+    print(f"\nSOAK {results} | emails {fake_google.emails} rows {fake_google.rows} (+{fake_google.updates} updated) "
+          f"| openai calls {fake_ai.calls}, threads left {fake_ai.live_threads()}")
+    print(f"steady state over {last['deals'] - first['deals']} deals: heap {heap_kb:+.2f} KB/deal, "
+          f"rss {rss_mb:+.1f} MB, disk {disk_kb:+.2f} KB/deal, "
+          f"fds {last['fds'] - first['fds']:+d}, threads {last['threads'] - first['threads']:+d}")
+    print("\nheap growth by module (since warmup):")
+    for mod, size in list(module_growth(baseline, last["snapshot"], repo).items())[:args.top]:
+        print(f"  {size / 1024:+10.1f} KB  {mod}")
+    print("\ndisk growth by path (since warmup):")
+    for name in sorted(last["disk"], key=lambda k: -(last["disk"][k] - first["disk"].get(k, 0))):
+        grown = last["disk"][name] - first["disk"].get(name, 0)
+        if grown:
+            print(f"  {grown / 1024:+10.1f} KB  {name}")
+
+    failures = []
+    if heap_kb > args.max_heap_kb:
+        failures.append(f"heap grows {heap_kb:.2f} KB/deal (max {args.max_heap_kb})")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"RSS grew {rss_mb:.1f} MB after warmup (max {args.max_rss_mb})")
+    if disk_kb > args.max_disk_kb:
+        failures.append(f"disk grows {disk_kb:.2f} KB/deal (max {args.max_disk_kb})")
+    if last["threads"] - first["threads"] > args.max_thread_growth:
+        failures.append(f"{last['threads'] - first['threads']} threads more than after warmup")
+    if last["fds"] - first["fds"] > args.max_fd_growth:
+        failures.append(f"{last['fds'] - first['fds']} file descriptors more than after warmup")
+    if fake_ai.live_threads() and os.getenv("ASSISTANT_KEEP_THREADS", "0") not in ("1", "true", "True"):
+        failures.append(f"{fake_ai.live_threads()} assistant threads never deleted")
+    if results["failed"]:
+        failures.append(f"{results['failed']} deals failed")
+    for f in failures:
+        print(f"SOAK FAIL: {f}", flush=True)
+    if not failures:
+        print("SOAK OK", flush=True)
+    return 1 if failures else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Drive synthetic deals through the pipeline and watch for leaks.")
+    ap.add_argument("--deals", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=200, help="deals before the baseline snapshot")
+    ap.add_argument("--every", type=int, default=250, help="sample every N deals after warmup")
+    ap.add_argument("--concurrency", type=int, default=4, help="deals in flight at once")
+    ap.add_argument("--mode", choices=["inline", "queue"], default="inline")
+    ap.add_argument("--memo-mode", choices=["single", "sections", "lite"], default="single")
+    ap.add_argument("--prescreen", choices=["off", "rules"], default="rules")
+    ap.add_argument("--delivery", choices=["instant", "hourly", "daily"], default="instant")
+    ap.add_argument("--resubmit", type=float, default=0.05, help="share of deals resubmitting a known company")
+    ap.add_argument("--archive", action="store_true", help="also write PDFs to an archive dir")
+    ap.add_argument("--retention-s", type=float, default=0,
+                    help="shrink the dedupe / status / work-queue retention windows to this many seconds")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--frames", type=int, default=1, help="tracemalloc frames per allocation")
+    ap.add_argument("--top", type=int, default=12)
+    ap.add_argument("--max-heap-kb", type=float, default=4.0, help="steady-state heap growth, KB/deal")
+    ap.add_argument("--max-rss-mb", type=float, default=64.0, help="RSS growth after warmup, MB")
+    ap.add_argument("--max-disk-kb", type=float, default=48.0, help="steady-state disk growth, KB/deal")
+    ap.add_argument("--max-thread-growth", type=int, default=2)
+    ap.add_argument("--max-fd-growth", type=int, default=8)
+    ap.add_argument("--dir", default="", help="scratch directory (default: a temp dir, removed after)")
+    args = ap.parse_args(argv)
+
+    keep = bool(args.dir)
+    args.dir = os.path.abspath(args.dir or tempfile.mkdtemp(prefix="vc_soak_"))
+    os.makedirs(args.dir, exist_ok=True)
+    if "utils.config" in sys.modules:
+        print("SOAK must run in a fresh process (utils.config already imported)", flush=True)
+        return 2
+    _isolate(args.dir, args)
+    try:
+        return asyncio.run(_run(args))
+    finally:
+        if not keep:
+            shutil.rmtree(args.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
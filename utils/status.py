@@ -0,0 +1,146 @@
+# utils/status.py
+import asyncio, json, os, sqlite3, threading, time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from utils.config import STATUS_DB_PATH, STATUS_TTL_DAYS
+
+# Per-deal progress, keyed by the Typeform response id and written by the
+# pipeline itself as it goes:
+#   queued -> generating -> parsed -> pdf -> emailed -> logged -> done
+# plus prescreened / provisional / retrying along the way and failed or
+# skipped (duplicate) as other endings. Events live in SQLite so a deal run
+# by a worker in another process still shows up on this process's stream.
+
+TERMINAL = {"done", "failed", "skipped"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    rid    TEXT NOT NULL,
+    stage  TEXT NOT NULL,
+    ts     REAL NOT NULL,
+    detail TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS events_rid ON events (rid, id);
+"""
+
+
+class StatusBoard:
+    def __init__(self, path: str = STATUS_DB_PATH, ttl_days: float = STATUS_TTL_DAYS):
+        self.path = path
+        self.ttl_s = ttl_days * 86400
+        self._ready = False
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._subs: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    self._ready = True
+        return conn
+
+    def mark(self, rid: Optional[str], stage: str, **detail: Any):
+        """Record that `rid` reached `stage`. Never raises: status must not break a deal."""
+        if not rid:
+            return
+        now = time.time()
+        try:
+            conn = self._conn()
+            try:
+                conn.execute("INSERT INTO events (rid, stage, ts, detail) VALUES (?, ?, ?, ?)",
+                             (rid, stage, now, json.dumps(detail, default=str)))
+                self._writes += 1
+                if self._writes % 500 == 0:
+                    conn.execute("DELETE FROM events WHERE ts < ?", (now - self.ttl_s,))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"STATUS {rid} {stage} not recorded: {e}", flush=True)
+            return
+        # wake streams of this rid in this process; other processes see it on their next read
+        with self._lock:
+            subs = list(self._subs.get(rid, ()))
+        for loop, ev in subs:
+            loop.call_soon_threadsafe(ev.set)
+
+    def events(self, rid: str, after: int = 0) -> List[Dict[str, Any]]:
+        conn = self._conn()
+        try:
+            rows = conn.execute("SELECT id, stage, ts, detail FROM events WHERE rid = ? AND id > ? ORDER BY id",
+                                (rid, after)).fetchall()
+            first = conn.execute("SELECT MIN(ts) FROM events WHERE rid = ?", (rid,)).fetchone()[0]
+            prev = conn.execute("SELECT MAX(ts) FROM events WHERE rid = ? AND id <= ?",
+                                (rid, after)).fetchone()[0] if after else None
+        finally:
+            conn.close()
+        out = []
+        for r in rows:
+            prev = prev or r["ts"]
+            out.append({"id": r["id"], "stage": r["stage"], "at": r["ts"],
+                        "t": round(r["ts"] - first, 2), "dt": round(r["ts"] - prev, 2),
+                        **json.loads(r["detail"])})
+            prev = r["ts"]
+        return out
+
+    def exists(self, rid: str) -> bool:
+        conn = self._conn()
+        try:
+            return conn.execute("SELECT 1 FROM events WHERE rid = ? LIMIT 1", (rid,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def summary(self, rid: str) -> Optional[Dict[str, Any]]:
+        evs = self.events(rid)
+        if not evs:
+            return None
+        return {"rid": rid, "stage": evs[-1]["stage"], "finished": evs[-1]["stage"] in TERMINAL,
+                "elapsed_s": evs[-1]["t"], "events": evs}
+
+    async def stream(self, rid: str, after: int = 0, heartbeat_s: float = 15,
+                     poll_s: float = 1.0) -> AsyncIterator[str]:
+        """Server-sent events for `rid`: backlog after `after`, then new stages until a terminal one."""
+        loop = asyncio.get_running_loop()
+        ev = asyncio.Event()
+        sub = (loop, ev)
+        with self._lock:
+            self._subs.setdefault(rid, set()).add(sub)
+        try:
+            idle = 0.0
+            while True:
+                ev.clear()
+                for e in await asyncio.to_thread(self.events, rid, after):
+                    after = e["id"]
+                    idle = 0.0
+                    yield f"id: {e['id']}\nevent: {e['stage']}\ndata: {json.dumps(e)}\n\n"
+                    if e["stage"] in TERMINAL:
+                        return
+                try:
+                    await asyncio.wait_for(ev.wait(), timeout=poll_s)
+                except asyncio.TimeoutError:
+                    idle += poll_s
+                    if idle >= heartbeat_s:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+        finally:
+            with self._lock:
+                self._subs.get(rid, set()).discard(sub)
+                if not self._subs.get(rid):
+                    self._subs.pop(rid, None)
+
+
+STATUS = StatusBoard()
+
+
+async def tracked(rid: Optional[str], fn, /, *args, **kwargs):
+    """Await fn(*args, **kwargs) and record a failed stage for `rid` if it raises."""
+    try:
+        return await fn(*args, **kwargs)
+    except Exception as e:
+        STATUS.mark(rid, "failed", error=f"{type(e).__name__}: {e}"[:500])
+        raise
@@ -0,0 +1,177 @@
+# utils/traction.py
+import re
+from typing import Any, Iterable, List, Optional
+from pydantic import BaseModel
+
+# Traction text -> numbers. Patterns are compiled once and shared by the
+# per-memo path (extract_metrics) and the pandas batch path (metrics_frame),
+# so calibration, pre-screen and digest ranking all compare the same values.
+
+_NUM = r"(?P<num>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>thousand|million|billion|mm|bn|k|m|b)?(?![a-z])"
+_KIND = (r"(?P<kind>MRR|ARR|monthly recurring revenue|annual recurring revenue|"
+         r"(?:in |of )?(?:monthly|annual|yearly) (?:recurring )?revenue)")
+
+# an amount: "$2024" is money, a bare 2024 (no $, no unit) is a year
+_AMOUNT = (r"(?:\$\s*|(?!(?:19|20)\d\d\b(?![.,]\d|\s*(?:thousand|million|billion|mm|bn|k|m|b)(?![a-z]))))"
+           + _NUM)
+# "contracted ARR", "run-rate MRR"
+_QUALIFIER = r"(?:(?:contracted|committed|signed|booked|run[- ]rate|annuali[sz]ed|current|total)\s+)?"
+# "ARR 2024: $50k", "MRR (FY2025) of $20k", "ARR as of 2024: ..."
+_YEAR = r"(?:\s*(?:in|for|as of)?\s*\(?\s*(?:FY\s*)?'?(?:19|20)\d\d\s*\)?)?"
+
+# "$450K ARR", "$20k in MRR", "1.2M ARR", "$60k contracted ARR"
+MONEY_RE = re.compile(rf"{_AMOUNT}\s*\+?\s*(?:in |of )?{_QUALIFIER}{_KIND}\b", re.I)
+# "ARR of $1.2M", "MRR: $20k", "MRR is 35,000", "ARR 2024: $50k"
+MONEY_AFTER_RE = re.compile(
+    rf"\b(?P<kind>MRR|ARR)\b{_YEAR}\s*(?:of|is|at|:|=|~|≈|-|–|reached|hit)?\s*(?:~|≈)?\s*{_AMOUNT}", re.I)
+# "40% MoM", "15% month-over-month growth", "3x YoY"
+GROWTH_RE = re.compile(
+    r"(?:(?P<pct>\d+(?:\.\d+)?)\s*%|(?P<mult>\d+(?:\.\d+)?)\s*x)\s*(?P<word>growth|increase)?\s*\(?\s*"
+    r"(?P<per>MoM|m/m|month[- ]over[- ]month|monthly|WoW|w/w|week[- ]over[- ]week|weekly|"
+    r"YoY|y/y|year[- ]over[- ]year|yearly|annual(?:ly)?)?", re.I)
+# "12 paying customers", "40+ enterprise clients", "1.5k logos"
+CUSTOMERS_RE = re.compile(
+    rf"{_NUM}\s*\+?\s*(?:paying |enterprise |b2b |active |signed )?(?:customers|clients|logos|accounts)\b", re.I)
+# "10k users", "2.3M MAU", "500 subscribers"
+USERS_RE = re.compile(
+    rf"{_NUM}\s*\+?\s*(?:monthly active |daily active |active |registered |paid |paying )?"
+    r"(?:users|MAU|DAU|subscribers|subs|members)\b", re.I)
+
+_UNIT = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6,
+         "b": 1e9, "bn": 1e9, "billion": 1e9}
+_PERIOD = {"mom": "month", "m/m": "month", "monthly": "month", "wow": "week", "w/w": "week",
+           "weekly": "week", "yoy": "year", "y/y": "year", "yearly": "year", "annual": "year",
+           "annually": "year"}
+
+
+def _number(num: str, unit: Optional[str]) -> float:
+    return float(num.replace(",", "")) * _UNIT.get((unit or "").lower(), 1)
+
+def _whole(n: float) -> int:
+    # same rounding as metrics_frame's Series.round(): nearest, ties to even
+    return int(round(n))
+
+def _is_annual(kind: str) -> bool:
+    k = kind.lower()
+    return k == "arr" or "annual" in k or "yearly" in k
+
+def _period(per: Optional[str]) -> str:
+    p = re.sub(r"[- ]over[- ]", "o", (per or "").lower())
+    p = {"monthomonth": "mom", "weekoweek": "wow", "yearoyear": "yoy"}.get(p, p)
+    return _PERIOD.get(p, "")
+
+
+class TractionMetrics(BaseModel):
+    mrr: Optional[int] = None            # monthly; stated ARR counts as ARR / 12
+    arr: Optional[int] = None            # mrr * 12 when only MRR was stated
+    growth_pct: Optional[float] = None   # as stated ("3x" is 200%)
+    growth_period: str = ""              # month | week | year | "" when not stated
+    customers: Optional[int] = None
+    users: Optional[int] = None
+    revenue_text: str = ""               # the matched span, for display
+
+    @property
+    def monthly_growth_pct(self) -> Optional[float]:
+        """Growth normalized to a monthly compound rate (None when the period is unknown)."""
+        if self.growth_pct is None or not self.growth_period:
+            return None
+        g = 1 + self.growth_pct / 100
+        exp = {"month": 1, "week": 52 / 12, "year": 1 / 12}[self.growth_period]
+        return round((g ** exp - 1) * 100, 2)
+
+
+def extract_metrics(text: str) -> TractionMetrics:
+    """Largest stated value for each metric in `text`."""
+    text = text or ""
+    mrr, span = None, ""
+    for rx in (MONEY_RE, MONEY_AFTER_RE):
+        for m in rx.finditer(text):
+            n = _number(m["num"], m["unit"])
+            n = n / 12 if _is_annual(m["kind"]) else n
+            if mrr is None or n > mrr:
+                mrr, span = n, m.group(0).strip()
+
+    growth, period = None, ""
+    for m in GROWTH_RE.finditer(text):
+        if not (m["per"] or m["word"] and m["pct"]):
+            continue   # "45% margin" or a bare "10x" is not a growth rate
+        pct = float(m["pct"]) if m["pct"] else (float(m["mult"]) - 1) * 100
+        if growth is None or pct > growth:
+            growth, period = pct, _period(m["per"])
+
+    def biggest(rx) -> Optional[int]:
+        vals = [_number(m["num"], m["unit"]) for m in rx.finditer(text)]
+        return _whole(max(vals)) if vals else None
+
+    customers, users = biggest(CUSTOMERS_RE), biggest(USERS_RE)
+    if not span:
+        m = CUSTOMERS_RE.search(text) or USERS_RE.search(text)
+        span = m.group(0).strip() if m else ""
+    return TractionMetrics(
+        mrr=_whole(mrr) if mrr is not None else None,
+        arr=_whole(mrr * 12) if mrr is not None else None,
+        growth_pct=growth, growth_period=period,
+        customers=customers, users=users, revenue_text=span,
+    )
+
+
+def _frame_max(s, rx, value):
+    # one str.extractall per pattern; conversion and per-row max stay vectorized
+    hits = s.str.extractall(rx)
+    if hits.empty:
+        return None
+    v = value(hits)
+    return v.groupby(level=0).max().reindex(s.index)
+
+def metrics_frame(texts: Iterable[str], index: Optional[List[Any]] = None):
+    """
+    Batch version of extract_metrics for whole archives (Sheet exports, digest
+    history). Returns a DataFrame with mrr, arr, growth_pct, growth_period,
+    customers and users columns, one row per input text.
+    """
+    import numpy as np
+    import pandas as pd
+
+    full = pd.Series(list(texts), index=index, dtype="object").fillna("").astype(str)
+    # archives repeat themselves and many rows have no figures at all:
+    # scan each distinct text that contains a digit once, then broadcast back
+    s = pd.Series(full[full.str.contains(r"\d", regex=True)].unique(), dtype="object")
+    out = pd.DataFrame(index=s.index)
+
+    def money(h):
+        n = pd.to_numeric(h["num"].str.replace(",", "", regex=False), errors="coerce")
+        n = n * h["unit"].str.lower().map(_UNIT).fillna(1)
+        annual = h["kind"].str.lower().str.contains("arr|annual|yearly", regex=True)
+        return n.where(~annual, n / 12)
+
+    def count(h):
+        n = pd.to_numeric(h["num"].str.replace(",", "", regex=False), errors="coerce")
+        return n * h["unit"].str.lower().map(_UNIT).fillna(1)
+
+    parts = [p for p in (_frame_max(s, MONEY_RE, money), _frame_max(s, MONEY_AFTER_RE, money))
+             if p is not None]
+    mrr = pd.concat(parts, axis=1).max(axis=1) if parts else pd.Series(np.nan, index=s.index)
+    out["mrr"] = mrr.round().astype("Int64")
+    out["arr"] = (mrr * 12).round().astype("Int64")
+
+    g = s.str.extractall(GROWTH_RE)
+    if g.empty or not (g["per"].notna() | (g["word"].notna() & g["pct"].notna())).any():
+        out["growth_pct"], out["growth_period"] = np.nan, ""
+    else:
+        g = g[g["per"].notna() | (g["word"].notna() & g["pct"].notna())]
+        pct = pd.to_numeric(g["pct"], errors="coerce").fillna(
+            (pd.to_numeric(g["mult"], errors="coerce") - 1) * 100)
+        g = g.assign(pct=pct, per=g["per"].map(_period, na_action="ignore").fillna(""))
+        best = g.sort_values("pct").groupby(level=0).tail(1).droplevel(1)
+        out["growth_pct"] = best["pct"].reindex(s.index)
+        out["growth_period"] = best["per"].reindex(s.index).fillna("")
+
+    for col, rx in (("customers", CUSTOMERS_RE), ("users", USERS_RE)):
+        v = _frame_max(s, rx, count)
+        out[col] = (v if v is not None else pd.Series(np.nan, index=s.index)).round().astype("Int64")
+    out.index = s.values
+    res = out.reindex(full.values)
+    res.index = full.index
+    res["growth_period"] = res["growth_period"].fillna("")
+    return res
+
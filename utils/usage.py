@@ -0,0 +1,298 @@
+# utils/usage.py
+import contextvars, os, sqlite3, threading, time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from utils.config import (
+    USAGE_DB_PATH, USAGE_PRICES, USAGE_ASSISTANT_MODEL, USAGE_LITE_MODEL,
+    USAGE_DAILY_BUDGET_USD, USAGE_DEAL_BUDGET_USD, OPENAI_COMPLETION_TOKENS_EST,
+    MEMO_SECTION_MODEL, MEMO_SECTION_MAX_TOKENS, RESUBMIT_MAX_SECTIONS, WORK_MODE,
+)
+from utils.ratelimit import CHARS_PER_TOKEN
+
+# Tokens and estimated cost of every OpenAI call, tagged with the deal (rid)
+# and pipeline stage, in SQLite so budgets hold across worker processes. The
+# deal is carried in a context variable: set it with bind(rid) where a deal
+# starts and wrap work handed to a thread pool with carry().
+
+DEAL: contextvars.ContextVar[str] = contextvars.ContextVar("usage_deal", default="")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id                INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts                REAL NOT NULL,
+    day               TEXT NOT NULL,      -- UTC date
+    rid               TEXT NOT NULL,
+    stage             TEXT NOT NULL,      -- memo | mini | section | prescreen | rescore
+    model             TEXT NOT NULL,
+    prompt_tokens     INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost              REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_day ON calls (day);
+CREATE INDEX IF NOT EXISTS calls_rid ON calls (rid);
+CREATE TABLE IF NOT EXISTS deals (
+    rid      TEXT PRIMARY KEY,
+    ts       REAL NOT NULL,
+    mode     TEXT NOT NULL,
+    est_cost REAL NOT NULL,
+    settled  REAL                 -- NULL while the deal may still make calls
+);
+"""
+
+_SECTION_PROMPT_TOKENS = 600   # fact sheet + instruction per section request
+_SECTIONS = 13                 # len(utils.sections.MEMO_SECTIONS)
+_OPEN_S = 3600                 # an unsettled deal older than this crashed; stop reserving for it
+_RESERVED_RETRY_S = 300        # deferred on reservations alone: look again this soon
+
+
+class BudgetDeferred(Exception):
+    """The daily budget is spent or committed; the deal should wait until `until` (epoch seconds)."""
+
+    def __init__(self, until: float):
+        super().__init__(f"daily budget spent; deferred until {datetime.fromtimestamp(until, timezone.utc):%Y-%m-%d %H:%M}Z")
+        self.until = until
+
+
+def _prices(spec: str) -> List[Tuple[str, float, float]]:
+    out = []
+    for part in (spec or "").split(","):
+        model, _, rates = part.strip().partition(":")
+        inp, _, outp = rates.partition("/")
+        try:
+            out.append((model.strip(), float(inp), float(outp)))
+        except ValueError:
+            continue
+    return sorted(out, key=lambda p: -len(p[0]))   # longest prefix wins: gpt-4o-mini before gpt-4o
+
+def _day(ts: Optional[float] = None) -> str:
+    return datetime.fromtimestamp(ts or time.time(), timezone.utc).strftime("%Y-%m-%d")
+
+def next_day_utc(now: Optional[float] = None) -> float:
+    d = datetime.fromtimestamp(now or time.time(), timezone.utc).date() + timedelta(days=1)
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp()
+
+
+class UsageLedger:
+    def __init__(self, path: str = USAGE_DB_PATH, prices: str = USAGE_PRICES,
+                 daily_budget: float = USAGE_DAILY_BUDGET_USD, deal_budget: float = USAGE_DEAL_BUDGET_USD):
+        self.path = path
+        self.prices = _prices(prices)
+        self.daily_budget = daily_budget
+        self.deal_budget = deal_budget
+        self._ready = False
+        self._lock = threading.Lock()
+        self._unpriced = set()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    cols = {r["name"] for r in conn.execute("PRAGMA table_info(deals)")}
+                    if "settled" not in cols:   # ledgers created before reservations
+                        conn.execute("ALTER TABLE deals ADD COLUMN settled REAL")
+                    self._ready = True
+        return conn
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        m = (model or "").lower()
+        rate = next((p for p in self.prices if m.startswith(p[0])), None)
+        if rate is None:
+            rate = next((p for p in self.prices if USAGE_ASSISTANT_MODEL.startswith(p[0])), ("", 0.0, 0.0))
+            if m not in self._unpriced:
+                self._unpriced.add(m)
+                print(f"USAGE no price for {model!r}; using {USAGE_ASSISTANT_MODEL} rates", flush=True)
+        return (prompt_tokens * rate[1] + completion_tokens * rate[2]) / 1_000_000
+
+    def record(self, stage: str, model: str, usage: Any, rid: Optional[str] = None):
+        """Log one call's usage (an OpenAI usage object or dict). Never raises."""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+        p, c = int(get("prompt_tokens") or 0), int(get("completion_tokens") or 0)
+        now = time.time()
+        try:
+            conn = self._conn()
+            try:
+                conn.execute(
+                    "INSERT INTO calls (ts, day, rid, stage, model, prompt_tokens, completion_tokens, cost) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (now, _day(now), rid if rid is not None else DEAL.get(), stage, model or "", p, c,
+                     self.cost(model, p, c)))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"USAGE {stage} not recorded: {e}", flush=True)
+
+    # --- budgets ---
+    def spent_today(self) -> float:
+        conn = self._conn()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(cost), 0) FROM calls WHERE day = ?", (_day(),)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def reserved(self, exclude: str = "") -> float:
+        """Estimated cost still to come from admitted deals: each open deal's estimate less what it has spent."""
+        conn = self._conn()
+        try:
+            return conn.execute(
+                "SELECT COALESCE(SUM(MAX(0, est_cost - (SELECT COALESCE(SUM(cost), 0) FROM calls "
+                "WHERE calls.rid = deals.rid))), 0) FROM deals WHERE settled IS NULL AND ts > ? AND rid != ?",
+                (time.time() - _OPEN_S, exclude)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def release(self, rid: Optional[str]):
+        """The deal makes no more calls: drop what is left of its reservation."""
+        if not rid:
+            return
+        conn = self._conn()
+        try:
+            conn.execute("UPDATE deals SET settled = ? WHERE rid = ?", (time.time(), rid))
+        finally:
+            conn.close()
+
+    def defer_until(self) -> float:
+        """When a deferred deal should try again: tomorrow if today's budget is spent, else once reservations settle."""
+        if self.daily_budget > 0 and self.spent_today() >= self.daily_budget:
+            return next_day_utc()
+        return time.time() + _RESERVED_RETRY_S
+
+    def deal_cost(self, rid: Optional[str] = None) -> float:
+        rid = rid if rid is not None else DEAL.get()
+        if not rid:
+            return 0.0
+        conn = self._conn()
+        try:
+            return conn.execute("SELECT COALESCE(SUM(cost), 0) FROM calls WHERE rid = ?", (rid,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def over_deal_budget(self, rid: Optional[str] = None) -> bool:
+        """True once a deal has spent its budget: skip optional calls (hedges, retries)."""
+        return self.deal_budget > 0 and self.deal_cost(rid) >= self.deal_budget
+
+    def estimate(self, prompt: str, mode: str) -> float:
+        """Expected cost of a memo in `mode`: the token estimate, or recent actuals if higher."""
+        pt = len(prompt or "") // CHARS_PER_TOKEN
+        sections = _SECTIONS * self.cost(MEMO_SECTION_MODEL if mode != "lite" else USAGE_LITE_MODEL,
+                                         _SECTION_PROMPT_TOKENS, MEMO_SECTION_MAX_TOKENS)
+        if mode == "lite":
+            est = self.cost(USAGE_LITE_MODEL, pt, 1000) + sections
+        elif mode == "incremental":     # a resubmission: a few sections and a rescore
+            est = sections * RESUBMIT_MAX_SECTIONS / _SECTIONS
+        elif mode == "sections":
+            est = self.cost(USAGE_ASSISTANT_MODEL, pt, 1000) + sections
+        else:
+            est = self.cost(USAGE_ASSISTANT_MODEL, pt, OPENAI_COMPLETION_TOKENS_EST)
+        conn = self._conn()
+        try:
+            recent = conn.execute(
+                "SELECT AVG(c) FROM (SELECT (SELECT COALESCE(SUM(cost), 0) FROM calls WHERE calls.rid = deals.rid) AS c "
+                "FROM deals WHERE mode = ? AND ts < ? ORDER BY ts DESC LIMIT 50)",
+                (mode, time.time() - 3600)).fetchone()[0]
+        finally:
+            conn.close()
+        return max(est, recent or 0.0)
+
+    def admit(self, prompt: str, mode: str, rid: Optional[str] = None) -> str:
+        """
+        Memo mode a deal can afford right now: `mode` itself, "lite" when it would
+        cross the daily or per-deal budget, and when not even that fits
+        "defer" (queue mode; raise BudgetDeferred) or "fallback" (form-only memo).
+        A deal whose lite memo alone exceeds the per-deal budget always falls back.
+        Today's spend counts the estimates of deals admitted but not yet settled,
+        so a burst of deals can't all be admitted against the same headroom.
+        """
+        rid = rid if rid is not None else DEAL.get()
+        chosen = mode
+        if self.daily_budget > 0 or self.deal_budget > 0:
+            spent = self.spent_today() + self.reserved(exclude=rid or "")
+            est = self.estimate(prompt, mode)
+            lite = est if mode == "lite" else self.estimate(prompt, "lite")
+            over = lambda cost: self.daily_budget > 0 and spent + cost > self.daily_budget
+            over_deal = lambda cost: self.deal_budget > 0 and cost > self.deal_budget
+            if self.daily_budget > 0 and (spent >= self.daily_budget or over(est) and over(lite)):
+                chosen = "defer" if WORK_MODE == "queue" else "fallback"
+            elif over_deal(est) and over_deal(lite):
+                chosen = "fallback"   # too big for its own cap in any mode; waiting won't shrink it
+            elif over(est) or over_deal(est):
+                chosen = "lite"
+            if chosen != mode:
+                print(f"BUDGET {rid or '-'}: {mode} -> {chosen} (today ${spent:.2f} incl. reserved/"
+                      f"{self.daily_budget or '∞'}, est ${est:.3f}/deal {self.deal_budget or '∞'})", flush=True)
+        if rid and chosen not in ("defer", "fallback"):
+            conn = self._conn()
+            try:
+                conn.execute("INSERT OR REPLACE INTO deals (rid, ts, mode, est_cost) VALUES (?, ?, ?, ?)",
+                             (rid, time.time(), chosen, self.estimate(prompt, chosen)))
+            finally:
+                conn.close()
+        return chosen
+
+    # --- reporting ---
+    def deal(self, rid: str) -> Dict[str, Any]:
+        conn = self._conn()
+        try:
+            rows = conn.execute(
+                "SELECT stage, COUNT(*) AS calls, SUM(prompt_tokens) AS p, SUM(completion_tokens) AS c, "
+                "SUM(cost) AS cost FROM calls WHERE rid = ? GROUP BY stage", (rid,)).fetchall()
+            mode = conn.execute("SELECT mode FROM deals WHERE rid = ?", (rid,)).fetchone()
+        finally:
+            conn.close()
+        stages = {r["stage"]: {"calls": r["calls"], "prompt_tokens": r["p"], "completion_tokens": r["c"],
+                               "cost_usd": round(r["cost"], 5)} for r in rows}
+        return {"mode": mode[0] if mode else None,
+                "prompt_tokens": sum(s["prompt_tokens"] for s in stages.values()),
+                "completion_tokens": sum(s["completion_tokens"] for s in stages.values()),
+                "cost_usd": round(sum(s["cost_usd"] for s in stages.values()), 5), "stages": stages}
+
+    def daily(self, days: int = 14) -> List[Dict[str, Any]]:
+        conn = self._conn()
+        try:
+            since = _day(time.time() - (days - 1) * 86400)
+            totals = conn.execute(
+                "SELECT day, COUNT(DISTINCT rid) AS deals, COUNT(*) AS calls, SUM(prompt_tokens) AS p, "
+                "SUM(completion_tokens) AS c, SUM(cost) AS cost FROM calls WHERE day >= ? "
+                "GROUP BY day ORDER BY day DESC", (since,)).fetchall()
+            by_stage = conn.execute(
+                "SELECT day, stage, SUM(cost) AS cost FROM calls WHERE day >= ? GROUP BY day, stage",
+                (since,)).fetchall()
+        finally:
+            conn.close()
+        stages: Dict[str, Dict[str, float]] = {}
+        for r in by_stage:
+            stages.setdefault(r["day"], {})[r["stage"]] = round(r["cost"], 4)
+        return [{"day": r["day"], "deals": r["deals"], "calls": r["calls"], "prompt_tokens": r["p"],
+                 "completion_tokens": r["c"], "cost_usd": round(r["cost"], 4),
+                 "cost_per_deal_usd": round(r["cost"] / max(1, r["deals"]), 4),
+                 "by_stage": stages.get(r["day"], {})} for r in totals]
+
+    def summary(self) -> Dict[str, Any]:
+        return {"today_usd": round(self.spent_today(), 4), "reserved_usd": round(self.reserved(), 4),
+                "daily_budget_usd": self.daily_budget, "deal_budget_usd": self.deal_budget}
+
+
+USAGE = UsageLedger()
+
+
+def bind(rid: Optional[str]):
+    """Attribute OpenAI calls made from here on (this thread / task) to `rid`."""
+    DEAL.set(rid or "")
+
+def carry(fn: Callable, rid: Optional[str] = None) -> Callable:
+    """`fn` bound to the current deal (or `rid`), for handing to a thread pool."""
+    rid = rid if rid is not None else DEAL.get()
+
+    def run(*args, **kwargs):
+        token = DEAL.set(rid)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            DEAL.reset(token)
+    return run
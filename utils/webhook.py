@@ -1,58 +1,52 @@
 # utils/webhook.py
-import logging, traceback, time
-from fastapi import APIRouter, Request, BackgroundTasks
+import asyncio, hmac, logging, traceback, time
+from fastapi import APIRouter, Request, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any
-from utils.field_map import FIELD_ID_MAP
+from utils.form_schema import SCHEMA, loads
+from utils.ratelimit import GOVERNOR
+from utils.hedge import HEDGE
+from utils.pdf_cache import PDF_CACHE
+from utils.pdf import PDF_STATS
+from utils.config import DEDUPE_MODE, RESUBMIT_MODE, WORK_MODE, ADMIN_TOKEN
+from utils.dedupe import INDEX
+from utils.resubmit import STORE, diff_answers, plan_update, same_company
+from utils.workqueue import QUEUE
+from utils.priority import GATE, deal_priority
+from utils.status import STATUS, tracked
+from utils.usage import USAGE
 
 router = APIRouter()
-SEEN: Dict[str, float] = {}
 
 def _seen(id_: str, ttl: int = 600) -> bool:
-    now = time.time()
-    for k, v in list(SEEN.items()):
-        if v < now:
-            SEEN.pop(k, None)
-    if not id_:
-        return False
-    if id_ in SEEN:
-        return True
-    SEEN[id_] = now + ttl
-    return False
-
-# 🔧 bring back the parser utilities
-def _extract_value(a: Dict[str, Any]) -> str:
-    for k in ("text", "email", "url", "number", "boolean", "phone_number"):
-        v = a.get(k)
-        if v not in (None, ""):
-            return str(v).strip()
-    ch = a.get("choice")
-    if isinstance(ch, dict) and ch.get("label"):
-        return str(ch["label"]).strip()
-    labels = (a.get("choices") or {}).get("labels")
-    if isinstance(labels, list) and labels:
-        return ", ".join([str(x).strip() for x in labels])
-    if a.get("file_url"):
-        return str(a["file_url"]).strip()
-    files = a.get("files")
-    if isinstance(files, list) and files:
-        for f in files:
-            url = f.get("url") or f.get("file_url")
-            if url:
-                return str(url).strip()
-    return str(a)
+    # shared by every worker process through the queue database
+    return QUEUE.seen(id_, ttl)
+
+def _require_admin(request: Request):
+    # operator endpoints: the admin token when configured, otherwise only this host
+    if ADMIN_TOKEN:
+        given = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(given.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="admin token required")
+    elif not request.client or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="set ADMIN_TOKEN to call this remotely")
 
 def extract_answers_by_id(form_response: Dict[str, Any]) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    for a in form_response.get("answers", []):
-        fid = (a.get("field") or {}).get("id")
-        key = FIELD_ID_MAP.get(fid)
-        out[key or f"UNMAPPED::{fid}"] = _extract_value(a)
-    return out
+    return SCHEMA.parse(form_response)[0]
 
 @router.post("/typeform-webhook")
 async def typeform_webhook(request: Request, background_tasks: BackgroundTasks):
-    payload: Dict[str, Any] = await request.json()
+    try:
+        payload: Dict[str, Any] = loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="body is not valid JSON")
+    if not isinstance(payload, dict) or not isinstance(payload.get("form_response") or {}, dict):
+        raise HTTPException(status_code=400, detail="body is not a Typeform webhook object")
     dry_run = request.query_params.get("dry_run") in ("1", "true", "True")
+    # dedupe, index, store and queue calls are SQLite / file I/O: off the event loop
+    return await asyncio.to_thread(_accept, payload, dry_run, background_tasks)
+
+def _accept(payload: Dict[str, Any], dry_run: bool, background_tasks: BackgroundTasks) -> Dict[str, Any]:
     form_response = payload.get("form_response") or {}
     rid = (payload.get("event_id")
            or form_response.get("token")
@@ -61,35 +55,105 @@ async def typeform_webhook(request: Request, background_tasks: BackgroundTasks):
     if rid and _seen(rid):
         return {"ok": True, "dedup": True}
 
-    parsed = extract_answers_by_id(form_response)
+    # answers, StartupInfo and prompt extras in one pass over the current field schema
+    parsed, info, extra, unmapped = SCHEMA.parse(form_response)
 
+    lane, reasons = deal_priority(parsed)
     if dry_run:
-        return {"ok": True, "dry_run": True, "parsed_answers": parsed}
-
-    from utils.core import submit, StartupInfo
-    info = StartupInfo(
-        name=parsed.get("name","NA"), website=parsed.get("website","NA"),
-        round=parsed.get("round","Seed"), investors=parsed.get("investors","N/A"),
-        traction=parsed.get("traction",""), team=parsed.get("team",""),
-        product=parsed.get("solution",""), email_to=""
-    )
-    extra = {
-        "first_name": parsed.get("first_name",""),
-        "last_name": parsed.get("last_name",""),
-        "founder_email": parsed.get("founder_email",""),
-        "incorporation": parsed.get("incorporation",""),
-        "position": parsed.get("position",""),
-        "problem": parsed.get("problem",""),
-        "solution": parsed.get("solution",""),
-        "market": parsed.get("market",""),
-        "team_detail": parsed.get("team",""),
-        "university": parsed.get("university",""),
-        "competition": parsed.get("competition",""),
-        "milestones": parsed.get("milestones",""),
-        "vision": parsed.get("vision",""),
-        "pitch_deck_url": parsed.get("pitch_deck_url",""),
-    }
-
-    # ✅ queue the coroutine directly (don’t wrap with asyncio.create_task)
-    background_tasks.add_task(submit, info, extra_context=extra)
-    return {"ok": True, "queued": True, "rid": rid}
+        return {"ok": True, "dry_run": True, "parsed_answers": parsed, "unmapped": unmapped,
+                "schema": SCHEMA.compiled.version, "lane": lane}
+    print(f"LANE {parsed.get('name')}: {lane} ({', '.join(reasons) or 'cold'})", flush=True)
+
+    # same company under a new response token? decide before paying for a run
+    sheet_row = None
+    if DEDUPE_MODE in ("flag", "skip"):
+        dup = INDEX.lookup(parsed.get("name", ""), parsed.get("website", ""),
+                           parsed.get("founder_email", ""))
+        prev = STORE.get(dup["rid"]) if dup and RESUBMIT_MODE == "incremental" else None
+        if prev and not same_company(dup["match"], prev["answers"], parsed):
+            prev = None   # another company that shares a founder email or a similar name: its own row
+        if prev:
+            # a resubmission of a memo we already wrote: redo only what changed
+            changed = diff_answers(prev["answers"], parsed)
+            plan = plan_update(changed)
+            if plan is not None and plan["fields"]:
+                STATUS.mark(rid or prev["rid"], "queued", lane=lane, mode=WORK_MODE, incremental=plan["fields"])
+                if WORK_MODE == "queue":
+                    QUEUE.enqueue("resubmit", {"prev": prev, "info": info.model_dump(), "extra": extra,
+                                               "answers": parsed, "rid": rid or prev["rid"],
+                                               "plan": plan, "changed": plan["fields"]},
+                                  job_id=f"resubmit:{rid}" if rid else None, lane=lane)
+                else:
+                    from utils.core import process_resubmission
+                    background_tasks.add_task(GATE.run, lane, tracked, rid or prev["rid"], asyncio.to_thread,
+                                              process_resubmission, prev, info, extra, parsed,
+                                              rid or prev["rid"], plan, plan["fields"])
+                return {"ok": True, "queued": True, "rid": rid, "incremental": plan["fields"]}
+            if plan is None:
+                # too much changed to patch: full run, still into the company's Sheet row
+                dup, sheet_row = None, prev.get("sheet_row")
+        if dup:
+            print(f"DEDUPE {parsed.get('name')} matches {dup['name']} by {dup['match']}", flush=True)
+            if DEDUPE_MODE == "skip":
+                STATUS.mark(rid, "skipped", duplicate_of=dup["rid"], match=dup["match"])
+                return {"ok": True, "duplicate": True, "rid": rid,
+                        "match": {"name": dup["name"], "by": dup["match"], "rid": dup["rid"]}}
+        # the company is indexed once its memo is out (core._remember_company)
+
+    STATUS.mark(rid, "queued", lane=lane, mode=WORK_MODE)
+    if WORK_MODE == "queue":
+        # any worker process on this host picks it up
+        QUEUE.enqueue("submit", {"info": info.model_dump(), "extra": extra, "answers": parsed,
+                                 "rid": rid, "sheet_row": sheet_row}, job_id=rid, lane=lane)
+        return {"ok": True, "queued": True, "rid": rid, "lane": lane}
+
+    from utils.core import submit
+    # ✅ queue the coroutine directly (don’t wrap with asyncio.create_task);
+    # GATE holds it in its lane while DEAL_CONCURRENCY deals are already running
+    background_tasks.add_task(GATE.run, lane, tracked, rid, submit, info, extra_context=extra,
+                              answers=parsed, rid=rid, sheet_row=sheet_row)
+    return {"ok": True, "queued": True, "rid": rid, "lane": lane}
+
+@router.get("/metrics")
+async def metrics(request: Request):
+    _require_admin(request)
+    return {"rate_governor": GOVERNOR.stats, "hedging": HEDGE.metrics,
+            "pdf_cache": PDF_CACHE.summary(), "pdf_size": PDF_STATS,
+            "work_queue": QUEUE.stats() if WORK_MODE == "queue" else None,
+            "lanes": GATE.stats() if WORK_MODE != "queue" else None,
+            "usage": USAGE.summary(), "form_schema": SCHEMA.metrics()}
+
+@router.get("/usage")
+async def usage(request: Request, days: int = 14, rid: str = ""):
+    _require_admin(request)
+    # one deal's tokens and cost by stage, or daily totals
+    if rid:
+        return USAGE.deal(rid)
+    return {**USAGE.summary(), "days": USAGE.daily(max(1, min(days, 366)))}
+
+@router.get("/status/{rid}")
+async def status(rid: str):
+    summary = await asyncio.to_thread(STATUS.summary, rid)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="unknown rid")
+    return summary
+
+@router.get("/status/{rid}/stream")
+async def status_stream(rid: str, request: Request):
+    # server-sent events; reconnecting clients resume after Last-Event-ID
+    if not await asyncio.to_thread(STATUS.exists, rid):
+        raise HTTPException(status_code=404, detail="unknown rid")   # would otherwise poll forever
+    try:
+        after = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        after = 0
+    return StreamingResponse(STATUS.stream(rid, after=after), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.post("/digest/flush")
+async def digest_flush(request: Request):
+    _require_admin(request)
+    from utils.digest import flush_digest
+    force = request.query_params.get("force") in ("1", "true", "True")
+    # Gmail sends and file moves block; keep them off the event loop
+    return await asyncio.to_thread(flush_digest, force=force)
@@ -0,0 +1,300 @@
+# utils/workqueue.py
+import json, os, socket, sqlite3, threading, time, traceback, uuid
+from typing import Any, Callable, Dict, Optional
+from utils.config import WORK_DB_PATH, WORK_LEASE_S, WORK_MAX_ATTEMPTS, WORK_RETAIN_DAYS
+from utils.priority import LANES, POLICY, LanePolicy, percentiles
+from utils.status import STATUS
+from utils.usage import BudgetDeferred
+
+# Durable deal backlog shared by every worker process on one host. SQLite's
+# WAL locking needs a local filesystem, so the database must not sit on NFS
+# or another network volume. Webhooks enqueue; workers claim a job with a
+# time-limited lease, heartbeat while it runs, and a lease that expires
+# (crashed or stalled worker) makes the job claimable again, until it has
+# used max_attempts. Which ready job is claimed next is decided per lane by
+# utils/priority.py.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id           TEXT PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    lane         TEXT NOT NULL DEFAULT 'normal',  -- high | normal | low
+    payload      TEXT NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'queued',   -- queued | leased | done | failed
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner  TEXT,
+    lease_until  REAL,
+    created      REAL NOT NULL,
+    started      REAL,                            -- first claim, for lane wait times
+    updated      REAL NOT NULL,
+    last_error   TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS seen (
+    key   TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+"""
+
+
+class WorkQueue:
+    def __init__(self, path: str = WORK_DB_PATH, lease_s: float = WORK_LEASE_S,
+                 max_attempts: int = WORK_MAX_ATTEMPTS, policy: LanePolicy = POLICY,
+                 retain_days: float = WORK_RETAIN_DAYS):
+        self.path = path
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.policy = policy
+        self.retain_s = retain_days * 86400
+        self._finished = 0
+        self._ready = False
+        self._init_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # one short-lived connection per operation: safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if not self._ready:
+            with self._init_lock:
+                if not self._ready:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    cols = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+                    if "lane" not in cols:   # databases created before priority lanes
+                        conn.execute("ALTER TABLE jobs ADD COLUMN lane TEXT NOT NULL DEFAULT 'normal'")
+                        conn.execute("ALTER TABLE jobs ADD COLUMN started REAL")
+                    conn.execute("CREATE INDEX IF NOT EXISTS jobs_lane ON jobs (lane, status, created)")
+                    self._ready = True
+        return conn
+
+    def seen(self, key: str, ttl: float = 600) -> bool:
+        """Cross-process replacement for the per-process SEEN dict: True if `key` was marked within ttl."""
+        if not key:
+            return False
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute("DELETE FROM seen WHERE until < ?", (now,))
+            cur = conn.execute("INSERT OR IGNORE INTO seen (key, until) VALUES (?, ?)", (key, now + ttl))
+            return cur.rowcount == 0
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[str] = None,
+                lane: str = "normal") -> bool:
+        """Add a job to a priority lane; False if a job with this id already exists."""
+        now = time.time()
+        conn = self._conn()
+        try:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, lane, payload, available_at, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id or uuid.uuid4().hex, kind, lane if lane in LANES else "normal",
+                 json.dumps(payload), now, now, now))
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def claim(self, owner: str) -> Optional[sqlite3.Row]:
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            while True:
+                heads = {}
+                for lane in LANES:
+                    head = conn.execute(
+                        "SELECT * FROM jobs WHERE lane = ? AND ((status = 'queued' AND available_at <= ?) "
+                        "OR (status = 'leased' AND lease_until < ?)) ORDER BY created LIMIT 1",
+                        (lane, now, now)).fetchone()
+                    if head is not None:
+                        heads[lane] = head
+                lane = self.policy.pick({l: h["created"] for l, h in heads.items()}, now)
+                if lane is None:
+                    conn.execute("COMMIT")
+                    return None
+                row = heads[lane]
+                if row["status"] != "leased":
+                    break
+                if row["attempts"] < self.max_attempts:
+                    print(f"WORK reclaiming {row['id']} from {row['lease_owner']} (lease expired)", flush=True)
+                    break
+                # every attempt died with its worker (e.g. the deal crashes the process): stop here
+                error = f"lease expired on each of {row['attempts']} attempts (last owner {row['lease_owner']})"
+                print(f"WORK {row['id']} failed: {error}", flush=True)
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, lease_until = NULL, "
+                    "updated = ?, last_error = ? WHERE id = ?", (now, error, row["id"]))
+                STATUS.mark(json.loads(row["payload"]).get("rid"), "failed", error=error,
+                            attempt=row["attempts"])
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, started = COALESCE(started, ?), updated = ? WHERE id = ?",
+                (owner, now + self.lease_s, now, now, row["id"]))
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id: str, owner: str) -> bool:
+        """Extend the lease; False means another worker has reclaimed the job."""
+        conn = self._conn()
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ?, updated = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time() + self.lease_s, time.time(), job_id, owner))
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def finish(self, job_id: str, owner: str, error: Optional[str] = None, attempts: int = 1):
+        # failures go back to the queue with backoff until max_attempts
+        now = time.time()
+        if error is None:
+            status, available = "done", now
+        elif attempts >= self.max_attempts:
+            status, available = "failed", now
+        else:
+            status, available = "queued", now + min(600, 30 * 2 ** (attempts - 1))
+        conn = self._conn()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_until = NULL, "
+                "updated = ?, last_error = ? WHERE id = ? AND lease_owner = ?",
+                (status, available, now, (error or "")[-2000:] or None, job_id, owner))
+            self._finished += 1
+            if self._finished % 500 == 0:
+                # finished jobs keep their payload (the whole form); drop them once old
+                conn.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                             (now - self.retain_s,))
+        finally:
+            conn.close()
+
+    def defer(self, job_id: str, owner: str, until: float):
+        """Put a claimed job back untouched (not a failed attempt) until `until`."""
+        conn = self._conn()
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, attempts = MAX(0, attempts - 1), "
+                "lease_owner = NULL, lease_until = NULL, updated = ? WHERE id = ? AND lease_owner = ?",
+                (until, time.time(), job_id, owner))
+        finally:
+            conn.close()
+
+    def stats(self, recent: int = 500) -> Dict[str, Any]:
+        conn = self._conn()
+        try:
+            counts = {r["status"]: r["n"] for r in
+                      conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+            oldest = conn.execute("SELECT MIN(created) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            lanes = {}
+            for lane in LANES:
+                waiting = conn.execute("SELECT COUNT(*) FROM jobs WHERE lane = ? AND status = 'queued'",
+                                       (lane,)).fetchone()[0]
+                waits = [r[0] for r in conn.execute(
+                    "SELECT started - created FROM jobs WHERE lane = ? AND started IS NOT NULL "
+                    "ORDER BY started DESC LIMIT ?", (lane, recent))]
+                lanes[lane] = {"waiting": waiting, **percentiles(waits)}
+        finally:
+            conn.close()
+        return {**counts, "oldest_queued_s": round(time.time() - oldest, 1) if oldest else 0.0,
+                "lanes": lanes}
+
+
+QUEUE = WorkQueue()
+
+
+def _handlers() -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    # imported lazily: core pulls in OpenAI, Google and PDF libraries
+    import asyncio
+    from utils.core import StartupInfo, submit, process_resubmission
+
+    def run_submit(p):
+        return asyncio.run(submit(StartupInfo(**p["info"]), extra_context=p["extra"],
+                                  answers=p.get("answers"), rid=p.get("rid"),
+                                  sheet_row=p.get("sheet_row")))
+
+    def run_resubmit(p):
+        return process_resubmission(p["prev"], StartupInfo(**p["info"]), p["extra"], p["answers"],
+                                    p["rid"], p["plan"], p["changed"])
+
+    return {"submit": run_submit, "resubmit": run_resubmit}
+
+
+def _work_one(queue: WorkQueue, owner: str, handlers) -> bool:
+    row = queue.claim(owner)
+    if row is None:
+        return False
+    lost = threading.Event()
+    stop = threading.Event()
+
+    def _beat():
+        while not stop.wait(queue.lease_s / 3):
+            if not queue.heartbeat(row["id"], owner):
+                lost.set()
+                return
+
+    beat = threading.Thread(target=_beat, name=f"lease-{row['id'][:8]}", daemon=True)
+    beat.start()
+    error, deferred = None, None
+    t0 = time.time()
+    try:
+        handlers[row["kind"]](json.loads(row["payload"]))
+    except BudgetDeferred as e:
+        deferred = e
+    except Exception:
+        error = traceback.format_exc()
+        print(f"WORK {row['kind']} {row['id']} failed (attempt {row['attempts'] + 1}): {error}", flush=True)
+    finally:
+        stop.set()
+        beat.join()
+    if lost.is_set():
+        print(f"WORK {row['id']} lease was lost mid-run; leaving it to the new owner", flush=True)
+    elif deferred is not None:
+        queue.defer(row["id"], owner, deferred.until)
+        STATUS.mark(json.loads(row["payload"]).get("rid"), "deferred", until=deferred.until)
+        print(f"WORK {row['kind']} {row['id']} {deferred}", flush=True)
+    else:
+        queue.finish(row["id"], owner, error, attempts=row["attempts"] + 1)
+        if error is not None:
+            final = row["attempts"] + 1 >= queue.max_attempts
+            STATUS.mark(json.loads(row["payload"]).get("rid"), "failed" if final else "retrying",
+                        error=error.strip().splitlines()[-1][:500], attempt=row["attempts"] + 1)
+        print(f"WORK {row['kind']} {row['id']} {'done' if error is None else 'retry/fail'} "
+              f"in {time.time() - t0:.1f}s", flush=True)
+    return True
+
+
+def start_workers(n: int, queue: WorkQueue = QUEUE, poll_s: float = 1.0):
+    """Start `n` claim loops in this process; each handles one deal at a time."""
+    host = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _loop(i: int):
+        owner = f"{host}:{i}"
+        handlers = _handlers()
+        while True:
+            try:
+                if not _work_one(queue, owner, handlers):
+                    time.sleep(poll_s)
+            except Exception as e:
+                print(f"WORK loop error ({owner}): {e}", flush=True)
+                time.sleep(poll_s)
+
+    threads = [threading.Thread(target=_loop, args=(i,), name=f"worker-{i}", daemon=True) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+if __name__ == "__main__":
+    # standalone worker: python -m utils.workqueue  (WORKER_THREADS per process)
+    from utils.config import WORKER_THREADS
+    start_workers(max(1, WORKER_THREADS))
+    print(f"WORK {max(1, WORKER_THREADS)} workers polling {QUEUE.path}", flush=True)
+    while True:
+        time.sleep(3600)